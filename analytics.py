@@ -1,7 +1,24 @@
-from datetime import datetime, timedelta, timezone
-from typing import List
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-from models import Completion, Habit
+from models import Completion, Habit, epoch_day_ordinal, iso_to_epoch
+from periods import period_from_day
+
+# numpy is optional and slow to import, so it is loaded on first use
+_numpy_module = None
+
+
+def load_numpy():
+    """Return the numpy module, or None if it is not installed."""
+    global _numpy_module
+    if _numpy_module is None:
+        try:
+            import numpy
+        except ImportError:  # the pure-Python engine is used instead
+            numpy = False
+        _numpy_module = numpy
+    return _numpy_module or None
 
 
 # -----------------------------------------
@@ -11,55 +28,271 @@ def to_dt(iso: str) -> datetime:
     return datetime.fromisoformat(iso)
 
 
+# -----------------------------------------
+# Period ordinals (see periods.py for the bucketing rules)
+# -----------------------------------------
+def period_ordinal(iso: str, periodicity: str) -> int:
+    """Map an ISO timestamp to its period ordinal (days are UTC days)."""
+    return period_from_day(epoch_day_ordinal(iso_to_epoch(iso)), periodicity)
+
+
+def completion_period(completion: Completion, periodicity: str) -> int:
+    """Map a completion to its period ordinal without any string parsing."""
+    return period_from_day(epoch_day_ordinal(completion.completed_ts), periodicity)
+
+
+def advance_streak(
+    current: int,
+    longest: int,
+    last_period: Optional[int],
+    period: int,
+) -> Optional[Tuple[int, int, int]]:
+    """
+    Apply one new completion to a streak state in O(1).
+    Returns the new (current, longest, last_period), or None if the
+    completion lies before last_period and the state must be rebuilt.
+    """
+    if last_period is None:
+        return 1, max(longest, 1), period
+    if period < last_period:
+        return None
+    if period == last_period:
+        # another completion in the same period does not change anything
+        return current, longest, last_period
+    if period == last_period + 1:
+        current += 1
+    else:
+        current = 1
+    return current, max(longest, current), period
+
+
+def live_streak(current: int, last_period: Optional[int], now_period: int) -> int:
+    """
+    Return the streak that is still alive in period `now_period`.
+    A run counts while it ends in this period or the previous one (it can
+    still be continued); after a missed period it is broken.
+    """
+    if last_period is None or last_period < now_period - 1:
+        return 0
+    return current
+
+
+# -----------------------------------------
+# Streak state for one habit
+# -----------------------------------------
+def streak_state_for(
+    completions: Iterable[Completion], periodicity: str
+) -> Tuple[int, int, Optional[int]]:
+    """
+    Given completions for ONE habit, return (current, longest, last_period).
+    The current streak is the run that ends in the most recent period.
+    """
+    return streak_state_from_periods(
+        {completion_period(c, periodicity) for c in completions}
+    )
+
+
+def streak_state_from_periods(
+    periods: Iterable[int],
+) -> Tuple[int, int, Optional[int]]:
+    """
+    Return (current, longest, last_period) for a set of completed period
+    ordinals (duplicates are ignored).
+    """
+    current, longest, last_period = 0, 0, None
+    for period in sorted(set(periods)):
+        current, longest, last_period = advance_streak(
+            current, longest, last_period, period
+        )
+
+    return current, longest, last_period
+
+
+# -----------------------------------------
+# Weekly heatmap
+# -----------------------------------------
+def weekly_heatmap(
+    day_counts: Dict[int, int], first_day: int, last_day: int
+) -> List[Tuple[int, List[Optional[int]]]]:
+    """
+    Lay out {day ordinal: count} for the days first_day..last_day as ISO
+    weeks: a list of (monday day ordinal, [count for Mon..Sun]), where days
+    outside the window are None.
+    """
+    rows = []
+    monday = first_day - (first_day - 1) % 7
+    while monday <= last_day:
+        rows.append((
+            monday,
+            [
+                day_counts.get(day, 0) if first_day <= day <= last_day else None
+                for day in range(monday, monday + 7)
+            ],
+        ))
+        monday += 7
+    return rows
+
+
 # -----------------------------------------
 # Longest streak for one habit
 # -----------------------------------------
-def longest_streak_for(completions: List[Completion], periodicity: str) -> int:
+def longest_streak_for(completions: Iterable[Completion], periodicity: str) -> int:
     """
     Given completions for ONE habit, return their longest streak.
+    Several completions in the same period count once.
     """
-    if not completions:
-        return 0
+    return streak_state_for(completions, periodicity)[1]
+
+
+# -----------------------------------------
+# Streaming streaks over an ordered history
+# -----------------------------------------
+def streak_states_ordered(
+    completions: Iterable[Completion],
+    periodicity_by_habit: Dict[int, str],
+) -> Iterator[Tuple[int, Tuple[int, int, Optional[int]]]]:
+    """
+    Yield (habit_id, (current, longest, last_period)) for every habit with
+    completions, in constant memory.
 
-    # Convert timestamps to datetime, sorted
-    dates = sorted([to_dt(c.completed_at).date() for c in completions])
+    `completions` must be ordered by (habit_id, time), as streamed
+    by HabitRepository.iter_completions(). Completions of habits missing
+    from `periodicity_by_habit` are skipped.
+    """
+    habit_id = None
+    state: Tuple[int, int, Optional[int]] = (0, 0, None)
 
-    streak = 1
-    best = 1
+    for c in completions:
+        if c.habit_id != habit_id:
+            if state[2] is not None:
+                yield habit_id, state
+            habit_id, state = c.habit_id, (0, 0, None)
+        periodicity = periodicity_by_habit.get(c.habit_id)
+        if periodicity is None:
+            continue
 
-    for i in range(1, len(dates)):
-        prev = dates[i - 1]
-        curr = dates[i]
+        new_state = advance_streak(*state, completion_period(c, periodicity))
+        if new_state is None:
+            raise ValueError("Completions must be ordered by habit and time.")
+        state = new_state
 
-        # Daily streak
-        if periodicity == "daily":
-            if curr == prev + timedelta(days=1):
-                streak += 1
-            else:
-                streak = 1
+    if state[2] is not None:
+        yield habit_id, state
 
-        # Weekly streak
-        elif periodicity == "weekly":
-            if curr.isocalendar()[1] == prev.isocalendar()[1] + 1:
-                streak += 1
-            else:
-                streak = 1
 
-        best = max(best, streak)
+# -----------------------------------------
+# Batch streaks for many habits at once
+# -----------------------------------------
+def batch_streaks(
+    habit_ids: Sequence[int],
+    periods: Sequence[int],
+    use_numpy: Optional[bool] = None,
+) -> Dict[int, Tuple[int, int, int]]:
+    """
+    Compute (current, longest, last_period) for every habit in one pass.
+    The columns may be in any order and may contain repeated periods.
+    Habits without completions do not appear in the result.
+    Uses NumPy when it is installed, unless use_numpy says otherwise.
+    """
+    if use_numpy is None:
+        use_numpy = load_numpy() is not None
+    if use_numpy:
+        return _batch_streaks_numpy(habit_ids, periods)
+    return _batch_streaks_python(habit_ids, periods)
+
 
-    return best
+def _batch_streaks_python(
+    habit_ids: Sequence[int], periods: Sequence[int]
+) -> Dict[int, Tuple[int, int, int]]:
+    result: Dict[int, Tuple[int, int, int]] = {}
+    current_habit = None
+    current, longest, last_period = 0, 0, None
+
+    for habit_id, period in sorted(zip(habit_ids, periods)):
+        if habit_id != current_habit:
+            current_habit = habit_id
+            current, longest, last_period = 0, 0, None
+        current, longest, last_period = advance_streak(
+            current, longest, last_period, period
+        )
+        result[habit_id] = (current, longest, last_period)
+
+    return result
+
+
+def _batch_streaks_numpy(
+    habit_ids: Sequence[int], periods: Sequence[int]
+) -> Dict[int, Tuple[int, int, int]]:
+    np = load_numpy()
+    h = np.asarray(habit_ids, dtype=np.int64)
+    p = np.asarray(periods, dtype=np.int64)
+    if h.size == 0:
+        return {}
+
+    # sort by (habit, period) and drop repeated periods
+    order = np.lexsort((p, h))
+    h, p = h[order], p[order]
+    keep = np.ones(h.size, dtype=bool)
+    keep[1:] = (h[1:] != h[:-1]) | (p[1:] != p[:-1])
+    h, p = h[keep], p[keep]
+
+    # a run starts at a new habit or wherever the period jumps by more than 1
+    habit_start = np.ones(h.size, dtype=bool)
+    habit_start[1:] = h[1:] != h[:-1]
+    run_start = habit_start.copy()
+    run_start[1:] |= (p[1:] - p[:-1]) != 1
+
+    run_len = np.bincount(np.cumsum(run_start) - 1)
+    run_habit = h[run_start]
+
+    # runs are grouped by habit; reduce each group
+    first_run = np.flatnonzero(np.r_[True, run_habit[1:] != run_habit[:-1]])
+    longest = np.maximum.reduceat(run_len, first_run)
+    current = run_len[np.r_[first_run[1:], run_len.size] - 1]
+    last_period = p[np.r_[np.flatnonzero(habit_start)[1:], h.size] - 1]
+
+    return {
+        int(habit_id): (int(cur), int(best), int(last))
+        for habit_id, cur, best, last in zip(
+            run_habit[first_run], current, longest, last_period
+        )
+    }
+
+
+# -----------------------------------------
+# Group completions by habit
+# -----------------------------------------
+def group_completions_by_habit(
+    completions: Iterable[Completion],
+) -> Dict[int, List[Completion]]:
+    """Bucket completions by habit_id in a single pass."""
+    buckets: Dict[int, List[Completion]] = defaultdict(list)
+    for c in completions:
+        buckets[c.habit_id].append(c)
+    return buckets
 
 
 # -----------------------------------------
 # Longest streak overall
 # -----------------------------------------
 def longest_streak_overall(all_habits: List[Habit],
-                           all_completions: List[Completion]) -> int:
+                           all_completions: Iterable[Completion],
+                           ordered: bool = False) -> int:
+    """
+    Return the longest streak of any habit.
+    Pass ordered=True when the completions come ordered by
+    (habit_id, time) to stream them in constant memory.
+    """
+    if ordered:
+        periodicity = {h.id: h.periodicity for h in all_habits}
+        states = streak_states_ordered(all_completions, periodicity)
+        return max((longest for _, (_, longest, _) in states), default=0)
+
+    buckets = group_completions_by_habit(all_completions)
     best = 0
 
     for habit in all_habits:
-        comps = [c for c in all_completions if c.habit_id == habit.id]
-        streak = longest_streak_for(comps, habit.periodicity)
+        streak = longest_streak_for(buckets.get(habit.id, []), habit.periodicity)
         best = max(best, streak)
 
     return best
\ No newline at end of file
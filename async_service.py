@@ -0,0 +1,135 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, TypeVar, Union
+
+from db import DEFAULT_PRAGMAS, ConnectionPool, PragmaProfile, migrate
+from models import Completion, Habit
+from repository import HabitRepository
+from service import HabitService
+
+T = TypeVar("T")
+
+
+class AsyncHabitService:
+    """
+    asyncio facade over HabitService for use inside an event loop.
+
+    Repository I/O never runs on the loop: writes go to one dedicated writer
+    thread (SQLite allows a single writer anyway), reads to a bounded pool
+    of reader threads. Every thread has its own connection, and with WAL
+    the readers keep working while the writer commits.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        readers: int = 4,
+        pragmas: Optional[PragmaProfile] = DEFAULT_PRAGMAS,
+        streak_backend: str = "materialized",
+    ) -> None:
+        self._pool = ConnectionPool(path, pragmas)
+        self._service = HabitService(
+            repo=HabitRepository(pool=self._pool),
+            streak_backend=streak_backend,
+        )
+        self._writer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="planner-writer"
+        )
+        self._readers = ThreadPoolExecutor(
+            max_workers=readers, thread_name_prefix="planner-reader"
+        )
+
+        # bring the schema up to date once, on the writer's own connection
+        self._writer.submit(lambda: migrate(self._pool.connection())).result()
+
+    async def __aenter__(self) -> "AsyncHabitService":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Wait for running calls, then stop the threads and close connections."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._shutdown)
+
+    def _shutdown(self) -> None:
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        self._pool.close_all()
+
+    async def _write(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._writer, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def _read(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._readers, functools.partial(fn, *args, **kwargs)
+        )
+
+    # ---------- Habit management ----------
+
+    async def create_habit(
+        self, name: str, periodicity: str, one_per_period: bool = False
+    ) -> Habit:
+        return await self._write(
+            self._service.create_habit, name, periodicity, one_per_period
+        )
+
+    async def list_habits(
+        self,
+        include_archived: bool = False,
+        periodicity: Optional[str] = None,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Habit]:
+        return await self._read(
+            self._service.list_habits,
+            include_archived=include_archived,
+            periodicity=periodicity,
+            after=after,
+            limit=limit,
+        )
+
+    async def archive_habit(self, habit_id: int) -> None:
+        await self._write(self._service.archive_habit, habit_id)
+
+    async def delete_habit(self, habit_id: int) -> None:
+        await self._write(self._service.delete_habit, habit_id)
+
+    # ---------- Completions ----------
+
+    async def add_completion_now(self, habit_id: int) -> Tuple[Completion, bool]:
+        return await self._write(self._service.add_completion_now, habit_id)
+
+    async def add_completion_at(
+        self, habit_id: int, completed_at_iso: str
+    ) -> Tuple[Completion, bool]:
+        return await self._write(
+            self._service.add_completion_at, habit_id, completed_at_iso
+        )
+
+    async def list_completions_for_habit(self, habit_id: int) -> List[Completion]:
+        return await self._read(self._service.list_completions_for_habit, habit_id)
+
+    # ---------- Analytics helpers ----------
+
+    async def longest_streak_for_habit(
+        self, habit_id: int, backend: Optional[str] = None
+    ) -> int:
+        return await self._read(
+            self._service.longest_streak_for_habit, habit_id, backend=backend
+        )
+
+    async def current_streak_for_habit(self, habit_id: int) -> int:
+        return await self._read(self._service.current_streak_for_habit, habit_id)
+
+    async def longest_streak_overall(
+        self, backend: Optional[str] = None
+    ) -> Tuple[Optional[Habit], int]:
+        return await self._read(self._service.longest_streak_overall, backend=backend)
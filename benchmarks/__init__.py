@@ -0,0 +1 @@
+"""Benchmarks and load tests for the planner (run with `python -m benchmarks.<name>`)."""
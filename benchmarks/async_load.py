@@ -0,0 +1,83 @@
+"""
+Load test for AsyncHabitService: many concurrent clients against one database.
+
+    python -m benchmarks.async_load --clients 50 --ops 200
+
+Each client logs completions and reads streaks in a 1:4 write/read mix.
+Prints the overall throughput and the per-operation latency percentiles.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from async_service import AsyncHabitService
+
+
+async def client(
+    service: AsyncHabitService,
+    habit_ids: List[int],
+    ops: int,
+    seed: int,
+) -> List[float]:
+    """One simulated user; returns the latency of every operation."""
+    rng = random.Random(seed)
+    latencies = []
+    for _ in range(ops):
+        habit_id = rng.choice(habit_ids)
+        start = time.perf_counter()
+        if rng.random() < 0.2:
+            await service.add_completion_now(habit_id)
+        else:
+            await service.longest_streak_for_habit(habit_id)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_load(
+    path: Path, clients: int, ops: int, habits: int, readers: int
+) -> Tuple[int, float, List[float]]:
+    """Run the load test; returns (operations, seconds, latencies)."""
+    async with AsyncHabitService(path, readers=readers) as service:
+        habit_ids = [
+            (await service.create_habit(f"habit {i}", "daily")).id
+            for i in range(habits)
+        ]
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(client(service, habit_ids, ops, seed) for seed in range(clients))
+        )
+        elapsed = time.perf_counter() - start
+
+    latencies = [lat for result in results for lat in result]
+    return len(latencies), elapsed, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AsyncHabitService load test")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--ops", type=int, default=200, help="Operations per client")
+    parser.add_argument("--habits", type=int, default=20)
+    parser.add_argument("--readers", type=int, default=4, help="Reader threads")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        total, elapsed, latencies = asyncio.run(
+            run_load(Path(tmp) / "load.db", args.clients, args.ops, args.habits, args.readers)
+        )
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{args.clients} clients, {total} operations in {elapsed:.2f}s")
+    print(f"throughput: {total / elapsed:,.0f} ops/s")
+    print(f"latency: p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Deterministic synthetic planner databases for benchmarks.
+
+    python -m benchmarks.generate /tmp/bench.db --habits 10000 --completions 10000000
+
+The same seed always produces the same database. Histories are realistic
+enough to exercise the streak code: most completions continue a streak, but
+there are gaps, several completions in one period, and completions that are
+inserted out of time order (as backfills would be).
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Tuple, Union
+
+from db import PragmaProfile, get_connection, migrate
+from repository import HabitRepository, chunked, completion_row
+
+# generation only: the file can always be regenerated, so skip the fsyncs
+GENERATE_PRAGMAS = PragmaProfile(synchronous="OFF")
+
+# a Monday, so weekly histories line up with ISO weeks
+START_TS = int(datetime(2014, 12, 29, tzinfo=timezone.utc).timestamp())
+DAY = 86400
+
+# share of completions that are gaps / same-period repeats / out of order
+GAP_RATE = 0.05
+REPEAT_RATE = 0.05
+SWAP_RATE = 0.05
+
+
+def habit_periodicities(habits: int, seed: int) -> List[str]:
+    """Periodicity of habits 1..N (about 30% weekly)."""
+    rng = random.Random(seed)
+    return ["weekly" if rng.random() < 0.3 else "daily" for _ in range(habits)]
+
+
+def completion_rows(
+    periodicities: List[str], completions: int, seed: int
+) -> Iterator[Tuple[int, int]]:
+    """Yield (habit_id, completed_ts) rows, habit by habit."""
+    rng = random.Random(seed + 1)
+    per_habit, extra = divmod(completions, len(periodicities))
+
+    for habit_id, periodicity in enumerate(periodicities, start=1):
+        step = 7 * DAY if periodicity == "weekly" else DAY
+        count = per_habit + (1 if habit_id <= extra else 0)
+        period_start = START_TS + rng.randrange(365 * DAY // step) * step
+
+        history = []
+        for _ in range(count):
+            r = rng.random()
+            if r < GAP_RATE:
+                period_start += step * rng.randint(2, 10)
+            elif r >= GAP_RATE + REPEAT_RATE:
+                period_start += step
+            # else: another completion in the same period
+            history.append(period_start + rng.randrange(step))
+
+        # backfills: swap some completions with their neighbour
+        for i in range(len(history) - 1):
+            if rng.random() < SWAP_RATE:
+                history[i], history[i + 1] = history[i + 1], history[i]
+
+        for ts in history:
+            yield habit_id, ts
+
+
+def generate_database(
+    path: Union[str, Path],
+    habits: int,
+    completions: int,
+    seed: int = 0,
+    chunk_size: int = 50_000,
+    verbose: bool = False,
+) -> None:
+    """Create a new database at `path` with the given number of rows."""
+    path = Path(path)
+    if path.exists():
+        raise FileExistsError(f"{path} already exists.")
+
+    conn = get_connection(path, GENERATE_PRAGMAS)
+    migrate(conn)
+    start = time.perf_counter()
+
+    periodicities = habit_periodicities(habits, seed)
+    created_at = datetime.fromtimestamp(START_TS, timezone.utc).isoformat()
+    conn.executemany(
+        "INSERT INTO habits (id, name, periodicity, created_at) VALUES (?, ?, ?, ?)",
+        [
+            (habit_id, f"Habit {habit_id}", periodicity, created_at)
+            for habit_id, periodicity in enumerate(periodicities, start=1)
+        ],
+    )
+
+    written = 0
+    for chunk in chunked(completion_rows(periodicities, completions, seed), chunk_size):
+        conn.executemany(
+            """
+            INSERT INTO completions (habit_id, completed_ts, day_ord, week_ord)
+            VALUES (?, ?, ?, ?)
+            """,
+            [completion_row(habit_id, ts) for habit_id, ts in chunk],
+        )
+        written += len(chunk)
+        if verbose:
+            print(f"\r{written:,} completions", end="", flush=True)
+    conn.commit()
+
+    repo = HabitRepository(conn=conn)
+    repo.rebuild_period_counts()
+    repo.rebuild_streak_states()
+    conn.close()
+    if verbose:
+        print(f"\nGenerated {path} in {time.perf_counter() - start:.1f}s.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a benchmark database")
+    parser.add_argument("path", type=str)
+    parser.add_argument("--habits", type=int, default=10_000)
+    parser.add_argument("--completions", type=int, default=10_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate_database(args.path, args.habits, args.completions, args.seed, verbose=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Cold-start benchmark for the CLI entry point.
+
+    python -m benchmarks.startup --runs 20
+
+For each command it reports the median wall time of a fresh
+`python main.py ...` process, and the slowest imports of one run as
+measured by `python -X importtime`. Use --json for machine-readable output.
+
+The commands run against a temporary copy of planner.db (via --db), so the
+working tree's database is never touched.
+"""
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (label, argv) pairs
+COMMANDS = [
+    ("help", ["--help"]),
+    ("list", ["list"]),
+    ("longest-streak", ["analytics", "longest-streak"]),
+]
+
+
+def cli_argv(db: Path, argv: List[str]) -> List[str]:
+    """Return the `python main.py --db DB argv` command line."""
+    return [sys.executable, str(ROOT / "main.py"), "--db", str(db), *argv]
+
+
+def wall_times(db: Path, argv: List[str], runs: int) -> List[float]:
+    """Run `python main.py argv` on `db` `runs` times; return the wall times."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cli_argv(db, argv), stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def import_times(db: Path, argv: List[str], top: int) -> Dict[str, int]:
+    """Return {module: cumulative import time in µs} for the slowest imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *cli_argv(db, argv)[1:]],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # only top-level imports (nested ones are indented)
+        if not name.startswith("  "):
+            modules[name.strip()] = int(cumulative)
+    slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)
+    return dict(slowest[:top])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CLI cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to show")
+    parser.add_argument("--json", action="store_true", help="Print JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "planner.db"
+        if (ROOT / "planner.db").exists():
+            shutil.copy2(ROOT / "planner.db", db)
+        for label, argv in COMMANDS:
+            times = wall_times(db, argv, args.runs)
+            results.append(
+                {
+                    "command": label,
+                    "median_ms": statistics.median(times) * 1000,
+                    "min_ms": min(times) * 1000,
+                    "imports_us": import_times(db, argv, args.top),
+                }
+            )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for r in results:
+        print(f"{r['command']:<16} median {r['median_ms']:7.1f} ms   min {r['min_ms']:7.1f} ms")
+        for module, us in r["imports_us"].items():
+            print(f"    {us / 1000:7.2f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
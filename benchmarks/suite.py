@@ -0,0 +1,280 @@
+"""
+Benchmark suite for the repository, analytics and CLI layers.
+
+    python -m benchmarks.suite --scale medium --out results.json
+    python -m benchmarks.suite --compare before.json after.json
+
+The dataset for a scale is generated once (see benchmarks.generate) and
+cached under --data-dir; delete the file to regenerate it. Read benchmarks
+run against the cached dataset, write benchmarks against a fresh empty
+database, and CLI benchmarks run `python main.py --db DATASET ...`.
+
+Results are written as JSON so that runs can be compared with --compare.
+"""
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import analytics
+from benchmarks.generate import START_TS, generate_database
+from benchmarks.startup import cli_argv
+from db import open_database
+from repository import HabitRepository
+from service import STREAK_BACKENDS, HabitService
+from snapshot import Snapshot, write_snapshot
+
+# name -> (habits, completions)
+SCALES = {
+    "small": (100, 100_000),
+    "medium": (1_000, 1_000_000),
+    "large": (10_000, 10_000_000),
+}
+
+# (label, argv) pairs for the end-to-end CLI runs
+CLI_COMMANDS = [
+    ("list", ["list"]),
+    ("analytics list-all", ["analytics", "list-all"]),
+    ("analytics longest-streak", ["analytics", "longest-streak"]),
+    ("analytics longest-streak --habit", ["analytics", "longest-streak", "--habit", "1"]),
+]
+
+SAMPLE_HABITS = 50
+WRITE_ROWS = 10_000
+
+
+def timed(
+    fn: Callable[..., object],
+    repeat: int,
+    setup: Optional[Callable[[], object]] = None,
+) -> Dict[str, float]:
+    """
+    Run fn() `repeat` times and return its median / min wall time.
+    With `setup`, each run calls fn(setup()) and only fn is timed.
+    """
+    times = []
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(times), "min_s": min(times), "repeat": repeat}
+
+
+def dataset_path(data_dir: Path, scale: str, seed: int) -> Path:
+    """Generate the dataset for `scale` unless it is already cached."""
+    habits, completions = SCALES[scale]
+    path = data_dir / f"bench-{scale}-{seed}.db"
+    if not path.exists():
+        data_dir.mkdir(parents=True, exist_ok=True)
+        generate_database(path, habits, completions, seed, verbose=True)
+    return path
+
+
+# -----------------------------------------
+# Benchmarks
+# -----------------------------------------
+def read_benchmarks(path: Path, seed: int, repeat: int) -> Dict[str, dict]:
+    conn = open_database(path)
+    repo = HabitRepository(conn=conn)
+    service = HabitService(repo=repo)
+    habits = {h.id: h for h in repo.list_habits(include_archived=True)}
+    sample = random.Random(seed).sample(sorted(habits), min(SAMPLE_HABITS, len(habits)))
+    histories = {hid: repo.list_completions_for_habit(hid) for hid in sample}
+    results = {}
+
+    def scan_all():
+        for _ in repo.iter_completions():
+            pass
+
+    results["repo.list_habits"] = timed(lambda: repo.list_habits(include_archived=True), repeat)
+    results[f"repo.list_completions_for_habit x{len(sample)}"] = timed(
+        lambda: [repo.list_completions_for_habit(hid) for hid in sample], repeat
+    )
+    results["repo.iter_completions (full scan)"] = timed(scan_all, repeat)
+    results[f"analytics.longest_streak_for x{len(sample)}"] = timed(
+        lambda: [
+            analytics.longest_streak_for(histories[hid], habits[hid].periodicity)
+            for hid in sample
+        ],
+        repeat,
+    )
+    results["analytics.longest_streak_overall (streaming)"] = timed(
+        lambda: analytics.longest_streak_overall(
+            list(habits.values()), repo.iter_completions(), ordered=True
+        ),
+        repeat,
+    )
+    for backend in STREAK_BACKENDS:
+        results[f"service.longest_streak_overall [{backend}]"] = timed(
+            lambda: service.longest_streak_overall(backend=backend), repeat
+        )
+        results[f"service.streak_report [{backend}]"] = timed(
+            lambda: service.streak_report(backend=backend), repeat
+        )
+        results[f"service.top_streaks k=10 [{backend}]"] = timed(
+            lambda: service.top_streaks(10, backend=backend), repeat
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = Path(tmp) / "planner.snapshot"
+        results["snapshot.write_snapshot"] = timed(
+            lambda: write_snapshot(repo, snapshot_path), repeat
+        )
+
+        def snapshot_streaks():
+            with Snapshot(snapshot_path) as snap:
+                snap.streaks()
+
+        results["snapshot.Snapshot.streaks"] = timed(snapshot_streaks, repeat)
+
+    conn.close()
+    return results
+
+
+def write_benchmarks(habits: int, seed: int, repeat: int, tmp: Path) -> Dict[str, dict]:
+    rng = random.Random(seed)
+    start = datetime.fromtimestamp(START_TS, timezone.utc)
+    rows = [
+        (rng.randint(1, habits), (start + timedelta(seconds=rng.randrange(10 ** 8))).isoformat())
+        for _ in range(WRITE_ROWS)
+    ]
+    fresh = iter(range(10 ** 6))
+
+    def fresh_repo() -> HabitRepository:
+        """A new database with `habits` empty habits."""
+        repo = HabitRepository(conn=open_database(tmp / f"write-{next(fresh)}.db"))
+        with repo.write_batch(max_pending=habits):
+            for i in range(habits):
+                repo.create_habit(f"Habit {i + 1}", "daily")
+        return repo
+
+    def single(repo):
+        for habit_id, at in rows:
+            repo.add_completion(habit_id, at)
+        repo.close()
+
+    def batched(repo):
+        with repo.write_batch():
+            for habit_id, at in rows:
+                repo.add_completion(habit_id, at)
+        repo.close()
+
+    def bulk(repo):
+        repo.add_completions_bulk(rows)
+        repo.close()
+
+    # every variant writes the same rows, so the timings compare directly
+    results = {
+        f"repo.add_completion x{WRITE_ROWS} (autocommit)": timed(single, repeat, fresh_repo),
+        f"repo.add_completion x{WRITE_ROWS} (write_batch)": timed(batched, repeat, fresh_repo),
+        f"repo.add_completions_bulk x{WRITE_ROWS}": timed(bulk, repeat, fresh_repo),
+    }
+    for r in results.values():
+        r["rows_per_s"] = WRITE_ROWS / r["median_s"]
+    return results
+
+
+def cli_benchmarks(path: Path, repeat: int) -> Dict[str, dict]:
+    results = {}
+    for label, argv in CLI_COMMANDS:
+        results[f"cli: {label}"] = timed(
+            lambda: subprocess.run(
+                cli_argv(path, argv), stdout=subprocess.DEVNULL, check=True
+            ),
+            repeat,
+        )
+    return results
+
+
+# -----------------------------------------
+# Reporting
+# -----------------------------------------
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "numpy": analytics.load_numpy() is not None,
+        "platform": platform.platform(),
+        "date": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def print_results(results: Dict[str, dict]) -> None:
+    width = max(len(name) for name in results)
+    for name, r in results.items():
+        line = f"{name:<{width}}  median {r['median_s'] * 1000:10.1f} ms   min {r['min_s'] * 1000:10.1f} ms"
+        if "rows_per_s" in r:
+            line += f"   {r['rows_per_s']:12,.0f} rows/s"
+        print(line)
+
+
+def compare(before: dict, after: dict) -> None:
+    """Print the median change of every benchmark present in both runs."""
+    common = [name for name in after["results"] if name in before["results"]]
+    if not common:
+        print("No benchmarks in common.")
+        return
+    width = max(len(name) for name in common)
+    for name in common:
+        old = before["results"][name]["median_s"]
+        new = after["results"][name]["median_s"]
+        ratio = new / old if old else float("inf")
+        print(f"{name:<{width}}  {old * 1000:10.1f} ms -> {new * 1000:10.1f} ms   x{ratio:5.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Planner benchmark suite")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data-dir", type=Path, default=Path(tempfile.gettempdir()) / "planner-bench")
+    parser.add_argument("--only", choices=["read", "write", "cli"], action="append",
+                        help="Run only these groups (repeatable)")
+    parser.add_argument("--out", type=Path, help="Write the results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BEFORE", "AFTER"),
+                        help="Compare two result files instead of running")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        before, after = (json.loads(p.read_text()) for p in args.compare)
+        compare(before, after)
+        return
+
+    groups = args.only or ["read", "write", "cli"]
+    habits, completions = SCALES[args.scale]
+    path = dataset_path(args.data_dir, args.scale, args.seed)
+
+    results = {}
+    if "read" in groups:
+        results.update(read_benchmarks(path, args.seed, args.repeat))
+    if "write" in groups:
+        with tempfile.TemporaryDirectory() as tmp:
+            results.update(write_benchmarks(min(habits, 1_000), args.seed, args.repeat, Path(tmp)))
+    if "cli" in groups:
+        results.update(cli_benchmarks(path, args.repeat))
+
+    print_results(results)
+    if args.out:
+        report = {
+            "scale": args.scale,
+            "habits": habits,
+            "completions": completions,
+            "seed": args.seed,
+            "environment": environment(),
+            "results": results,
+        }
+        args.out.write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.out}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,57 @@
 import argparse
-from service import HabitService
+import sys
+import time
+
+# Only argparse is needed to build the parser. The service, repository and
+# analytics modules (and the database) are loaded by run_cli once a command
+# actually needs them, so --help and `send` start fast.
 
 
 def create_parser():
     parser = argparse.ArgumentParser(description="Single Parent Planner CLI")
+    parser.add_argument(
+        "--profile",
+        action="store_const",
+        const="table",
+        help="Print SQL and service timings to stderr after the command",
+    )
+    parser.add_argument(
+        "--profile-json",
+        dest="profile",
+        action="store_const",
+        const="json",
+        help="Like --profile, but print the timings as JSON",
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--db", type=str, help="Database file (default: planner.db)")
+    target.add_argument(
+        "--tenant", type=str, help="Use the database of this tenant (household)"
+    )
+    parser.add_argument(
+        "--tenants-dir", type=str, help="Directory of the tenant databases (default: tenants/)"
+    )
 
     subparsers = parser.add_subparsers(dest="command")
 
     # ------------------ habit add ------------------
     add_parser = subparsers.add_parser("add", help="Add a new habit")
     add_parser.add_argument("name", type=str, help="Name of the habit")
-    add_parser.add_argument("--period", choices=["daily", "weekly"], required=True)
+    add_parser.add_argument("--period", type=periodicity, metavar="PERIOD", required=True)
+    add_parser.add_argument(
+        "--one-per-period",
+        action="store_true",
+        help="Keep at most one completion per period (repeats are ignored)",
+    )
 
     # ------------------ habit list ------------------
     list_parser = subparsers.add_parser("list", help="List habits")
-    list_parser.add_argument("--period", choices=["daily", "weekly"])
+    list_parser.add_argument("--period", type=periodicity, metavar="PERIOD")
     list_parser.add_argument("--all", action="store_true")
     list_parser.add_argument("--archived", action="store_true")
+    list_parser.add_argument("--limit", type=positive_int, help="Show at most N habits")
+    list_parser.add_argument(
+        "--after", type=int, metavar="ID", help="Start after this habit id (next page)"
+    )
 
     # ------------------ habit complete ------------------
     comp_parser = subparsers.add_parser("complete", help="Complete a habit")
@@ -27,6 +62,29 @@ def create_parser():
     archive_parser = subparsers.add_parser("archive", help="Archive a habit")
     archive_parser.add_argument("id", type=int)
 
+    # ------------------ habit unarchive ------------------
+    unarchive_parser = subparsers.add_parser(
+        "unarchive", help="Make an archived habit active again"
+    )
+    unarchive_parser.add_argument("id", type=int)
+
+    # ------------------ maintenance ------------------
+    subparsers.add_parser(
+        "maintenance",
+        help="Move archived habits to cold storage and VACUUM the database",
+    )
+
+    # ------------------ compact ------------------
+    compact_parser = subparsers.add_parser(
+        "compact", help="Keep one completion per period and delete the repeats"
+    )
+    compact_parser.add_argument("--habit", type=int, help="Only this habit (default: all)")
+    compact_parser.add_argument(
+        "--one-per-period",
+        action="store_true",
+        help="Also switch the habits to one-per-period mode, so later repeats are skipped",
+    )
+
     # ------------------ analytics group ------------------
     analytics_parser = subparsers.add_parser("analytics", help="Analytics commands")
     analytics_sub = analytics_parser.add_subparsers(dest="analytics_command")
@@ -35,7 +93,21 @@ def create_parser():
     ana_list_all = analytics_sub.add_parser(
         "list-all", help="List all habits with streak info"
     )
-    ana_list_all.add_argument("--period", choices=["daily", "weekly"])
+    ana_list_all.add_argument("--period", type=periodicity, metavar="PERIOD")
+
+    # analytics top
+    ana_top = analytics_sub.add_parser(
+        "top", help="Habits with the longest streaks (leaderboard)"
+    )
+    ana_top.add_argument(
+        "--k", type=positive_int, default=10, help="How many habits (default: 10)"
+    )
+    ana_top.add_argument("--archived", action="store_true", help="Include archived habits")
+    ana_top.add_argument(
+        "--backend",
+        choices=["materialized", "python", "sql"],
+        help="How to compute streaks (default: materialized)",
+    )
 
     # analytics longest-streak
     ana_longest = analytics_sub.add_parser(
@@ -43,37 +115,222 @@ def create_parser():
         help="Show longest streak overall or for a single habit",
     )
     ana_longest.add_argument("--habit", type=int, help="Habit id (optional)")
+    ana_longest.add_argument(
+        "--backend",
+        choices=["materialized", "python", "sql"],
+        help="How to compute streaks (default: materialized)",
+    )
+
+    # analytics range (time-window queries)
+    ana_range = analytics_sub.add_parser(
+        "range", help="Analytics over a date window (default: the last 4 weeks)"
+    )
+    range_sub = ana_range.add_subparsers(dest="range_command")
+
+    range_rate = range_sub.add_parser(
+        "rate", help="Share of periods with a completion, per habit"
+    )
+    range_rate.add_argument("--period", type=periodicity, metavar="PERIOD")
+    range_heatmap = range_sub.add_parser(
+        "heatmap", help="Completions per day of one habit, week by week"
+    )
+    range_heatmap.add_argument("--habit", type=int, required=True, help="Habit id")
+    range_streak = range_sub.add_parser(
+        "streak", help="Longest and current streak of one habit within the window"
+    )
+    range_streak.add_argument("--habit", type=int, required=True, help="Habit id")
+    for range_parser in (range_rate, range_heatmap, range_streak):
+        range_parser.add_argument(
+            "--from", dest="start", type=iso_date, help="First day (YYYY-MM-DD)"
+        )
+        range_parser.add_argument(
+            "--to", dest="end", type=iso_date, help="Last day (YYYY-MM-DD, default: today)"
+        )
+
+    # analytics snapshot
+    ana_snapshot = analytics_sub.add_parser(
+        "snapshot", help="Streaks for all habits from an exported snapshot (no database)"
+    )
+    ana_snapshot.add_argument("path", type=str, help="Snapshot file")
+
+    # ------------------ export ------------------
+    export_parser = subparsers.add_parser("export", help="Export data")
+    export_sub = export_parser.add_subparsers(dest="export_command")
+    export_snapshot = export_sub.add_parser(
+        "snapshot", help="Write a read-only columnar snapshot for offline analytics"
+    )
+    export_snapshot.add_argument("path", type=str, help="Snapshot file to write")
+
+    # ------------------ bulk import ------------------
+    import_parser = subparsers.add_parser(
+        "import", help="Import completions from a CSV or JSONL file"
+    )
+    import_parser.add_argument("path", type=str, help="File to import ('-' for stdin)")
+    import_parser.add_argument(
+        "--format", choices=["csv", "jsonl"], help="File format (default: from the extension)"
+    )
+    import_parser.add_argument(
+        "--chunk-size", type=positive_int, default=1000, help="Rows per INSERT batch"
+    )
 
     # ------------------ seed fixtures ------------------
     seed_parser = subparsers.add_parser("seed", help="Load example data")
     seed_parser.add_argument("what", choices=["fixtures"], help="What to seed")
 
+    # ------------------ tenants ------------------
+    tenants_parser = subparsers.add_parser(
+        "tenants", help="Summarize all tenant databases in parallel"
+    )
+    tenants_parser.add_argument(
+        "--workers", type=positive_int, help="Worker processes (default: one per CPU)"
+    )
+
+    # ------------------ long-running modes ------------------
+    subparsers.add_parser(
+        "shell", help="Interactive shell that keeps the database open"
+    )
+    serve_parser = subparsers.add_parser(
+        "serve", help="Serve commands on a local Unix socket"
+    )
+    serve_parser.add_argument("--socket", type=str, help="Socket path")
+    send_parser = subparsers.add_parser(
+        "send", help="Send one command to a running 'serve' process"
+    )
+    send_parser.add_argument("--socket", type=str, help="Socket path")
+    send_parser.add_argument(
+        "argv", nargs=argparse.REMAINDER, help="The command, e.g. complete 3"
+    )
+
     return parser
 
 
-def run_cli(args):
-    service = HabitService()
+def iso_date(value: str):
+    """argparse type for YYYY-MM-DD dates."""
+    from datetime import date
+
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {value!r} (use YYYY-MM-DD)")
+
+
+def periodicity(value: str) -> str:
+    """argparse type for daily / weekly / monthly / every-N-days."""
+    from periods import parse_periodicity
+
+    try:
+        return parse_periodicity(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def date_window(args):
+    """Return the (start, end) dates of a range command, defaulting to 4 weeks."""
+    from datetime import datetime, timedelta, timezone
+
+    end = args.end or datetime.now(timezone.utc).date()
+    start = args.start or end - timedelta(days=27)
+    return start, end
+
+
+HEATMAP_DAYS = "Mon Tue Wed Thu Fri Sat Sun"
+
+
+def open_service(args=None):
+    """
+    Open the database chosen by --db / --tenant (default: planner.db),
+    migrating only if it is behind, and build the service.
+    """
+    if getattr(args, "tenant", None):
+        from tenants import TenantRouter
 
+        return TenantRouter(args.tenants_dir).service(args.tenant)
+
+    from db import open_database
+    from repository import HabitRepository
+    from service import HabitService
+
+    path = getattr(args, "db", None)
+    return HabitService(repo=HabitRepository(conn=open_database(path)))
+
+
+def run_cli(args, service=None):
+    if args.command == "send":
+        # talks to the server only; no database needed here
+        from server import SOCKET_PATH, send_command
+
+        print(send_command(args.argv, args.socket or SOCKET_PATH), end="")
+        return
+
+    if args.command == "analytics" and args.analytics_command == "snapshot":
+        # reads the snapshot file only; SQLite is never opened
+        run_snapshot_analytics(args)
+        return
+
+    if args.command == "tenants":
+        # works on all tenant databases, not on one service
+        run_tenants_command(args)
+        return
+
+    service = service or open_service(args)
+
+    if not getattr(args, "profile", None):
+        run_command(args, service)
+        return
+
+    from profiling import Profiler
+
+    profiler = Profiler()
+    profiler.attach(service)
+    try:
+        run_command(args, service)
+    finally:
+        Profiler.detach(service)
+        profiler.counters["streak_cache"] = service.streak_cache.stats()
+        report = profiler.to_json() if args.profile == "json" else profiler.summary()
+        print(report, file=sys.stderr)
+
+
+def run_command(args, service):
     if args.command == "add":
-        habit = service.create_habit(args.name, args.period)
+        habit = service.create_habit(args.name, args.period, args.one_per_period)
         print(f"Habit added: {habit.id} - {habit.name}")
 
     elif args.command == "list":
         habits = service.list_habits(
             include_archived=args.all or args.archived,
             periodicity=args.period,
+            after=args.after,
+            limit=args.limit,
         )
         for h in habits:
             print(f"[{h.id}] {h.name} ({h.periodicity}), archived={h.is_archived}")
+        if args.limit is not None and len(habits) == args.limit:
+            print(f"Next page: --after {habits[-1].id}", file=sys.stderr)
 
     elif args.command == "complete":
-        # add a completion (now or at a custom time)
+        # add a completion (now or at a custom time); for a one-per-period
+        # habit the period's earlier completion comes back instead
         if args.at:
-            comp = service.add_completion_at(args.id, args.at)
+            comp, created = service.add_completion_at(args.id, args.at)
         else:
-            comp = service.add_completion_now(args.id)
+            comp, created = service.add_completion_now(args.id)
 
-        print(f"Completion added at {comp.completed_at}")
+        if created:
+            print(f"Completion added at {comp.completed_at}")
+        else:
+            print(f"Already completed this period at {comp.completed_at}")
 
         # compute current longest streak for this habit
         streak = service.longest_streak_for_habit(args.id)
@@ -84,24 +341,59 @@ def run_cli(args):
         service.archive_habit(args.id)
         print(f"Habit {args.id} archived.")
 
+    elif args.command == "unarchive":
+        service.unarchive_habit(args.id)
+        print(f"Habit {args.id} restored.")
+
+    elif args.command == "maintenance":
+        report = service.maintenance()
+        print(
+            f"Moved {report.completions_moved} completions of "
+            f"{report.habits_moved} archived habits to cold storage."
+        )
+        print(
+            f"Database: {report.size_before / 1024:,.0f} KiB -> "
+            f"{report.size_after / 1024:,.0f} KiB "
+            f"({report.reclaimed / 1024:,.0f} KiB reclaimed)."
+        )
+
+    elif args.command == "compact":
+        removed = service.compact(args.habit, one_per_period=args.one_per_period)
+        print(f"Removed {removed} repeated completions.")
+
     elif args.command == "analytics":
         if args.analytics_command == "list-all":
-            habits = service.list_habits(
-                include_archived=False,
-                periodicity=args.period,
+            report = service.streak_report(periodicity=args.period)
+            for row in report:
+                h = row.habit
+                print(
+                    f"[{h.id}] {h.name} ({h.periodicity}) - longest streak: "
+                    f"{row.longest_streak}, current streak: {row.current_streak}"
+                )
+
+        elif args.analytics_command == "top":
+            top = service.top_streaks(
+                args.k, backend=args.backend, include_archived=args.archived
             )
-            for h in habits:
-                longest = service.longest_streak_for_habit(h.id)
+            if not top:
+                print("No habits/completions yet.")
+            for rank, row in enumerate(top, start=1):
+                h = row.habit
                 print(
-                    f"[{h.id}] {h.name} ({h.periodicity}) - longest streak: {longest}"
+                    f"{rank}. [{h.id}] {h.name} ({h.periodicity}) - longest streak: "
+                    f"{row.longest_streak}, current streak: {row.current_streak}"
                 )
 
         elif args.analytics_command == "longest-streak":
             if args.habit:
-                streak = service.longest_streak_for_habit(args.habit)
+                streak = service.longest_streak_for_habit(
+                    args.habit, backend=args.backend
+                )
                 print(f"Longest streak for habit {args.habit}: {streak}")
             else:
-                best_habit, best_streak = service.longest_streak_overall()
+                best_habit, best_streak = service.longest_streak_overall(
+                    backend=args.backend
+                )
                 if best_habit is None:
                     print("No habits/completions yet.")
                 else:
@@ -109,8 +401,126 @@ def run_cli(args):
                         f"Longest streak overall: {best_streak} ({best_habit.name})"
                     )
 
+        elif args.analytics_command == "range":
+            run_range_command(args, service)
+
+    elif args.command == "export":
+        if args.export_command == "snapshot":
+            from snapshot import write_snapshot
+
+            start = time.perf_counter()
+            count = write_snapshot(service.repo, args.path)
+            print(
+                f"Wrote {count} completions to {args.path} "
+                f"in {time.perf_counter() - start:.2f}s."
+            )
+
+    elif args.command == "import":
+        from importer import read_completions
+
+        start = time.perf_counter()
+
+        def report(rows: int) -> None:
+            rate = rows / max(time.perf_counter() - start, 1e-9)
+            print(f"\r{rows} rows ({rate:,.0f} rows/s)", end="", file=sys.stderr, flush=True)
+
+        count = service.import_completions(
+            read_completions(args.path, args.format),
+            chunk_size=args.chunk_size,
+            on_progress=report,
+        )
+        elapsed = time.perf_counter() - start
+        if count:
+            print(file=sys.stderr)
+        print(
+            f"Imported {count} completions in {elapsed:.2f}s "
+            f"({count / max(elapsed, 1e-9):,.0f} rows/s)."
+        )
+
     elif args.command == "seed":
         if args.what == "fixtures":
             from fixtures import seed_fixtures
 
-            seed_fixtures()
\ No newline at end of file
+            seed_fixtures(service)
+
+    elif args.command == "shell":
+        from server import run_shell
+
+        run_shell(create_parser(), service)
+
+    elif args.command == "serve":
+        from server import SOCKET_PATH, serve
+
+        serve(create_parser(), service, args.socket or SOCKET_PATH)
+
+
+def run_range_command(args, service):
+    start, end = date_window(args)
+
+    if args.range_command == "rate":
+        for row in service.completion_rates(start, end, periodicity=args.period):
+            h = row.habit
+            print(
+                f"[{h.id}] {h.name} ({h.periodicity}) - {row.completed_periods}/"
+                f"{row.total_periods} periods ({row.rate:.0%})"
+            )
+
+    elif args.range_command == "heatmap":
+        weeks = service.heatmap(args.habit, start, end)
+        print(f"Habit {args.habit}, {start} to {end}")
+        print(f"{'Week of':<10}  {HEATMAP_DAYS}")
+        for monday, days in weeks:
+            cells = [
+                "" if n is None else "." if n == 0 else str(n) if n < 10 else "+"
+                for n in days
+            ]
+            print(f"{monday.isoformat():<10}  " + " ".join(f"{c:>3}" for c in cells))
+
+    elif args.range_command == "streak":
+        summary = service.streaks_in_window(args.habit, start, end)
+        print(
+            f"Habit {args.habit}, {start} to {end} - longest streak: "
+            f"{summary.longest_streak}, current streak: {summary.current_streak}"
+        )
+
+
+def run_tenants_command(args):
+    from tenants import TenantRouter, merge_longest_streaks
+
+    router = TenantRouter(args.tenants_dir)
+    summaries = router.summaries(max_workers=args.workers)
+    if not summaries:
+        print(f"No tenant databases in {router.root}.")
+        return
+
+    for s in summaries:
+        best = f"{s.best_streak} ({s.best_habit.name})" if s.best_habit else "-"
+        print(
+            f"{s.tenant}: {s.habits} habits, {s.completions} completions, "
+            f"longest streak: {best}"
+        )
+    tenant, habit, streak = merge_longest_streaks(summaries)
+    if habit is not None:
+        print(f"Longest streak across tenants: {streak} ({habit.name}, {tenant})")
+
+
+def run_snapshot_analytics(args):
+    from datetime import datetime, timezone
+
+    from analytics import live_streak, period_ordinal
+    from snapshot import Snapshot
+
+    now = datetime.now(timezone.utc).isoformat()
+    with Snapshot(args.path) as snap:
+        taken = datetime.fromtimestamp(snap.created_ts, timezone.utc)
+        print(f"Snapshot of {taken:%Y-%m-%d %H:%M} UTC, {snap.count} completions")
+        streaks = snap.streaks()
+        for h in snap.habits:
+            if h.is_archived:
+                continue
+            current, longest, last_period = streaks.get(h.id, (0, 0, None))
+            current = live_streak(current, last_period, period_ordinal(now, h.periodicity))
+            print(
+                f"[{h.id}] {h.name} ({h.periodicity}) - longest streak: "
+                f"{longest}, current streak: {current}"
+            )
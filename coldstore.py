@@ -0,0 +1,44 @@
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+from typing import List, Sequence, Tuple
+
+# Compressed encoding of one habit's completion history for the
+# cold_completions table (see HabitRepository.move_to_cold).
+#
+# The history is a list of (completion id, completed_ts) pairs ordered by
+# (completed_ts, id). Both columns are stored as deltas, which are small
+# and repetitive for habits done about once a period, as two int64 arrays
+# (little-endian) compressed with zlib. day_ord / week_ord / period_ord are
+# derived from completed_ts again on restore.
+
+COMPRESSION_LEVEL = 9
+
+
+def pack_history(rows: Sequence[Tuple[int, int]]) -> bytes:
+    """Encode (id, completed_ts) pairs ordered by (completed_ts, id)."""
+    ids = array("q", _deltas(r[0] for r in rows))
+    stamps = array("q", _deltas(r[1] for r in rows))
+    if sys.byteorder != "little":
+        ids.byteswap()
+        stamps.byteswap()
+    return zlib.compress(ids.tobytes() + stamps.tobytes(), COMPRESSION_LEVEL)
+
+
+def unpack_history(blob: bytes) -> List[Tuple[int, int]]:
+    """Decode pack_history() output back into (id, completed_ts) pairs."""
+    column = array("q", zlib.decompress(blob))
+    if sys.byteorder != "little":
+        column.byteswap()
+    half = len(column) // 2
+    return list(zip(accumulate(column[:half]), accumulate(column[half:])))
+
+
+def _deltas(values) -> List[int]:
+    previous = 0
+    out = []
+    for value in values:
+        out.append(value - previous)
+        previous = value
+    return out
@@ -0,0 +1,68 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from db import MEMORY, get_connection, migrate
+from repository import HabitRepository
+from service import HabitService
+
+
+@pytest.fixture
+def make_repo():
+    """
+    Create repositories on private, migrated in-memory databases.
+    Their connections may be used from any thread (e.g. a test server).
+    """
+    repos = []
+
+    def make() -> HabitRepository:
+        conn = get_connection(MEMORY, check_same_thread=False)
+        migrate(conn)
+        repos.append(HabitRepository(conn=conn))
+        return repos[-1]
+
+    yield make
+    for repo in repos:
+        repo.close()
+
+
+@pytest.fixture
+def repo(make_repo):
+    """A repository on a private, migrated in-memory database."""
+    return make_repo()
+
+
+@pytest.fixture
+def make_service(make_repo):
+    """Create services, each on its own make_repo() database."""
+    return lambda: HabitService(repo=make_repo())
+
+
+@pytest.fixture
+def service(repo):
+    """A service on the `repo` fixture's database."""
+    return HabitService(repo=repo)
+
+
+@pytest.fixture
+def seed_random():
+    """seed_random(service, seed): add random habits with gaps, repeats and backfills."""
+
+    def seed_random(service: HabitService, seed: int) -> list:
+        rng = random.Random(seed)
+        start = datetime(2023, 12, 1, tzinfo=timezone.utc)
+        habits = []
+        for i in range(8):
+            habit = service.create_habit(
+                f"h{i}", rng.choice(["daily", "weekly", "monthly", "every-3-days"])
+            )
+            days = sorted(rng.sample(range(90), rng.randint(0, 40)))
+            rng.shuffle(days)  # out-of-order backfills
+            for day in days:
+                at = start + timedelta(days=day, hours=rng.randint(0, 23))
+                service.add_completion_at(habit.id, at.isoformat())
+            habits.append(habit)
+        return habits
+
+    return seed_random
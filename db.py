@@ -1,24 +1,128 @@
+import math
 import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
 from pathlib import Path
+from typing import Callable, List, Optional, Union
+
+from periods import period_from_day
 
 # Path to the database file
 DB_PATH = Path(__file__).parent / "planner.db"
 
+# Special paths for get_connection: a private in-memory database, or a
+# private temporary file that SQLite deletes when the connection closes
+# (spills to disk only under memory pressure). Neither is shared between
+# connections, so they cannot be used with a ConnectionPool.
+MEMORY = ":memory:"
+TEMPORARY = ""
+
+
+@dataclass(frozen=True)
+class PragmaProfile:
+    """PRAGMA settings applied to every new connection."""
+    journal_mode: str = "WAL"        # readers don't block the writer (and vice versa)
+    synchronous: str = "NORMAL"      # safe with WAL, far fewer fsyncs than FULL
+    cache_size: int = -16000         # page cache; negative means KiB (here ~16 MB)
+    mmap_size: int = 64 * 1024 * 1024
+    busy_timeout: int = 5000         # ms to wait for a lock instead of failing
+    foreign_keys: bool = True        # enforce habit_id references (and cascades)
+
+    def apply(self, conn: sqlite3.Connection) -> None:
+        """Apply the profile to an open connection."""
+        # PRAGMA does not accept bound parameters; the values come from code
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if self.foreign_keys else 'OFF'}")
 
-def get_connection() -> sqlite3.Connection:
-    """Create and return a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
+
+DEFAULT_PRAGMAS = PragmaProfile()
+
+
+def get_connection(
+    path: Optional[Union[str, Path]] = None,
+    pragmas: Optional[PragmaProfile] = DEFAULT_PRAGMAS,
+    check_same_thread: bool = True,
+) -> sqlite3.Connection:
+    """
+    Create and return a connection to the SQLite database: the file at
+    `path` (default: planner.db), or MEMORY / TEMPORARY.
+    """
+    conn = sqlite3.connect(
+        DB_PATH if path is None else path, check_same_thread=check_same_thread
+    )
     conn.row_factory = sqlite3.Row
+    register_functions(conn)
+    if pragmas is not None:
+        pragmas.apply(conn)
     return conn
 
 
-def init_db() -> None:
-    """Initialize the database with habits and completions tables."""
-    conn = get_connection()
-    cur = conn.cursor()
+def register_functions(conn: sqlite3.Connection) -> None:
+    """
+    Define the SQL functions queries rely on:
+    period_of(day_ord, periodicity) -> period ordinal (see periods.py).
+    """
+    conn.create_function("period_of", 2, period_from_day, deterministic=True)
+
+
+class ConnectionPool:
+    """
+    Hands out one connection per thread for the same database file.
+    A thread always gets back its own connection, so repositories and
+    services can be shared by a thread pool without sharing a connection.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        pragmas: Optional[PragmaProfile] = DEFAULT_PRAGMAS,
+    ) -> None:
+        if path in (MEMORY, TEMPORARY):
+            raise ValueError("A pool needs a database file that connections can share.")
+        self.path = DB_PATH if path is None else path
+        self.pragmas = pragmas
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # only the owning thread uses it; the flag just lets close_all() close it
+            conn = get_connection(self.path, self.pragmas, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close_all(self) -> None:
+        """Close every connection handed out by this pool."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+# -----------------------------------------
+# Schema migrations
+# -----------------------------------------
+# Each migration upgrades the schema by exactly one version. The version that
+# has been applied is stored in the database header via PRAGMA user_version,
+# so existing planner.db files are upgraded in place the next time they are
+# opened. Only ever append to MIGRATIONS – never edit a released step.
 
-    # Create habits table
-    cur.execute(
+
+def _migration_1_base_tables(conn: sqlite3.Connection) -> None:
+    """Create the habits and completions tables."""
+    conn.execute(
         """
         CREATE TABLE IF NOT EXISTS habits (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -29,9 +133,7 @@ def init_db() -> None:
         );
         """
     )
-
-    # Create completions table
-    cur.execute(
+    conn.execute(
         """
         CREATE TABLE IF NOT EXISTS completions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -42,5 +144,427 @@ def init_db() -> None:
         """
     )
 
-    conn.commit()
-    conn.close()
\ No newline at end of file
+
+def _migration_2_completion_indexes(conn: sqlite3.Connection) -> None:
+    """Add the indexes used by the completion queries in the repository."""
+    # per-habit history, ordered by time (list_completions_for_habit)
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_completions_habit_time
+        ON completions (habit_id, completed_at);
+        """
+    )
+    # global history, ordered by time (list_all_completions)
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_completions_time
+        ON completions (completed_at);
+        """
+    )
+
+
+def _migration_3_streak_state(conn: sqlite3.Connection) -> None:
+    """Add the materialized per-habit streak state."""
+    # Rows are written by the repository together with each completion.
+    # Habits that existed before this migration get their row rebuilt from
+    # their history the first time it is needed.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS habit_streaks (
+            habit_id INTEGER PRIMARY KEY,
+            current_streak INTEGER NOT NULL DEFAULT 0,
+            longest_streak INTEGER NOT NULL DEFAULT 0,
+            last_period INTEGER,
+            FOREIGN KEY (habit_id) REFERENCES habits (id) ON DELETE CASCADE
+        );
+        """
+    )
+
+
+def _migration_4_epoch_timestamps(conn: sqlite3.Connection) -> None:
+    """
+    Store completion times as integer UTC epoch seconds plus precomputed
+    day and ISO-week ordinals instead of ISO text.
+    """
+    conn.execute(
+        """
+        CREATE TABLE completions_v4 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            habit_id INTEGER NOT NULL,
+            completed_ts INTEGER NOT NULL,  -- UTC epoch seconds
+            day_ord INTEGER NOT NULL,       -- date.toordinal() of the UTC day
+            week_ord INTEGER NOT NULL,      -- (day_ord - 1) / 7, counts ISO weeks
+            FOREIGN KEY (habit_id) REFERENCES habits (id) ON DELETE CASCADE
+        );
+        """
+    )
+    # SQLite's date functions convert "+HH:MM" offsets to UTC and read
+    # naive times as UTC, like models.iso_to_epoch; julianday is always
+    # positive here, so CAST truncation is a floor
+    conn.execute(
+        """
+        INSERT INTO completions_v4 (id, habit_id, completed_ts, day_ord, week_ord)
+        SELECT id, habit_id, ts, day, (day - 1) / 7
+        FROM (
+            SELECT
+                id,
+                habit_id,
+                CAST(strftime('%s', completed_at) AS INTEGER) AS ts,
+                CAST(julianday(completed_at) - 1721424.5 AS INTEGER) AS day
+            FROM completions
+        )
+        WHERE ts IS NOT NULL
+        """
+    )
+    # anything SQLite could not parse goes through Python's parser
+    leftovers = conn.execute(
+        """
+        SELECT id, habit_id, completed_at FROM completions
+        WHERE strftime('%s', completed_at) IS NULL
+        """
+    ).fetchall()
+    for row_id, habit_id, completed_at in leftovers:
+        dt = datetime.fromisoformat(completed_at)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        ts = math.floor(dt.timestamp())
+        day = ts // 86400 + date(1970, 1, 1).toordinal()
+        conn.execute(
+            """
+            INSERT INTO completions_v4 (id, habit_id, completed_ts, day_ord, week_ord)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (row_id, habit_id, ts, day, (day - 1) // 7),
+        )
+
+    conn.execute("DROP TABLE completions")
+    conn.execute("ALTER TABLE completions_v4 RENAME TO completions")
+    conn.execute(
+        """
+        CREATE INDEX idx_completions_habit_time
+        ON completions (habit_id, completed_ts);
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX idx_completions_time
+        ON completions (completed_ts);
+        """
+    )
+    # days are now UTC days; stored streaks are rebuilt lazily on next use
+    conn.execute("DELETE FROM habit_streaks")
+
+
+def _migration_5_period_counts(conn: sqlite3.Connection) -> None:
+    """
+    Add the per-period rollup of completion counts, so that time-range
+    analytics read one row per period instead of the raw history.
+    """
+    # Every completion counts once in its day and once in its ISO week;
+    # the repository keeps the counts in step with each write.
+    conn.execute(
+        """
+        CREATE TABLE period_counts (
+            habit_id INTEGER NOT NULL,
+            period_kind TEXT NOT NULL,      -- 'daily' or 'weekly'
+            period_ord INTEGER NOT NULL,    -- periods.period_from_day
+            count INTEGER NOT NULL,
+            PRIMARY KEY (habit_id, period_kind, period_ord),
+            FOREIGN KEY (habit_id) REFERENCES habits (id) ON DELETE CASCADE
+        ) WITHOUT ROWID;
+        """
+    )
+    # windows across all habits (the primary key serves single habits)
+    conn.execute(
+        """
+        CREATE INDEX idx_period_counts_period
+        ON period_counts (period_kind, period_ord);
+        """
+    )
+    fill_period_counts(conn)
+
+
+def fill_period_counts(
+    conn: sqlite3.Connection, habit_ids: Optional[List[int]] = None
+) -> None:
+    """(Re)build period_counts from the completions table (all or some habits)."""
+    where, params = "", []
+    if habit_ids is not None:
+        where = f"WHERE habit_id IN ({', '.join('?' for _ in habit_ids)})"
+        params = list(habit_ids)
+    conn.execute(f"DELETE FROM period_counts {where}", params)
+    conn.execute(
+        f"""
+        INSERT INTO period_counts (habit_id, period_kind, period_ord, count)
+        SELECT habit_id, 'daily', day_ord, COUNT(*)
+        FROM completions {where} GROUP BY habit_id, day_ord
+        """,
+        params,
+    )
+    conn.execute(
+        f"""
+        INSERT INTO period_counts (habit_id, period_kind, period_ord, count)
+        SELECT habit_id, 'weekly', week_ord, COUNT(*)
+        FROM completions {where} GROUP BY habit_id, week_ord
+        """,
+        params,
+    )
+
+
+def _migration_6_custom_periodicities(conn: sqlite3.Connection) -> None:
+    """
+    Allow 'monthly' and 'every-N-days' habits (see periods.py).
+    A CHECK constraint cannot be altered, so the habits table is rebuilt;
+    migrate() turns foreign keys off while it runs, so nothing cascades.
+    """
+    row = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'habits'"
+    ).fetchone()
+    conn.execute(
+        """
+        CREATE TABLE habits_v6 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            periodicity TEXT NOT NULL CHECK (
+                periodicity IN ('daily', 'weekly', 'monthly')
+                OR (
+                    periodicity GLOB 'every-[1-9]*-days'
+                    AND substr(periodicity, 7, length(periodicity) - 11)
+                        NOT GLOB '*[^0-9]*'
+                )
+            ),
+            created_at TEXT NOT NULL,
+            is_archived INTEGER NOT NULL DEFAULT 0
+        );
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO habits_v6 (id, name, periodicity, created_at, is_archived)
+        SELECT id, name, periodicity, created_at, is_archived FROM habits
+        """
+    )
+    conn.execute("DROP TABLE habits")
+    conn.execute("ALTER TABLE habits_v6 RENAME TO habits")
+    if row is not None:
+        # keep ids of deleted habits from being handed out again
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'habits'")
+        conn.execute(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES ('habits', ?)", (row[0],)
+        )
+
+
+def _migration_7_one_per_period(conn: sqlite3.Connection) -> None:
+    """
+    Optional one-completion-per-period mode. Completions of habits in that
+    mode store their period ordinal, which a partial unique index keeps
+    unique per habit; other completions leave it NULL and are not limited.
+    """
+    conn.execute(
+        "ALTER TABLE habits ADD COLUMN one_per_period INTEGER NOT NULL DEFAULT 0"
+    )
+    conn.execute("ALTER TABLE completions ADD COLUMN period_ord INTEGER")
+    conn.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_completions_one_per_period
+        ON completions (habit_id, period_ord)
+        WHERE period_ord IS NOT NULL
+        """
+    )
+
+
+def _migration_8_cold_storage(conn: sqlite3.Connection) -> None:
+    """
+    Cold storage for archived habits: their completions leave the hot
+    completions table and are kept as one compressed history per habit
+    (see coldstore.py), next to a summary of the habit's final streaks.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS cold_completions (
+            habit_id INTEGER PRIMARY KEY,
+            completions INTEGER NOT NULL,   -- number of completions in history
+            first_ts INTEGER,               -- first and last completion (UTC epoch)
+            last_ts INTEGER,
+            current_streak INTEGER NOT NULL,
+            longest_streak INTEGER NOT NULL,
+            last_period INTEGER,
+            moved_ts INTEGER NOT NULL,      -- when the history was moved here
+            history BLOB NOT NULL,          -- coldstore.pack_history()
+            FOREIGN KEY (habit_id) REFERENCES habits (id) ON DELETE CASCADE
+        );
+        """
+    )
+
+
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _migration_1_base_tables,
+    _migration_2_completion_indexes,
+    _migration_3_streak_state,
+    _migration_4_epoch_timestamps,
+    _migration_5_period_counts,
+    _migration_6_custom_periodicities,
+    _migration_7_one_per_period,
+    _migration_8_cold_storage,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the schema version stored in the database header."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _delete_orphans(conn: sqlite3.Connection) -> None:
+    """
+    Delete rows of habits that no longer exist. Older versions deleted
+    habits with foreign keys off, so their completions (and rollup and
+    streak rows) stayed behind; the migrations check the keys after each step.
+    """
+    # every foreign key in the schema is habit_id -> habits (id)
+    tables = {row[0] for row in conn.execute("PRAGMA foreign_key_check")}
+    for table in sorted(tables):
+        conn.execute(
+            f"DELETE FROM {table} WHERE habit_id NOT IN (SELECT id FROM habits)"
+        )
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Apply all pending migrations to an open connection.
+    Every step runs in its own transaction together with the version bump,
+    so a failed step leaves the database at the previous version.
+    Returns the schema version after migrating.
+    """
+    version = get_schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this app "
+            f"supports ({SCHEMA_VERSION})."
+        )
+
+    if version == SCHEMA_VERSION:
+        return version
+
+    # Steps may rebuild tables that others reference; with foreign keys on,
+    # dropping the old table would cascade. The pragma only takes effect
+    # outside a transaction, and each step checks the keys before commit.
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        conn.execute("BEGIN")
+        try:
+            _delete_orphans(conn)
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        for number in range(version + 1, SCHEMA_VERSION + 1):
+            step = MIGRATIONS[number - 1]
+            conn.execute("BEGIN")
+            try:
+                step(conn)
+                if conn.execute("PRAGMA foreign_key_check").fetchone() is not None:
+                    raise RuntimeError(
+                        f"Migration {number} left dangling foreign keys."
+                    )
+                # PRAGMA does not accept bound parameters; number is an int we control
+                conn.execute(f"PRAGMA user_version = {number}")
+            except Exception:
+                conn.rollback()
+                raise
+            conn.commit()
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {int(foreign_keys)}")
+
+    return SCHEMA_VERSION
+
+
+def open_database(
+    path: Optional[Union[str, Path]] = None,
+    pragmas: Optional[PragmaProfile] = DEFAULT_PRAGMAS,
+) -> sqlite3.Connection:
+    """
+    Open a connection to a database with the latest schema.
+    When the stored version is already current (the usual case) this is a
+    single header read and no DDL runs.
+    """
+    conn = get_connection(path, pragmas)
+    migrate(conn)
+    return conn
+
+
+def load_into_memory(
+    path: Optional[Union[str, Path]] = None,
+    pragmas: Optional[PragmaProfile] = DEFAULT_PRAGMAS,
+) -> sqlite3.Connection:
+    """
+    Open an in-memory database holding a copy of the database at `path`
+    (copied page by page with the backup API; empty if there is no file),
+    with the latest schema. Use save_database to write it back.
+    The connection may be used by other threads.
+    """
+    conn = get_connection(MEMORY, pragmas, check_same_thread=False)
+    if path is not None and Path(path).exists():
+        source = get_connection(path, pragmas=None)
+        try:
+            source.backup(conn)
+        finally:
+            source.close()
+    migrate(conn)
+    return conn
+
+
+def save_database(conn: sqlite3.Connection, path: Union[str, Path]) -> None:
+    """
+    Copy a (typically in-memory) database to the file at `path` with the
+    backup API. The copy replaces the file's contents in one transaction,
+    so readers of the file see either the old or the new state.
+    Uncommitted changes of `conn` are not meant to be saved: commit first.
+    """
+    target = get_connection(path, pragmas=None)
+    try:
+        conn.backup(target)
+    finally:
+        target.close()
+
+
+class PeriodicCheckpoint:
+    """
+    Saves an in-memory database to disk at most every `interval` seconds,
+    and once more when closed. The owner calls after_commit() after each
+    commit, on the thread that writes, so a save never sees a transaction
+    in progress; no other thread touches the connection.
+    """
+
+    def __init__(
+        self, conn: sqlite3.Connection, path: Union[str, Path], interval: float = 30.0
+    ) -> None:
+        self.conn = conn
+        self.path = path
+        self.interval = interval
+        self.saves = 0
+        self._saved_at = time.monotonic()
+
+    def after_commit(self) -> None:
+        """Save if the last save is `interval` seconds old."""
+        if self.conn.in_transaction:
+            return
+        if time.monotonic() - self._saved_at >= self.interval:
+            self.save()
+
+    def save(self) -> None:
+        """Save the database now."""
+        save_database(self.conn, self.path)
+        self.saves += 1
+        self._saved_at = time.monotonic()
+
+    def close(self) -> None:
+        """Save a final time."""
+        self.save()
+
+
+def init_db(path: Optional[Union[str, Path]] = None) -> None:
+    """Initialize the database and upgrade it to the latest schema version."""
+    open_database(path).close()
@@ -1,14 +1,15 @@
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 
 from service import HabitService
 
 
-def seed_fixtures() -> None:
+def seed_fixtures(service: Optional[HabitService] = None) -> None:
     """
     Create the 5 predefined habits and add 4 weeks of example completions.
     This is only meant for demo/analytics screenshots.
     """
-    service = HabitService()
+    service = service or HabitService()
 
     # If there are already habits, do not create duplicates
     existing = service.list_habits(include_archived=True)
@@ -29,23 +30,24 @@ def seed_fixtures() -> None:
 
     created = []
     for name, period in habits_def:
-        habit = service.create_habit(name, period)
+        habit = service.create_habit(name, period, one_per_period=True)
         created.append((habit, period))
         print(f"Created habit [{habit.id}] {habit.name} ({period})")
 
     # Add completions: 28 days for daily habits, 4 weeks for weekly habits
-    for habit, period in created:
-        if period == "daily":
-            # last 28 days -> nice daily streaks
-            for i in range(28):
-                day = today - timedelta(days=i)
+    def completions():
+        for habit, period in created:
+            if period == "daily":
+                # last 28 days -> nice daily streaks
+                days = [today - timedelta(days=i) for i in range(28)]
+            else:
+                # last 4 weeks -> weekly streaks
+                days = [today - timedelta(days=7 * i) for i in range(4)]
+            for day in days:
                 dt = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
-                service.add_completion_at(habit.id, dt.isoformat())
-        else:
-            # last 4 weeks -> weekly streaks
-            for i in range(4):
-                day = today - timedelta(days=7 * i)
-                dt = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
-                service.add_completion_at(habit.id, dt.isoformat())
+                yield habit.id, dt.isoformat()
+
+    # one bulk transaction instead of one commit per completion
+    service.import_completions(completions())
 
     print("Seeded 5 habits with 4 weeks of example completions.")
\ No newline at end of file
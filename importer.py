@@ -0,0 +1,62 @@
+import csv
+import json
+import sys
+from contextlib import contextmanager
+from typing import Iterator, Optional, TextIO, Tuple
+
+FORMATS = ("csv", "jsonl")
+
+
+def guess_format(path: str) -> str:
+    """Pick the file format from the extension (CSV unless it looks like JSONL)."""
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+@contextmanager
+def _open(path: str) -> Iterator[TextIO]:
+    # "-" reads from standard input
+    if path == "-":
+        yield sys.stdin
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        yield f
+
+
+def read_completions(path: str, fmt: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Stream (habit_id, completed_at) records from a CSV or JSONL file.
+
+    CSV files need a header with `habit_id` and `completed_at` columns.
+    JSONL files hold one object per line with the same two keys.
+    Records are yielded one at a time, so files of any size can be read.
+    """
+    fmt = fmt or guess_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Format must be one of: {', '.join(FORMATS)}.")
+
+    with _open(path) as f:
+        if fmt == "csv":
+            # line 1 is the header
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield _parse_record(row, line_no)
+        else:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    raise ValueError(f"Line {line_no}: invalid JSON ({exc.msg}).") from None
+                yield _parse_record(record, line_no)
+
+
+def _parse_record(record, line_no: int) -> Tuple[int, str]:
+    try:
+        return int(record["habit_id"]), str(record["completed_at"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(
+            f"Line {line_no}: expected integer 'habit_id' and 'completed_at'."
+        ) from None
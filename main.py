@@ -1,9 +1,8 @@
-from db import init_db
 from cli import create_parser, run_cli
 
 
 def main():
-    init_db()
+    # the database is only opened (and migrated if needed) by commands that use it
     parser = create_parser()
     args = parser.parse_args()
 
@@ -14,4 +13,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
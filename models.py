@@ -1,15 +1,70 @@
+import math
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Optional
 
+# date(1970, 1, 1).toordinal(): day ordinal of the Unix epoch
+EPOCH_DAY_ORDINAL = 719163
 
-@dataclass
-class Habit:
-    id: Optional[int]      # database id (None before it is saved)
-    name: str              # habit name
-    periodicity: str       # "daily" or "weekly"
-    created_at: str        # timestamp in UTC (ISO string)
-    is_archived: bool = False
+
+# -----------------------------------------
+# Timestamp helpers (UTC epoch seconds)
+# -----------------------------------------
+def iso_to_epoch(iso: str) -> int:
+    """Parse an ISO timestamp into UTC epoch seconds (naive times are UTC)."""
+    dt = datetime.fromisoformat(iso)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return math.floor(dt.timestamp())
+
+
+def epoch_to_iso(ts: int) -> str:
+    """Format UTC epoch seconds as an ISO string."""
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def epoch_day_ordinal(ts: int) -> int:
+    """Return the day ordinal (as date.toordinal) of the UTC day of `ts`."""
+    return ts // 86400 + EPOCH_DAY_ORDINAL
+
+
+class _Record:
+    """
+    Base for slot-based models: no per-instance __dict__, and __repr__ /
+    __eq__ generated from __slots__ like a dataclass would.
+    """
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+
+class Habit(_Record):
+    __slots__ = (
+        "id", "name", "periodicity", "created_at", "is_archived", "one_per_period"
+    )
+
+    def __init__(
+        self,
+        id: Optional[int],     # database id (None before it is saved)
+        name: str,             # habit name
+        periodicity: str,      # "daily", "weekly", "monthly" or "every-N-days"
+        created_at: str,       # timestamp in UTC (ISO string)
+        is_archived: bool = False,
+        one_per_period: bool = False,  # keep at most one completion per period
+    ) -> None:
+        self.id = id
+        self.name = name
+        self.periodicity = periodicity
+        self.created_at = created_at
+        self.is_archived = is_archived
+        self.one_per_period = one_per_period
 
     @staticmethod
     def now_utc_iso() -> str:
@@ -17,8 +72,72 @@ class Habit:
         return datetime.now(timezone.utc).isoformat()
 
 
+class Completion(_Record):
+    __slots__ = ("id", "habit_id", "completed_ts")
+
+    def __init__(
+        self,
+        id: Optional[int],                   # database id (None before it is saved)
+        habit_id: int,                       # id of the related habit
+        completed_at: Optional[str] = None,  # timestamp as an ISO string, or ...
+        completed_ts: Optional[int] = None,  # ... as UTC epoch seconds (as stored)
+    ) -> None:
+        if (completed_at is None) == (completed_ts is None):
+            raise ValueError("Pass exactly one of completed_at or completed_ts.")
+        self.id = id
+        self.habit_id = habit_id
+        self.completed_ts = (
+            completed_ts if completed_ts is not None else iso_to_epoch(completed_at)
+        )
+
+    @property
+    def completed_at(self) -> str:
+        """Timestamp in UTC (ISO string)."""
+        return epoch_to_iso(self.completed_ts)
+
+
+@dataclass
+class StreakState:
+    habit_id: int              # id of the related habit
+    current_streak: int        # run ending in the most recent period
+    longest_streak: int        # best run so far
+    last_period: Optional[int] # ordinal of the most recent period (None if no completions)
+
+
 @dataclass
-class Completion:
-    id: Optional[int]      # database id (None before it is saved)
-    habit_id: int          # id of the related habit
-    completed_at: str      # timestamp in UTC (ISO string)
\ No newline at end of file
+class StreakSummary:
+    habit: Habit               # the habit the streaks belong to
+    longest_streak: int        # best run so far
+    current_streak: int        # run still alive in the current period (0 if broken)
+
+
+@dataclass
+class CompletionRate:
+    habit: Habit               # the habit the rate belongs to
+    completed_periods: int     # periods in the window with a completion
+    total_periods: int         # periods in the window
+
+    @property
+    def rate(self) -> float:
+        return self.completed_periods / self.total_periods if self.total_periods else 0.0
+
+
+@dataclass
+class TenantSummary:
+    tenant: str                # tenant id (its database is <tenant>.db)
+    habits: int                # active habits
+    completions: int           # all completions
+    best_habit: Optional[Habit]  # habit with the longest streak (None if none)
+    best_streak: int           # its longest streak
+
+
+@dataclass
+class MaintenanceReport:
+    habits_moved: int          # archived habits whose history went to cold storage
+    completions_moved: int     # completions moved with them
+    size_before: int           # database size in bytes before VACUUM
+    size_after: int            # ... and after
+
+    @property
+    def reclaimed(self) -> int:
+        return self.size_before - self.size_after
@@ -0,0 +1,109 @@
+import re
+from functools import lru_cache
+from typing import Optional
+
+from models import EPOCH_DAY_ORDINAL
+
+# Integer period bucketing.
+#
+# Every periodicity maps a day ordinal (date.toordinal() of a UTC day) to an
+# integer period ordinal in O(1), such that two periods are consecutive
+# exactly when their ordinals differ by 1. Streaks are then just runs of
+# consecutive ordinals, whatever the periodicity.
+#
+#   "daily"          the day ordinal itself
+#   "weekly"         ISO weeks (Monday to Sunday), counted across years
+#   "every-N-days"   blocks of N days, counted from 0001-01-01 (N >= 2)
+#   "monthly"        calendar months: year * 12 + month - 1
+#
+# Only integer arithmetic is used, so the same functions also work
+# element-wise on NumPy integer arrays.
+
+BASIC_PERIODICITIES = ("daily", "weekly", "monthly")
+
+_EVERY_N_DAYS = re.compile(r"^every-([1-9][0-9]*)-days$")
+
+
+@lru_cache(maxsize=None)
+def every_n_days(periodicity: str) -> Optional[int]:
+    """Return N for an "every-N-days" periodicity, else None."""
+    match = _EVERY_N_DAYS.match(periodicity)
+    return int(match.group(1)) if match else None
+
+
+def parse_periodicity(value: str) -> str:
+    """
+    Normalize and validate a periodicity string; raises ValueError.
+    "every-1-days" is normalized to "daily" and "every-7-days" to "weekly"
+    (the same buckets).
+    """
+    periodicity = value.strip().lower()
+    if periodicity in BASIC_PERIODICITIES:
+        return periodicity
+    n = every_n_days(periodicity)
+    if n is None:
+        raise ValueError(
+            "Periodicity must be 'daily', 'weekly', 'monthly' or 'every-N-days'."
+        )
+    return {1: "daily", 7: "weekly"}.get(n, periodicity)
+
+
+def period_from_day(day, periodicity: str):
+    """
+    Map a day ordinal to the integer number of its period.
+    Two periods are consecutive exactly when their ordinals differ by 1.
+    """
+    if periodicity == "daily":
+        return day
+    if periodicity == "weekly":
+        # day ordinal 1 (0001-01-01) is a Monday, so this counts ISO weeks
+        # and keeps counting across year boundaries
+        return (day - 1) // 7
+    if periodicity == "monthly":
+        year, month = _civil_year_month(day)
+        return year * 12 + month - 1
+    n = every_n_days(periodicity)
+    if n is None:
+        raise ValueError(f"Unknown periodicity {periodicity!r}.")
+    return (day - 1) // n
+
+
+def period_start_day(period: int, periodicity: str) -> int:
+    """Return the day ordinal of the first day of a period (inverse of above)."""
+    if periodicity == "daily":
+        return period
+    if periodicity == "weekly":
+        return period * 7 + 1
+    if periodicity == "monthly":
+        return _days_from_civil(period // 12, period % 12 + 1) + EPOCH_DAY_ORDINAL
+    n = every_n_days(periodicity)
+    if n is None:
+        raise ValueError(f"Unknown periodicity {periodicity!r}.")
+    return period * n + 1
+
+
+def _civil_year_month(day):
+    """
+    (year, month) of a day ordinal using integer operations only
+    (H. Hinnant's civil_from_days), so it also runs on NumPy arrays.
+    """
+    z = day - EPOCH_DAY_ORDINAL + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    month = mp + 3 - 12 * (mp >= 10)
+    year = yoe + era * 400 + (month <= 2)
+    return year, month
+
+
+def _days_from_civil(year: int, month: int) -> int:
+    """Days since 1970-01-01 of the first day of a month (days_from_civil)."""
+    year -= month <= 2
+    era = year // 400
+    yoe = year - era * 400
+    mp = (month + 9) % 12
+    doy = (153 * mp + 2) // 5
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
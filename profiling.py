@@ -0,0 +1,246 @@
+import functools
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Instrumentation for `--profile`.
+#
+# A Profiler attached to a service (see attach) records every SQL statement
+# the repository runs (calls, rows, time including fetches and commits) and
+# the latency of each public HabitService method. While no profiler is
+# attached the hooks cost one attribute check per call.
+
+
+class _Stats:
+    __slots__ = ("calls", "rows", "seconds")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.rows = 0
+        self.seconds = 0.0
+
+
+class Profiler:
+    """Collects query and service call statistics."""
+
+    def __init__(self) -> None:
+        self.queries: Dict[str, _Stats] = {}
+        self.calls: Dict[str, _Stats] = {}
+        # other named counters to report, e.g. {"streak_cache": {"hits": 3}}
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    # ---------- Recording ----------
+
+    def record_query(self, sql: str, seconds: float, rows: int = 0, calls: int = 1) -> None:
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self.queries.get(key)
+            if stats is None:
+                stats = self.queries[key] = _Stats()
+            stats.calls += calls
+            stats.rows += rows
+            stats.seconds += seconds
+
+    def record_call(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self.calls.get(name)
+            if stats is None:
+                stats = self.calls[name] = _Stats()
+            stats.calls += 1
+            stats.seconds += seconds
+
+    # ---------- Hooks ----------
+
+    def attach(self, service) -> None:
+        """Start profiling a HabitService and its repository."""
+        service.profiler = self
+        service.repo.profiler = self
+
+    @staticmethod
+    def detach(service) -> None:
+        service.profiler = None
+        service.repo.profiler = None
+
+    # ---------- Reports ----------
+
+    def to_dict(self) -> dict:
+        def rows(stats: Dict[str, _Stats], key: str) -> List[dict]:
+            ordered = sorted(stats.items(), key=lambda item: item[1].seconds, reverse=True)
+            return [
+                {
+                    key: name,
+                    "calls": s.calls,
+                    "rows": s.rows,
+                    "total_ms": round(s.seconds * 1000, 3),
+                    "mean_ms": round(s.seconds * 1000 / s.calls, 3),
+                }
+                for name, s in ordered
+            ]
+
+        calls = rows(self.calls, "method")
+        for call in calls:
+            del call["rows"]
+        return {
+            "calls": calls,
+            "queries": rows(self.queries, "sql"),
+            "counters": self.counters,
+        }
+
+    def to_json(self) -> str:
+        import json
+
+        return json.dumps(self.to_dict(), indent=2)
+
+    def summary(self, sql_width: int = 70) -> str:
+        """Human-readable tables, slowest first."""
+        report = self.to_dict()
+        lines = [f"{'Service method':<40} {'calls':>6} {'total ms':>10} {'mean ms':>9}"]
+        for c in report["calls"]:
+            lines.append(
+                f"{c['method']:<40} {c['calls']:>6} {c['total_ms']:>10.2f} {c['mean_ms']:>9.3f}"
+            )
+        lines.append("")
+        lines.append(
+            f"{'SQL':<{sql_width}} {'calls':>6} {'rows':>8} {'total ms':>10} {'mean ms':>9}"
+        )
+        for q in report["queries"]:
+            sql = q["sql"] if len(q["sql"]) <= sql_width else q["sql"][: sql_width - 3] + "..."
+            lines.append(
+                f"{sql:<{sql_width}} {q['calls']:>6} {q['rows']:>8} "
+                f"{q['total_ms']:>10.2f} {q['mean_ms']:>9.3f}"
+            )
+        total = sum(q["total_ms"] for q in report["queries"])
+        count = sum(q["calls"] for q in report["queries"])
+        lines.append(f"{count} statements, {total:.2f} ms in SQLite")
+        for name, values in report["counters"].items():
+            lines.append(f"{name}: " + ", ".join(f"{k}={v}" for k, v in values.items()))
+        return "\n".join(lines)
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace so the same statement always has the same key."""
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def profiled(method):
+    """Record the latency of a service method while a profiler is attached."""
+    name = method.__qualname__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+        if profiler is None:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            profiler.record_call(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+# -----------------------------------------
+# Connection / cursor wrappers
+# -----------------------------------------
+class ProfiledConnection:
+    """
+    Wraps a sqlite3.Connection: statements run through cursors that report
+    to the profiler; everything else is passed through.
+    """
+
+    def __init__(self, conn, profiler: Profiler) -> None:
+        self._conn = conn
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self) -> "ProfiledCursor":
+        return ProfiledCursor(self._conn.cursor(), self._profiler)
+
+    def execute(self, sql: str, parameters=()) -> "ProfiledCursor":
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters) -> "ProfiledCursor":
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self) -> None:
+        self._timed("COMMIT", self._conn.commit)
+
+    def rollback(self) -> None:
+        self._timed("ROLLBACK", self._conn.rollback)
+
+    def _timed(self, label: str, fn) -> None:
+        start = time.perf_counter()
+        try:
+            fn()
+        finally:
+            self._profiler.record_query(label, time.perf_counter() - start)
+
+
+class ProfiledCursor:
+    """
+    Wraps a sqlite3.Cursor. Time spent fetching is added to the statement
+    that produced the rows; writes count their rowcount as rows.
+    """
+
+    def __init__(self, cur, profiler: Profiler) -> None:
+        self._cur = cur
+        self._profiler = profiler
+        self._sql: Optional[str] = None
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def execute(self, sql: str, parameters=()) -> "ProfiledCursor":
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            self._cur.execute(sql, parameters)
+        finally:
+            rows = max(self._cur.rowcount, 0)
+            self._profiler.record_query(sql, time.perf_counter() - start, rows)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters) -> "ProfiledCursor":
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            self._cur.executemany(sql, seq_of_parameters)
+        finally:
+            rows = max(self._cur.rowcount, 0)
+            self._profiler.record_query(sql, time.perf_counter() - start, rows)
+        return self
+
+    def fetchone(self):
+        return self._fetch(self._cur.fetchone)
+
+    def fetchmany(self, size: int = 1):
+        return self._fetch(self._cur.fetchmany, size)
+
+    def fetchall(self):
+        return self._fetch(self._cur.fetchall)
+
+    def _fetch(self, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        if isinstance(result, list):
+            rows = len(result)
+        else:
+            rows = 0 if result is None else 1
+        # fetch time and rows belong to the statement, not a new call
+        self._profiler.record_query(self._sql or "", time.perf_counter() - start, rows, calls=0)
+        return result
@@ -1,7 +1,35 @@
-from typing import Optional, List
+import heapq
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, List, Tuple, Union
 
-from db import get_connection
-from models import Habit, Completion
+from analytics import (
+    advance_streak,
+    period_from_day,
+    streak_state_for,
+    streak_states_ordered,
+)
+from coldstore import pack_history, unpack_history
+from db import (
+    DB_PATH,
+    MEMORY,
+    TEMPORARY,
+    ConnectionPool,
+    PeriodicCheckpoint,
+    fill_period_counts,
+    load_into_memory,
+    open_database,
+    register_functions,
+    save_database,
+)
+from models import Habit, Completion, StreakState, epoch_day_ordinal, iso_to_epoch
+from periods import period_start_day
+from profiling import ProfiledConnection
 
 
 def row_to_habit(row) -> Habit:
@@ -12,6 +40,7 @@ def row_to_habit(row) -> Habit:
         periodicity=row["periodicity"],
         created_at=row["created_at"],
         is_archived=bool(row["is_archived"]),
+        one_per_period=bool(row["one_per_period"]),
     )
 
 
@@ -20,23 +49,254 @@ def row_to_completion(row) -> Completion:
     return Completion(
         id=row["id"],
         habit_id=row["habit_id"],
-        completed_at=row["completed_at"],
+        completed_ts=row["completed_ts"],
     )
 
 
+def row_to_streak_state(row) -> StreakState:
+    """Convert a database row into a StreakState object."""
+    return StreakState(
+        habit_id=row["habit_id"],
+        current_streak=row["current_streak"],
+        longest_streak=row["longest_streak"],
+        last_period=row["last_period"],
+    )
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to `size` items from any iterable."""
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Sort keys of iter_completions (both are served by an index without sorting)
+COMPLETION_ORDERS = {
+    "habit": ("habit_id", "completed_ts", "id"),
+    "time": ("completed_ts", "id"),
+}
+
+
+def completion_key(completion: Completion, order: str = "habit") -> tuple:
+    """Return the keyset pagination key of a completion for the given order."""
+    return tuple(getattr(completion, column) for column in COMPLETION_ORDERS[order])
+
+
+def completion_row(habit_id: int, completed_ts: int) -> Tuple[int, int, int, int]:
+    """Return the stored columns (habit_id, completed_ts, day_ord, week_ord)."""
+    day = epoch_day_ordinal(completed_ts)
+    return habit_id, completed_ts, day, period_from_day(day, "weekly")
+
+
+# Insert one completion_row(). For habits in one-per-period mode the
+# period ordinal is stored too, and a second completion in the same period
+# is skipped by the unique index (rowcount 0) instead of adding a row.
+INSERT_COMPLETION = """
+    INSERT INTO completions (habit_id, completed_ts, day_ord, week_ord, period_ord)
+    VALUES (?1, ?2, ?3, ?4, (
+        SELECT period_of(?3, periodicity) FROM habits
+        WHERE id = ?1 AND one_per_period
+    ))
+    ON CONFLICT (habit_id, period_ord) WHERE period_ord IS NOT NULL DO NOTHING
+"""
+
+
+# Tables that reference habits (id) through habit_id
+DEPENDENT_TABLES = ("completions", "habit_streaks", "period_counts", "cold_completions")
+
+
+# Period kinds kept in the period_counts rollup; other periodicities
+# (see periods.py) are summed from the daily rows when read
+PERIOD_KINDS = ("daily", "weekly")
+
+
+def period_count_rows(
+    rows: Iterable[Tuple[int, int, int, int]]
+) -> List[Tuple[int, str, int, int]]:
+    """
+    Aggregate stored completion rows (see completion_row) into
+    (habit_id, period_kind, period_ord, count) increments.
+    """
+    counts = Counter()
+    for habit_id, _, day, week in rows:
+        counts[habit_id, "daily", day] += 1
+        counts[habit_id, "weekly", week] += 1
+    return [(*key, count) for key, count in counts.items()]
+
+
+# Durability modes for write batches -> PRAGMA synchronous level.
+#   "full"   - fsync on every commit (SQLite default, safest)
+#   "normal" - fewer fsyncs; a power loss may drop the last commits
+#   "off"    - no fsync at all; fastest, only for data that can be rebuilt
+DURABILITY_MODES = {"full": "FULL", "normal": "NORMAL", "off": "OFF"}
+
+
 class HabitRepository:
     """Handles all reads and writes to the SQLite database."""
 
-    def __init__(self) -> None:
-        self.conn = get_connection()
+    def __init__(
+        self,
+        conn: Optional[sqlite3.Connection] = None,
+        pool: Optional[ConnectionPool] = None,
+        path: Optional[Union[str, Path]] = None,
+        in_memory: bool = False,
+        checkpoint_every: Optional[float] = None,
+    ) -> None:
+        # allow injecting a connection (useful for tests), a pool so that
+        # every thread using this repository gets its own connection, or the
+        # path of the database file (default: planner.db; db.MEMORY and
+        # db.TEMPORARY give a private throwaway database)
+        if in_memory and (conn is not None or pool is not None):
+            raise ValueError(
+                "in_memory opens its own connection; do not pass conn or pool."
+            )
+        self._pool = pool
+        self._checkpoint = None
+        self.in_memory = in_memory
+        if in_memory:
+            # work on an in-memory copy of the file; it is only written back
+            # by checkpoint(), or after a commit once `checkpoint_every` seconds
+            # have passed since the last save, and on close
+            self.path = DB_PATH if path is None else path
+            self._conn = load_into_memory(self.path)
+            if checkpoint_every is not None:
+                self._checkpoint = PeriodicCheckpoint(
+                    self._conn, self.path, checkpoint_every
+                )
+        else:
+            self.path = path
+            self._conn = None if pool else (conn or open_database(path))
+        if conn is not None:
+            register_functions(conn)
+
+        # group commit state (see write_batch), kept per thread
+        self._batch = threading.local()
+
+        # set by profiling.Profiler.attach to record every statement
+        self.profiler = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The connection for the calling thread."""
+        conn = self._connection()
+        if self.profiler is not None:
+            return ProfiledConnection(conn, self.profiler)
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._pool is not None:
+            return self._pool.connection()
+        return self._conn
+
+    def change_token(self) -> Tuple[int, int]:
+        """
+        Return a token that changes whenever another connection (or process)
+        commits to the database: (connection id, PRAGMA data_version).
+        Writes through this repository's own connection do not change it.
+        """
+        cur = self.conn.cursor()
+        cur.execute("PRAGMA data_version")
+        return id(self._connection()), cur.fetchone()[0]
 
     def close(self) -> None:
-        """Close the database connection."""
-        self.conn.close()
+        """
+        Flush pending writes and close the database connection.
+        Pooled connections are left to the pool's owner (see close_all).
+        An in-memory repository with checkpoint_every is saved a last time.
+        """
+        self.flush()
+        if self._checkpoint is not None:
+            self._checkpoint.close()
+        if self._pool is None:
+            self._conn.close()
+
+    def checkpoint(self) -> None:
+        """Write an in-memory repository (in_memory=True) back to its file."""
+        if not self.in_memory or self.path in (MEMORY, TEMPORARY):
+            raise ValueError("Only an in-memory copy of a database file can be saved.")
+        self.flush()
+        if self._checkpoint is not None:
+            self._checkpoint.save()
+        else:
+            save_database(self._conn, self.path)
+
+    # ---------- Write batching ----------
+
+    @contextmanager
+    def write_batch(
+        self,
+        max_pending: int = 100,
+        max_delay: float = 1.0,
+        durability: str = "normal",
+    ) -> Iterator["HabitRepository"]:
+        """
+        Group many writes into few transactions.
+
+        Inside the block every write is executed right away (so ids are
+        returned as usual) but only committed once `max_pending` writes are
+        waiting or the oldest one is `max_delay` seconds old. The delay is
+        checked on each write; call flush() to commit earlier. Leaving the
+        block commits the rest, or rolls it back if an exception escaped.
+        `durability` picks the PRAGMA synchronous level for the batch.
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"Durability must be one of: {', '.join(DURABILITY_MODES)}."
+            )
+        batch = self._batch
+        if getattr(batch, "limits", None) is not None:
+            raise RuntimeError("A write batch is already active.")
+
+        self.flush()
+        previous = self.conn.execute("PRAGMA synchronous").fetchone()[0]
+        self.conn.execute(f"PRAGMA synchronous = {DURABILITY_MODES[durability]}")
+        batch.limits = (max_pending, max_delay)
+        try:
+            yield self
+        except BaseException:
+            self.conn.rollback()
+            batch.pending = 0
+            raise
+        else:
+            self.flush()
+        finally:
+            batch.limits = None
+            self.conn.execute(f"PRAGMA synchronous = {int(previous)}")
+
+    def flush(self) -> None:
+        """Commit all pending writes of the current write batch."""
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self._batch.pending = 0
+        if self._checkpoint is not None:
+            self._checkpoint.after_commit()
+
+    def _commit(self) -> None:
+        """Commit now, or leave it to the write batch if one is active."""
+        batch = self._batch
+        limits = getattr(batch, "limits", None)
+        if limits is None:
+            self.conn.commit()
+            if self._checkpoint is not None:
+                self._checkpoint.after_commit()
+            return
+
+        max_pending, max_delay = limits
+        now = time.monotonic()
+        if not getattr(batch, "pending", 0):
+            batch.pending, batch.since = 0, now
+        batch.pending += 1
+        if batch.pending >= max_pending or now - batch.since >= max_delay:
+            self.flush()
 
     # ---------- Habits ----------
 
-    def create_habit(self, name: str, periodicity: str) -> Habit:
+    def create_habit(
+        self, name: str, periodicity: str, one_per_period: bool = False
+    ) -> Habit:
         """Create a new habit and save it to the database."""
         habit = Habit(
             id=None,
@@ -44,27 +304,45 @@ class HabitRepository:
             periodicity=periodicity,
             created_at=Habit.now_utc_iso(),
             is_archived=False,
+            one_per_period=one_per_period,
         )
 
         cur = self.conn.cursor()
         cur.execute(
             """
-            INSERT INTO habits (name, periodicity, created_at, is_archived)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO habits (name, periodicity, created_at, is_archived, one_per_period)
+            VALUES (?, ?, ?, ?, ?)
             """,
-            (habit.name, habit.periodicity, habit.created_at, int(habit.is_archived)),
+            (
+                habit.name,
+                habit.periodicity,
+                habit.created_at,
+                int(habit.is_archived),
+                int(habit.one_per_period),
+            ),
         )
-        self.conn.commit()
-
         habit.id = cur.lastrowid
+
+        # start with an empty streak state so the first completion is O(1)
+        cur.execute(
+            "INSERT INTO habit_streaks (habit_id) VALUES (?)",
+            (habit.id,),
+        )
+        self._commit()
         return habit
 
     def list_habits(
         self,
         include_archived: bool = False,
         periodicity: Optional[str] = None,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
     ) -> List[Habit]:
-        """Return all habits, with optional filters."""
+        """
+        Return habits ordered by id, with optional filters.
+        after, limit -- keyset pagination: at most `limit` habits with an
+                        id greater than `after` (the last id already seen)
+        """
         cur = self.conn.cursor()
 
         query = "SELECT * FROM habits"
@@ -76,16 +354,34 @@ class HabitRepository:
         if periodicity:
             conditions.append("periodicity = ?")
             params.append(periodicity)
+        if after is not None:
+            conditions.append("id > ?")
+            params.append(after)
 
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
 
         query += " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
 
         cur.execute(query, params)
         rows = cur.fetchall()
         return [row_to_habit(row) for row in rows]
 
+    def get_habits(self, habit_ids: Iterable[int]) -> Dict[int, Habit]:
+        """Return {habit_id: habit} for the given ids that exist."""
+        habit_ids = list(habit_ids)
+        if not habit_ids:
+            return {}
+        cur = self.conn.cursor()
+        cur.execute(
+            f"SELECT * FROM habits WHERE id IN ({', '.join('?' for _ in habit_ids)})",
+            habit_ids,
+        )
+        return {row["id"]: row_to_habit(row) for row in cur.fetchall()}
+
     def get_habit(self, habit_id: int) -> Optional[Habit]:
         """Return a single habit by id, or None if not found."""
         cur = self.conn.cursor()
@@ -96,60 +392,813 @@ class HabitRepository:
         return row_to_habit(row)
 
     def archive_habit(self, habit_id: int) -> None:
-        """Mark a habit as archived."""
+        """Mark a habit as archived (see move_to_cold for its history)."""
         cur = self.conn.cursor()
         cur.execute(
             "UPDATE habits SET is_archived = 1 WHERE id = ?",
             (habit_id,),
         )
-        self.conn.commit()
+        self._commit()
+
+    def unarchive_habit(self, habit_id: int) -> None:
+        """Mark a habit as active again, restoring a cold history first."""
+        self.restore_from_cold(habit_id)
+        cur = self.conn.cursor()
+        cur.execute(
+            "UPDATE habits SET is_archived = 0 WHERE id = ?",
+            (habit_id,),
+        )
+        self._commit()
 
     def delete_habit(self, habit_id: int) -> None:
-        """Permanently delete a habit (and its completions)."""
+        """
+        Permanently delete a habit (and its completions).
+        Every dependent table is cleared explicitly, so nothing is left
+        behind on connections with foreign keys (and cascades) turned off.
+        """
         cur = self.conn.cursor()
+        for table in DEPENDENT_TABLES:
+            cur.execute(f"DELETE FROM {table} WHERE habit_id = ?", (habit_id,))
         cur.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
-        self.conn.commit()
+        self._commit()
 
     # ---------- Completions ----------
 
-    def add_completion(self, habit_id: int, completed_at: str) -> Completion:
-        """Add a completion record for a habit."""
+    def add_completion(self, habit_id: int, completed_at: str) -> Tuple[Completion, bool]:
+        """
+        Add a completion record for a habit; returns (completion, created).
+        The habit's streak state is updated in the same transaction.
+        For a habit in one-per-period mode that already has a completion in
+        the same period nothing is written and (that completion, False) is
+        returned.
+        """
         completion = Completion(
             id=None,
             habit_id=habit_id,
             completed_at=completed_at,
         )
+        row = completion_row(completion.habit_id, completion.completed_ts)
+        cur = self.conn.cursor()
+        cur.execute(INSERT_COMPLETION, row)
+        if cur.rowcount == 0:
+            cur.execute(
+                """
+                SELECT c.* FROM completions c JOIN habits h ON h.id = c.habit_id
+                WHERE c.habit_id = ? AND c.period_ord = period_of(?, h.periodicity)
+                """,
+                (habit_id, row[2]),
+            )
+            existing = row_to_completion(cur.fetchone())
+            # end the (empty) write transaction the INSERT opened
+            self._commit()
+            return existing, False
+        completion.id = cur.lastrowid
+        self._add_period_counts(cur, period_count_rows([row]))
+        self._advance_streak_state(
+            cur, habit_id, epoch_day_ordinal(completion.completed_ts)
+        )
+        self._commit()
+        return completion, True
+
+    def add_completions_bulk(
+        self,
+        rows: Iterable[Tuple[int, str]],
+        chunk_size: int = 1000,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """
+        Insert many (habit_id, completed_at) rows in a single transaction.
+        Rows are consumed lazily and written in chunks with executemany;
+        the streak state of every touched habit is rebuilt once at the end.
+        Nothing is written if any row (or the row source) fails.
+        Returns the number of inserted rows (rows repeating a period of a
+        one-per-period habit are skipped).
+        """
+        # the import is its own transaction, apart from any write batch
+        self.flush()
+        cur = self.conn.cursor()
+        touched = set()
+        # habits whose rollup must be recounted: a chunk skipped some of
+        # their rows, and executemany does not tell which ones
+        recount = set()
+        total = inserted = 0
+        try:
+            for chunk in chunked(rows, chunk_size):
+                stored = [completion_row(h, iso_to_epoch(at)) for h, at in chunk]
+                cur.executemany(INSERT_COMPLETION, stored)
+                added = cur.rowcount
+                chunk_habits = {habit_id for habit_id, _ in chunk}
+                if added == len(stored):
+                    self._add_period_counts(cur, period_count_rows(stored))
+                else:
+                    recount.update(chunk_habits)
+                touched.update(chunk_habits)
+                inserted += added
+                total += len(chunk)
+                if on_progress:
+                    on_progress(total)
+
+            if recount:
+                self._recount_period_counts(cur, sorted(recount))
+            for habit_id in touched:
+                self._rebuild_streak_state(cur, habit_id)
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+        self.flush()
+        return inserted
+
+    def compact(
+        self, habit_ids: Optional[Iterable[int]] = None, one_per_period: bool = False
+    ) -> int:
+        """
+        Delete the repeats of habits (all if no ids are given), keeping the
+        earliest completion of every period. Streaks do not change; the
+        rollup is recounted. With `one_per_period` the habits are also
+        switched to one-per-period mode, so later repeats are skipped.
+        Returns the number of deleted completions.
+        """
+        if habit_ids is None:
+            cur = self.conn.cursor()
+            cur.execute("SELECT id FROM habits")
+            habit_ids = [row["id"] for row in cur.fetchall()]
+        habit_ids = sorted(set(habit_ids))
+        if not habit_ids:
+            return 0
+
+        self.flush()
+        cur = self.conn.cursor()
+        placeholders = ", ".join("?" for _ in habit_ids)
+        try:
+            cur.execute(
+                f"""
+                DELETE FROM completions WHERE id IN (
+                    SELECT id FROM (
+                        SELECT c.id, ROW_NUMBER() OVER (
+                            PARTITION BY c.habit_id, period_of(c.day_ord, h.periodicity)
+                            ORDER BY c.completed_ts, c.id
+                        ) AS seq
+                        FROM completions c JOIN habits h ON h.id = c.habit_id
+                        WHERE c.habit_id IN ({placeholders})
+                    )
+                    WHERE seq > 1
+                )
+                """,
+                habit_ids,
+            )
+            removed = cur.rowcount
+            if one_per_period:
+                cur.execute(
+                    f"UPDATE habits SET one_per_period = 1 WHERE id IN ({placeholders})",
+                    habit_ids,
+                )
+                cur.execute(
+                    f"""
+                    UPDATE completions SET period_ord = (
+                        SELECT period_of(completions.day_ord, h.periodicity)
+                        FROM habits h WHERE h.id = completions.habit_id
+                    )
+                    WHERE habit_id IN ({placeholders}) AND period_ord IS NULL
+                    """,
+                    habit_ids,
+                )
+            if removed:
+                self._recount_period_counts(cur, habit_ids)
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+        self.flush()
+        return removed
+
+    def count_completions(self) -> int:
+        """Return the number of completions of all habits (hot and cold)."""
         cur = self.conn.cursor()
         cur.execute(
             """
-            INSERT INTO completions (habit_id, completed_at)
-            VALUES (?, ?)
-            """,
-            (completion.habit_id, completion.completed_at),
+            SELECT (SELECT COUNT(*) FROM completions)
+                 + (SELECT COALESCE(SUM(completions), 0) FROM cold_completions)
+            """
         )
-        self.conn.commit()
-        completion.id = cur.lastrowid
-        return completion
+        return cur.fetchone()[0]
 
     def list_completions_for_habit(self, habit_id: int) -> List[Completion]:
         """Return all completions for one habit (ordered by time)."""
+        return list(self.iter_completions(habit_id=habit_id))
+
+    def list_all_completions(self) -> List[Completion]:
+        """Return all completions for all habits (cold storage included), by time."""
+        cold = [self.cold_history(habit_id) for habit_id in self.cold_summaries()]
+        return list(
+            heapq.merge(
+                self.iter_completions(order="time"),
+                *cold,
+                key=lambda c: completion_key(c, "time"),
+            )
+        )
+
+    def iter_completions(
+        self,
+        habit_id: Optional[int] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        after: Optional[tuple] = None,
+        order: str = "habit",
+        batch_size: int = 1000,
+    ) -> Iterator[Completion]:
+        """
+        Stream completions, holding at most `batch_size` rows at a time.
+
+        habit_id     -- only this habit's completions
+        since, until -- ISO bounds on the time (since inclusive, until exclusive)
+        order        -- "habit": by (habit_id, time, id);
+                        "time": by (time, id)
+        after        -- keyset pagination: the completion_key() of the last
+                        completion already seen; streaming resumes after it
+
+        Histories in cold storage are only read for a single habit_id (and
+        then merged in transparently); scans of all habits skip them (see
+        list_all_completions for a full listing).
+        """
+        if order not in COMPLETION_ORDERS:
+            raise ValueError(f"Order must be one of: {', '.join(COMPLETION_ORDERS)}.")
+        hot = self._iter_hot_completions(habit_id, since, until, after, order, batch_size)
+        if habit_id is None:
+            return hot
+
+        cold = [
+            c for c in self.cold_history(habit_id)
+            if (since is None or c.completed_ts >= iso_to_epoch(since))
+            and (until is None or c.completed_ts < iso_to_epoch(until))
+            and (after is None or completion_key(c, order) > tuple(after))
+        ]
+        if not cold:
+            return hot
+        return heapq.merge(cold, hot, key=lambda c: completion_key(c, order))
+
+    def _iter_hot_completions(
+        self,
+        habit_id: Optional[int],
+        since: Optional[str],
+        until: Optional[str],
+        after: Optional[tuple],
+        order: str,
+        batch_size: int,
+    ) -> Iterator[Completion]:
+        key_columns = COMPLETION_ORDERS[order]
+
+        conditions = []
+        params: list = []
+        if habit_id is not None:
+            conditions.append("habit_id = ?")
+            params.append(habit_id)
+        if since is not None:
+            conditions.append("completed_ts >= ?")
+            params.append(iso_to_epoch(since))
+        if until is not None:
+            conditions.append("completed_ts < ?")
+            params.append(iso_to_epoch(until))
+        if after is not None:
+            placeholders = ", ".join("?" for _ in key_columns)
+            conditions.append(f"({', '.join(key_columns)}) > ({placeholders})")
+            params.extend(after)
+
+        query = "SELECT * FROM completions"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY " + ", ".join(key_columns)
+
+        cur = self.conn.cursor()
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield row_to_completion(row)
+
+    # ---------- SQL-side analytics ----------
+
+    def longest_streaks_sql(
+        self,
+        habit_id: Optional[int] = None,
+        include_archived: bool = True,
+    ) -> Dict[int, int]:
+        """
+        Compute {habit_id: longest streak} inside SQLite.
+        Habits without completions do not appear in the result.
+        """
+        streaks = self.streaks_sql(habit_id=habit_id, include_archived=include_archived)
+        return {hid: longest for hid, (_, longest, _) in streaks.items()}
+
+    def streaks_sql(
+        self,
+        habit_id: Optional[int] = None,
+        include_archived: bool = True,
+    ) -> Dict[int, Tuple[int, int, int]]:
+        """
+        Compute {habit_id: (current, longest, last_period)} inside SQLite.
+        Uses a gaps-and-islands query: within one habit, consecutive period
+        ordinals minus their row number are constant, so each island is a run.
+        The current streak is the run that ends in the habit's last period.
+        Habits without completions do not appear in the result; habits in
+        cold storage report the final streaks stored with their history.
+        """
+        conditions = []
+        params: list = []
+        if habit_id is not None:
+            conditions.append("c.habit_id = ?")
+            params.append(habit_id)
+        if not include_archived:
+            conditions.append("h.is_archived = 0")
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
+        cur = self.conn.cursor()
+        cur.execute(
+            f"""
+            WITH periods AS (
+                SELECT DISTINCT
+                    c.habit_id,
+                    CASE h.periodicity
+                        WHEN 'daily' THEN c.day_ord
+                        WHEN 'weekly' THEN c.week_ord
+                        ELSE period_of(c.day_ord, h.periodicity)
+                    END AS period
+                FROM completions c
+                JOIN habits h ON h.id = c.habit_id
+                {where}
+            ),
+            islands AS (
+                SELECT
+                    habit_id,
+                    period,
+                    period - ROW_NUMBER() OVER (
+                        PARTITION BY habit_id ORDER BY period
+                    ) AS island
+                FROM periods
+            ),
+            runs AS (
+                SELECT
+                    habit_id,
+                    COUNT(*) AS length,
+                    MAX(period) AS run_end,
+                    MAX(MAX(period)) OVER (PARTITION BY habit_id) AS habit_end
+                FROM islands
+                GROUP BY habit_id, island
+            )
+            SELECT
+                habit_id,
+                MAX(CASE WHEN run_end = habit_end THEN length ELSE 0 END)
+                    AS current_streak,
+                MAX(length) AS longest_streak,
+                MAX(run_end) AS last_period
+            FROM runs
+            GROUP BY habit_id
+            """,
+            params,
+        )
+        streaks = {
+            row["habit_id"]: (
+                row["current_streak"], row["longest_streak"], row["last_period"]
+            )
+            for row in cur.fetchall()
+        }
+        if include_archived:
+            # only archived habits are in cold storage; use their summaries
+            for cold_id, (_, state) in self.cold_summaries().items():
+                if habit_id is None or cold_id == habit_id:
+                    streaks[cold_id] = state
+        return streaks
+
+    # ---------- Cold storage ----------
+
+    def move_to_cold(self, habit_ids: Optional[Iterable[int]] = None) -> Tuple[int, int]:
+        """
+        Move the completions of archived habits (all, or the given ones)
+        out of the completions table into one compressed cold_completions
+        row per habit, together with the habit's final streaks.
+        Returns (habits moved, completions moved).
+        """
+        query = """
+            SELECT h.id, h.periodicity FROM habits h
+            WHERE h.is_archived = 1
+              AND EXISTS (SELECT 1 FROM completions c WHERE c.habit_id = h.id)
+        """
+        params: list = []
+        if habit_ids is not None:
+            habit_ids = list(habit_ids)
+            query += f" AND h.id IN ({', '.join('?' for _ in habit_ids)})"
+            params = habit_ids
+
+        self.flush()
+        cur = self.conn.cursor()
+        cur.execute(query, params)
+        habits = cur.fetchall()
+        moved = 0
+        try:
+            for row in habits:
+                # hot and already-cold completions together, by (time, id)
+                history = list(self.iter_completions(habit_id=row["id"], order="time"))
+                current, longest, last_period = streak_state_for(
+                    history, row["periodicity"]
+                )
+                cur.execute(
+                    """
+                    INSERT OR REPLACE INTO cold_completions (
+                        habit_id, completions, first_ts, last_ts, current_streak,
+                        longest_streak, last_period, moved_ts, history
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        row["id"],
+                        len(history),
+                        history[0].completed_ts,
+                        history[-1].completed_ts,
+                        current,
+                        longest,
+                        last_period,
+                        int(time.time()),
+                        pack_history([(c.id, c.completed_ts) for c in history]),
+                    ),
+                )
+                cur.execute("DELETE FROM completions WHERE habit_id = ?", (row["id"],))
+                moved += cur.rowcount
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+        self.flush()
+        return len(habits), moved
+
+    def restore_from_cold(self, habit_id: int) -> int:
+        """
+        Move a habit's cold history back into the completions table, with
+        the original ids. Returns the number of restored completions.
+        """
+        cold = self.cold_history(habit_id)
+        if not cold:
+            return 0
+
+        self.flush()
+        cur = self.conn.cursor()
+        try:
+            cur.executemany(
+                """
+                INSERT INTO completions
+                    (id, habit_id, completed_ts, day_ord, week_ord, period_ord)
+                VALUES (?1, ?2, ?3, ?4, ?5, (
+                    SELECT period_of(?4, periodicity) FROM habits
+                    WHERE id = ?2 AND one_per_period
+                ))
+                ON CONFLICT (habit_id, period_ord) WHERE period_ord IS NOT NULL DO NOTHING
+                """,
+                [(c.id, *completion_row(habit_id, c.completed_ts)) for c in cold],
+            )
+            restored = cur.rowcount
+            cur.execute("DELETE FROM cold_completions WHERE habit_id = ?", (habit_id,))
+            if restored != len(cold):
+                # repeats dropped by one-per-period mode
+                self._recount_period_counts(cur, [habit_id])
+                self._rebuild_streak_state(cur, habit_id)
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+        self.flush()
+        return restored
+
+    def cold_summaries(self) -> Dict[int, Tuple[int, Tuple[int, int, Optional[int]]]]:
+        """
+        Return {habit_id: (completions, (current, longest, last_period))}
+        for every habit in cold storage, without reading the histories.
+        """
         cur = self.conn.cursor()
         cur.execute(
             """
-            SELECT * FROM completions
-            WHERE habit_id = ?
-            ORDER BY completed_at
+            SELECT habit_id, completions, current_streak, longest_streak, last_period
+            FROM cold_completions
+            """
+        )
+        return {
+            row["habit_id"]: (
+                row["completions"],
+                (row["current_streak"], row["longest_streak"], row["last_period"]),
+            )
+            for row in cur.fetchall()
+        }
+
+    def cold_history(self, habit_id: int) -> List[Completion]:
+        """A habit's cold completions ordered by (time, id); [] if none."""
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT history FROM cold_completions WHERE habit_id = ?", (habit_id,)
+        )
+        row = cur.fetchone()
+        if row is None:
+            return []
+        return [
+            Completion(id=completion_id, habit_id=habit_id, completed_ts=ts)
+            for completion_id, ts in unpack_history(row["history"])
+        ]
+
+    def database_size(self) -> int:
+        """Size of the database in bytes (pages in use and free pages)."""
+        cur = self.conn.cursor()
+        cur.execute("PRAGMA page_count")
+        pages = cur.fetchone()[0]
+        cur.execute("PRAGMA page_size")
+        return pages * cur.fetchone()[0]
+
+    def vacuum(self) -> Tuple[int, int]:
+        """
+        Rebuild the database file without free pages (and fold the WAL
+        back into it). Returns the size in bytes (before, after).
+        """
+        self.flush()
+        before = self.database_size()
+        self.conn.execute("VACUUM")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return before, self.database_size()
+
+    # ---------- Period rollup ----------
+
+    def period_counts(
+        self, habit_id: int, period_kind: str, first: int, last: int
+    ) -> Dict[int, int]:
+        """
+        Return {period_ord: completions} for one habit's periods in
+        [first, last]; periods without completions are left out.
+        Kinds without their own rollup are summed from the daily rows.
+        """
+        if period_kind not in PERIOD_KINDS:
+            counts: Counter = Counter()
+            first_day, last_day = self._period_days(period_kind, first, last)
+            for day, count in self.period_counts(
+                habit_id, "daily", first_day, last_day
+            ).items():
+                counts[period_from_day(day, period_kind)] += count
+            return dict(counts)
+
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            SELECT period_ord, count FROM period_counts
+            WHERE habit_id = ? AND period_kind = ?
+              AND period_ord BETWEEN ? AND ?
             """,
-            (habit_id,),
+            (habit_id, period_kind, first, last),
         )
-        rows = cur.fetchall()
-        return [row_to_completion(row) for row in rows]
+        return {row["period_ord"]: row["count"] for row in cur.fetchall()}
+
+    def completed_period_counts(
+        self, period_kind: str, first: int, last: int
+    ) -> Dict[int, int]:
+        """
+        Return {habit_id: number of periods in [first, last] with at least
+        one completion} for all habits with any, in one query.
+        Kinds without their own rollup are derived from the daily rows of
+        the habits with that periodicity.
+        """
+        if period_kind not in PERIOD_KINDS:
+            first_day, last_day = self._period_days(period_kind, first, last)
+            cur = self.conn.cursor()
+            cur.execute(
+                """
+                SELECT p.habit_id, p.period_ord FROM period_counts p
+                JOIN habits h ON h.id = p.habit_id
+                WHERE h.periodicity = ? AND p.period_kind = 'daily'
+                  AND p.period_ord BETWEEN ? AND ?
+                """,
+                (period_kind, first_day, last_day),
+            )
+            periods = {
+                (row["habit_id"], period_from_day(row["period_ord"], period_kind))
+                for row in cur.fetchall()
+            }
+            return dict(Counter(habit_id for habit_id, _ in periods))
 
-    def list_all_completions(self) -> List[Completion]:
-        """Return all completions for all habits."""
         cur = self.conn.cursor()
         cur.execute(
-            "SELECT * FROM completions ORDER BY completed_at"
+            """
+            SELECT habit_id, COUNT(*) AS periods FROM period_counts
+            WHERE period_kind = ? AND period_ord BETWEEN ? AND ?
+            GROUP BY habit_id
+            """,
+            (period_kind, first, last),
+        )
+        return {row["habit_id"]: row["periods"] for row in cur.fetchall()}
+
+    @staticmethod
+    def _period_days(period_kind: str, first: int, last: int) -> Tuple[int, int]:
+        """Day ordinals covering the periods [first, last] of a kind."""
+        return (
+            period_start_day(first, period_kind),
+            period_start_day(last + 1, period_kind) - 1,
+        )
+
+    def rebuild_period_counts(self) -> None:
+        """Recompute the whole rollup from all completions (hot and cold)."""
+        self._recount_period_counts(self.conn.cursor())
+        self._commit()
+
+    def _recount_period_counts(
+        self, cur: sqlite3.Cursor, habit_ids: Optional[List[int]] = None
+    ) -> None:
+        """Recompute the rollup of some (or all) habits (no commit)."""
+        fill_period_counts(self.conn, habit_ids)
+        cold = self.cold_summaries()
+        for habit_id in cold if habit_ids is None else set(habit_ids) & set(cold):
+            rows = [
+                completion_row(habit_id, c.completed_ts)
+                for c in self.cold_history(habit_id)
+            ]
+            self._add_period_counts(cur, period_count_rows(rows))
+
+    @staticmethod
+    def _add_period_counts(
+        cur: sqlite3.Cursor, increments: List[Tuple[int, str, int, int]]
+    ) -> None:
+        """Add (habit_id, period_kind, period_ord, count) increments (no commit)."""
+        cur.executemany(
+            """
+            INSERT INTO period_counts (habit_id, period_kind, period_ord, count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (habit_id, period_kind, period_ord)
+            DO UPDATE SET count = count + excluded.count
+            """,
+            increments,
         )
+
+    # ---------- Streak state ----------
+
+    def get_streak_state(self, habit_id: int) -> Optional[StreakState]:
+        """
+        Return the materialized streak state of a habit, or None if the
+        habit does not exist. Missing states are rebuilt from the history.
+        """
+        cur = self.conn.cursor()
+        cur.execute("SELECT * FROM habit_streaks WHERE habit_id = ?", (habit_id,))
+        row = cur.fetchone()
+        if row is not None:
+            return row_to_streak_state(row)
+
+        if self.get_habit(habit_id) is None:
+            return None
+        self.rebuild_streak_states([habit_id])
+        cur.execute("SELECT * FROM habit_streaks WHERE habit_id = ?", (habit_id,))
+        return row_to_streak_state(cur.fetchone())
+
+    def list_streak_states(self, include_archived: bool = False) -> Dict[int, StreakState]:
+        """Return {habit_id: streak state} for all habits in one query."""
+        query = """
+            SELECT h.id AS id, s.habit_id, s.current_streak,
+                   s.longest_streak, s.last_period
+            FROM habits h
+            LEFT JOIN habit_streaks s ON s.habit_id = h.id
+        """
+        if not include_archived:
+            query += " WHERE h.is_archived = 0"
+
+        cur = self.conn.cursor()
+        cur.execute(query)
         rows = cur.fetchall()
-        return [row_to_completion(row) for row in rows]
\ No newline at end of file
+
+        missing = [row["id"] for row in rows if row["habit_id"] is None]
+        if missing:
+            self.rebuild_streak_states(missing)
+            return self.list_streak_states(include_archived=include_archived)
+        return {row["habit_id"]: row_to_streak_state(row) for row in rows}
+
+    def iter_streak_states(
+        self, include_archived: bool = False, batch_size: int = 1000
+    ) -> Iterator[Tuple[int, Tuple[int, int, Optional[int]]]]:
+        """
+        Stream (habit_id, (current, longest, last_period)) for all habits,
+        holding at most `batch_size` rows at a time. Missing states are
+        rebuilt and yielded at the end.
+        """
+        query = """
+            SELECT h.id AS id, s.habit_id, s.current_streak,
+                   s.longest_streak, s.last_period
+            FROM habits h
+            LEFT JOIN habit_streaks s ON s.habit_id = h.id
+        """
+        if not include_archived:
+            query += " WHERE h.is_archived = 0"
+
+        cur = self.conn.cursor()
+        cur.execute(query)
+        missing = []
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                if row["habit_id"] is None:
+                    missing.append(row["id"])
+                else:
+                    yield row["id"], (
+                        row["current_streak"], row["longest_streak"], row["last_period"]
+                    )
+
+        if missing:
+            self.rebuild_streak_states(missing)
+            for habit_id in missing:
+                state = self.get_streak_state(habit_id)
+                yield habit_id, (state.current_streak, state.longest_streak, state.last_period)
+
+    def rebuild_streak_states(self, habit_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Recompute the streak state from the full history.
+        Rebuilds all habits if no ids are given.
+        """
+        cur = self.conn.cursor()
+        if habit_ids is not None:
+            for habit_id in habit_ids:
+                self._rebuild_streak_state(cur, habit_id)
+            self._commit()
+            return
+
+        # all habits: one streamed pass over the whole history
+        habits = self.list_habits(include_archived=True)
+        periodicity = {h.id: h.periodicity for h in habits}
+        states = dict(streak_states_ordered(self.iter_completions(), periodicity))
+        for habit_id in self.cold_summaries():
+            # the scan above does not read cold histories
+            states[habit_id] = streak_state_for(
+                self.iter_completions(habit_id=habit_id), periodicity[habit_id]
+            )
+        cur.executemany(
+            """
+            INSERT OR REPLACE INTO habit_streaks
+                (habit_id, current_streak, longest_streak, last_period)
+            VALUES (?, ?, ?, ?)
+            """,
+            [(h.id, *states.get(h.id, (0, 0, None))) for h in habits],
+        )
+        self._commit()
+
+    def _advance_streak_state(
+        self, cur: sqlite3.Cursor, habit_id: int, day_ord: int
+    ) -> None:
+        """Apply one new completion to the stored streak state (no commit)."""
+        cur.execute(
+            """
+            SELECT h.periodicity, s.habit_id AS state_id,
+                   s.current_streak, s.longest_streak, s.last_period
+            FROM habits h
+            LEFT JOIN habit_streaks s ON s.habit_id = h.id
+            WHERE h.id = ?
+            """,
+            (habit_id,),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return
+        if row["state_id"] is None:
+            # habit from before the streak state existed
+            self._rebuild_streak_state(cur, habit_id)
+            return
+
+        state = advance_streak(
+            row["current_streak"],
+            row["longest_streak"],
+            row["last_period"],
+            period_from_day(day_ord, row["periodicity"]),
+        )
+        if state is None:
+            # backfilled completion before the last period
+            self._rebuild_streak_state(cur, habit_id)
+            return
+
+        self._write_streak_state(cur, habit_id, *state)
+
+    def _rebuild_streak_state(self, cur: sqlite3.Cursor, habit_id: int) -> None:
+        """Recompute one habit's streak state from its history (no commit)."""
+        cur.execute("SELECT periodicity FROM habits WHERE id = ?", (habit_id,))
+        row = cur.fetchone()
+        if row is None:
+            return
+
+        state = streak_state_for(
+            self.iter_completions(habit_id=habit_id), row["periodicity"]
+        )
+        self._write_streak_state(cur, habit_id, *state)
+
+    @staticmethod
+    def _write_streak_state(
+        cur: sqlite3.Cursor,
+        habit_id: int,
+        current: int,
+        longest: int,
+        last_period: Optional[int],
+    ) -> None:
+        cur.execute(
+            """
+            INSERT OR REPLACE INTO habit_streaks
+                (habit_id, current_streak, longest_streak, last_period)
+            VALUES (?, ?, ?, ?)
+            """,
+            (habit_id, current, longest, last_period),
+        )
\ No newline at end of file
@@ -0,0 +1,161 @@
+import io
+import shlex
+import socket
+import sys
+from contextlib import redirect_stderr, redirect_stdout, suppress
+from pathlib import Path
+from typing import TextIO
+
+# Default socket for `serve` / `send`, next to the default planner.db.
+# (db is not imported here so that `send` never loads sqlite3.)
+SOCKET_PATH = Path(__file__).parent / "planner.sock"
+
+# Modes that start a session themselves and can't be nested inside one
+SESSION_COMMANDS = ("shell", "serve", "send")
+
+# Seconds a client may take to send its command line
+CLIENT_TIMEOUT = 5.0
+
+
+def execute_line(line: str, parser, service, out: TextIO) -> None:
+    """
+    Run one CLI command line (e.g. "complete 3") against a warm service.
+    Output and errors, including argparse usage errors, go to `out`.
+    """
+    from cli import run_cli
+
+    try:
+        argv = shlex.split(line)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=out)
+        return
+    if not argv:
+        return
+
+    with redirect_stdout(out), redirect_stderr(out):
+        try:
+            args = parser.parse_args(argv)
+        except SystemExit:
+            # argparse already printed the usage message (or --help)
+            return
+
+        if args.command is None:
+            parser.print_help()
+        elif args.command in SESSION_COMMANDS:
+            print(f"Error: '{args.command}' is not available here.")
+        else:
+            try:
+                run_cli(args, service=service)
+            except Exception as exc:
+                print(f"Error: {exc}")
+
+
+# -----------------------------------------
+# Interactive shell
+# -----------------------------------------
+def run_shell(parser, service) -> None:
+    """Read commands from the terminal until 'exit', 'quit' or EOF."""
+    try:
+        import readline  # noqa: F401  (line editing and history, if available)
+    except ImportError:
+        pass
+
+    print("Single Parent Planner shell – type a command, 'help' or 'exit'.")
+    while True:
+        try:
+            line = input("planner> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return
+        if line in ("exit", "quit"):
+            return
+        if line == "help":
+            line = "--help"
+        execute_line(line, parser, service, sys.stdout)
+
+
+# -----------------------------------------
+# Unix socket server
+# -----------------------------------------
+# Protocol: the client connects, sends one command line terminated by "\n",
+# and reads the command's output until the server closes the connection.
+# Commands are handled one at a time on a single warm connection.
+# The command "shutdown" stops the server.
+
+
+def serve(
+    parser, service, socket_path=SOCKET_PATH, client_timeout: float = CLIENT_TIMEOUT
+) -> None:
+    """
+    Serve CLI commands on a Unix socket until 'shutdown' or Ctrl+C.
+    Clients that send nothing for `client_timeout` seconds are dropped.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("Unix sockets are not supported on this platform.")
+
+    path = Path(socket_path)
+    _remove_stale_socket(path)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(str(path))
+        sock.listen()
+        print(f"Listening on {path} (send 'shutdown' to stop).")
+        try:
+            while True:
+                conn, _ = sock.accept()
+                with conn:
+                    conn.settimeout(client_timeout)
+                    try:
+                        line = _read_line(conn)
+                        if line.strip() == "shutdown":
+                            with suppress(OSError):
+                                conn.sendall(b"Server stopped.\n")
+                            return
+                        out = io.StringIO()
+                        execute_line(line, parser, service, out)
+                        conn.sendall(out.getvalue().encode("utf-8"))
+                    except OSError:
+                        # an idle or vanished client must not stop the server
+                        continue
+        except KeyboardInterrupt:
+            print()
+        finally:
+            path.unlink(missing_ok=True)
+
+
+def _remove_stale_socket(path: Path) -> None:
+    """Remove a socket file left by a server that did not shut down cleanly."""
+    if not path.exists():
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(path))
+        except ConnectionRefusedError:
+            # nobody is listening any more
+            path.unlink()
+            return
+    raise RuntimeError(f"A server is already listening on {path}.")
+
+
+def send_command(argv, socket_path=SOCKET_PATH) -> str:
+    """Send one command to a running server and return its output."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        sock.sendall((shlex.join(argv) + "\n").encode("utf-8"))
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks).decode("utf-8")
+
+
+def _read_line(conn: socket.socket) -> str:
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode("utf-8")
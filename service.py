@@ -1,9 +1,37 @@
-from datetime import datetime, timezone
-from typing import Optional, List, Tuple
+import heapq
+from datetime import date, datetime, timezone
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, List, Tuple, Union
 
-from models import Habit, Completion
+from cache import LRUCache
+from models import (
+    Habit,
+    Completion,
+    CompletionRate,
+    MaintenanceReport,
+    StreakState,
+    StreakSummary,
+)
+from periods import parse_periodicity
+from profiling import profiled
 from repository import HabitRepository
-from analytics import longest_streak_for
+from analytics import (
+    live_streak,
+    period_from_day,
+    period_ordinal,
+    streak_state_for,
+    streak_state_from_periods,
+    streak_states_ordered,
+    to_dt,
+    weekly_heatmap,
+)
+
+# Ways to compute streaks:
+#   "materialized" - read the per-habit state kept up to date on every write
+#   "python"       - recompute from the completion history in Python
+#   "sql"          - recompute inside SQLite with window functions
+STREAK_BACKENDS = ("materialized", "python", "sql")
 
 
 class HabitService:
@@ -12,45 +40,125 @@ class HabitService:
     The CLI will call this layer instead of talking to the repository directly.
     """
 
-    def __init__(self, repo: Optional[HabitRepository] = None) -> None:
-        # allow injecting a repo (useful for tests later)
-        self.repo = repo or HabitRepository()
+    def __init__(
+        self,
+        repo: Optional[HabitRepository] = None,
+        streak_backend: str = "materialized",
+        path: Optional[Union[str, Path]] = None,
+        cache_size: int = 256,
+    ) -> None:
+        # allow injecting a repo (useful for tests later), or open the
+        # database at `path` (see tenants.TenantRouter for per-tenant files)
+        self.repo = repo or HabitRepository(path=path)
+        self.streak_backend = self._check_backend(streak_backend)
+        # (habit_id, backend) -> (habit, (current, longest, last_period)).
+        # Writes made through this service drop the habit's entries; entries
+        # are also checked against the database's change counter, so commits
+        # by other connections or processes are never served stale.
+        self.streak_cache = LRUCache(cache_size)
+        # set by profiling.Profiler.attach to time the public methods
+        self.profiler = None
 
     # ---------- Habit management ----------
 
-    def create_habit(self, name: str, periodicity: str) -> Habit:
-        """Create a new habit with a valid periodicity ('daily' or 'weekly')."""
-        periodicity = periodicity.lower()
-        if periodicity not in ("daily", "weekly"):
-            raise ValueError("Periodicity must be 'daily' or 'weekly'.")
-        return self.repo.create_habit(name=name, periodicity=periodicity)
+    @profiled
+    def create_habit(
+        self, name: str, periodicity: str, one_per_period: bool = False
+    ) -> Habit:
+        """
+        Create a new habit with a valid periodicity: 'daily', 'weekly',
+        'monthly' or 'every-N-days' (see periods.parse_periodicity).
+        With one_per_period, repeated completions within a period are
+        not stored.
+        """
+        periodicity = parse_periodicity(periodicity)
+        return self.repo.create_habit(
+            name=name, periodicity=periodicity, one_per_period=one_per_period
+        )
 
+    @profiled
     def list_habits(
         self,
         include_archived: bool = False,
         periodicity: Optional[str] = None,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
     ) -> List[Habit]:
-        """List habits with optional filters."""
+        """
+        List habits with optional filters, ordered by id; `limit` habits
+        after the id `after` for keyset pagination.
+        """
         if periodicity:
-            periodicity = periodicity.lower()
+            periodicity = parse_periodicity(periodicity)
+        if limit is not None and limit < 1:
+            raise ValueError("The limit must be at least 1.")
         return self.repo.list_habits(
             include_archived=include_archived,
             periodicity=periodicity,
+            after=after,
+            limit=limit,
         )
 
+    @profiled
     def archive_habit(self, habit_id: int) -> None:
-        """Archive a habit so it no longer shows in the default list."""
+        """
+        Archive a habit so it no longer shows in the default list.
+        Its completions move to cold storage (see HabitRepository.move_to_cold).
+        """
         habit = self.repo.get_habit(habit_id)
         if habit is None:
             raise ValueError(f"Habit with id {habit_id} not found.")
         self.repo.archive_habit(habit_id)
+        self.repo.move_to_cold([habit_id])
+        self._invalidate(habit_id)
+
+    @profiled
+    def unarchive_habit(self, habit_id: int) -> None:
+        """Make an archived habit active again, restoring its history."""
+        habit = self.repo.get_habit(habit_id)
+        if habit is None:
+            raise ValueError(f"Habit with id {habit_id} not found.")
+        self.repo.unarchive_habit(habit_id)
+        self._invalidate(habit_id)
+
+    @profiled
+    def maintenance(self) -> MaintenanceReport:
+        """
+        Move the histories of all archived habits to cold storage (habits
+        archived before it existed, or by other tools), then VACUUM.
+        """
+        habits, completions = self.repo.move_to_cold()
+        before, after = self.repo.vacuum()
+        return MaintenanceReport(habits, completions, before, after)
 
+    @profiled
+    def compact(
+        self, habit_id: Optional[int] = None, one_per_period: bool = False
+    ) -> int:
+        """
+        Delete the repeated completions of one habit (or all), keeping the
+        first of each period; with `one_per_period` also put the habits in
+        one-per-period mode. Returns how many were deleted.
+        """
+        if habit_id is not None and self.repo.get_habit(habit_id) is None:
+            raise ValueError(f"Habit with id {habit_id} not found.")
+        removed = self.repo.compact(
+            None if habit_id is None else [habit_id], one_per_period=one_per_period
+        )
+        if habit_id is None:
+            self.streak_cache.clear()
+        else:
+            self._invalidate(habit_id)
+        return removed
+
+    @profiled
     def delete_habit(self, habit_id: int) -> None:
         """Permanently delete a habit (and its completions)."""
         habit = self.repo.get_habit(habit_id)
         if habit is None:
             raise ValueError(f"Habit with id {habit_id} not found.")
         self.repo.delete_habit(habit_id)
+        self._invalidate(habit_id)
 
     # ---------- Completions ----------
 
@@ -58,23 +166,34 @@ class HabitService:
     def _now_utc_iso() -> str:
         return datetime.now(timezone.utc).isoformat()
 
-    def add_completion_now(self, habit_id: int) -> Completion:
-        """Mark a habit as completed for 'now'."""
+    @profiled
+    def add_completion_now(self, habit_id: int) -> Tuple[Completion, bool]:
+        """
+        Mark a habit as completed for 'now'; returns (completion, created).
+        `created` is False when a one-per-period habit was already completed
+        in this period (that completion is returned).
+        """
         habit = self.repo.get_habit(habit_id)
         if habit is None:
             raise ValueError(f"Habit with id {habit_id} not found.")
         if habit.is_archived:
             raise ValueError("Cannot complete an archived habit.")
 
-        return self.repo.add_completion(
+        completion, created = self.repo.add_completion(
             habit_id=habit_id,
             completed_at=self._now_utc_iso(),
         )
+        self._invalidate(habit_id)
+        return completion, created
 
-    def add_completion_at(self, habit_id: int, completed_at_iso: str) -> Completion:
+    @profiled
+    def add_completion_at(
+        self, habit_id: int, completed_at_iso: str
+    ) -> Tuple[Completion, bool]:
         """
         Mark a habit as completed at a specific UTC timestamp (used for backfilling).
-        The timestamp is expected as an ISO string.
+        The timestamp is expected as an ISO string. Returns (completion, created)
+        like add_completion_now().
         """
         habit = self.repo.get_habit(habit_id)
         if habit is None:
@@ -82,43 +201,355 @@ class HabitService:
         if habit.is_archived:
             raise ValueError("Cannot complete an archived habit.")
 
-        return self.repo.add_completion(habit_id=habit_id, completed_at=completed_at_iso)
+        completion, created = self.repo.add_completion(
+            habit_id=habit_id, completed_at=completed_at_iso
+        )
+        self._invalidate(habit_id)
+        return completion, created
+
+    @profiled
+    def import_completions(
+        self,
+        records: Iterable[Tuple[int, str]],
+        chunk_size: int = 1000,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """
+        Bulk-add (habit_id, completed_at_iso) records in one transaction.
+        Habit ids are checked against a set loaded once up front. An invalid
+        record raises ValueError and nothing is imported.
+        Returns the number of imported completions.
+        """
+        archived = {
+            h.id: h.is_archived for h in self.repo.list_habits(include_archived=True)
+        }
+        touched = set()
 
+        def validated():
+            for number, (habit_id, completed_at) in enumerate(records, start=1):
+                if habit_id not in archived:
+                    raise ValueError(
+                        f"Record {number}: habit with id {habit_id} not found."
+                    )
+                if archived[habit_id]:
+                    raise ValueError(
+                        f"Record {number}: cannot complete an archived habit."
+                    )
+                try:
+                    to_dt(completed_at)
+                except (TypeError, ValueError):
+                    raise ValueError(
+                        f"Record {number}: invalid timestamp {completed_at!r}."
+                    ) from None
+                touched.add(habit_id)
+                yield habit_id, completed_at
+
+        count = self.repo.add_completions_bulk(
+            validated(), chunk_size=chunk_size, on_progress=on_progress
+        )
+        for habit_id in touched:
+            self._invalidate(habit_id)
+        return count
+
+    @profiled
     def list_completions_for_habit(self, habit_id: int) -> List[Completion]:
         """Return all completion records for one habit."""
         return self.repo.list_completions_for_habit(habit_id)
 
+    @profiled
     def list_all_completions(self) -> List[Completion]:
         """Return all completion records for all habits."""
         return self.repo.list_all_completions()
 
     # ---------- Analytics helpers ----------
 
-    def longest_streak_for_habit(self, habit_id: int) -> int:
-        """Calculate the longest streak for a single habit."""
+    @staticmethod
+    def _check_backend(backend: str) -> str:
+        if backend not in STREAK_BACKENDS:
+            raise ValueError(
+                f"Streak backend must be one of: {', '.join(STREAK_BACKENDS)}."
+            )
+        return backend
+
+    @profiled
+    def longest_streak_for_habit(
+        self, habit_id: int, backend: Optional[str] = None
+    ) -> int:
+        """Return the longest streak for a single habit."""
+        backend = self._check_backend(backend or self.streak_backend)
+        _, (_, longest, _) = self._habit_streak(habit_id, backend)
+        return longest
+
+    @profiled
+    def current_streak_for_habit(self, habit_id: int) -> int:
+        """
+        Return the habit's current streak: the run ending in this period or
+        the previous one (0 once a period has been missed).
+        """
+        habit, (current, _, last_period) = self._habit_streak(
+            habit_id, self.streak_backend
+        )
+        return live_streak(current, last_period, self._now_period(habit.periodicity))
+
+    # ---------- Streak cache ----------
+
+    def _habit_streak(
+        self, habit_id: int, backend: str
+    ) -> Tuple[Habit, Tuple[int, int, Optional[int]]]:
+        """Return (habit, (current, longest, last_period)), cached."""
+        return self.streak_cache.get_or_compute(
+            (habit_id, backend),
+            lambda: self._compute_habit_streak(habit_id, backend),
+            self.repo.change_token(),
+        )
+
+    def _compute_habit_streak(
+        self, habit_id: int, backend: str
+    ) -> Tuple[Habit, Tuple[int, int, Optional[int]]]:
         habit = self.repo.get_habit(habit_id)
         if habit is None:
             raise ValueError(f"Habit with id {habit_id} not found.")
 
-        completions = self.repo.list_completions_for_habit(habit_id)
-        return longest_streak_for(completions, habit.periodicity)
+        if backend == "materialized":
+            state = self._streak_state(habit_id)
+            return habit, (state.current_streak, state.longest_streak, state.last_period)
+        if backend == "sql":
+            return habit, self.repo.streaks_sql(habit_id=habit_id).get(habit_id, (0, 0, None))
+        return habit, streak_state_for(
+            self.repo.iter_completions(habit_id=habit_id), habit.periodicity
+        )
+
+    def _invalidate(self, habit_id: int) -> None:
+        """Forget the cached streaks of a habit after writing to it."""
+        self.streak_cache.invalidate(lambda key: key[0] == habit_id)
 
-    def longest_streak_overall(self) -> Tuple[Optional[Habit], int]:
+    def _now_period(self, periodicity: str) -> int:
+        return period_ordinal(self._now_utc_iso(), periodicity)
+
+    def _streak_state(self, habit_id: int) -> StreakState:
+        state = self.repo.get_streak_state(habit_id)
+        if state is None:
+            raise ValueError(f"Habit with id {habit_id} not found.")
+        return state
+
+    @profiled
+    def longest_streak_overall(
+        self, backend: Optional[str] = None
+    ) -> Tuple[Optional[Habit], int]:
         """
         Return (habit, streak) for the habit with the longest streak overall.
         If there are no habits/completions yet, returns (None, 0).
+        Ties go to the habit with the lowest id.
+        """
+        top = self.top_streaks(1, backend=backend)
+        if not top:
+            return None, 0
+        return top[0].habit, top[0].longest_streak
+
+    @profiled
+    def top_streaks(
+        self, k: int, backend: Optional[str] = None, include_archived: bool = False
+    ) -> List[StreakSummary]:
+        """
+        Return the k habits with the longest streaks, best first (ties go
+        to the lowest id); habits without completions are left out.
+        Per-habit streaks are streamed through a heap of size k, so memory
+        stays O(k) however many habits there are.
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1.")
+        backend = self._check_backend(backend or self.streak_backend)
+        top = heapq.nlargest(
+            k,
+            (
+                (longest, -habit_id, current, last_period)
+                for habit_id, (current, longest, last_period) in self._iter_streaks(
+                    backend, include_archived
+                )
+                if longest > 0
+            ),
+        )
+
+        habits = self.repo.get_habits(-entry[1] for entry in top)
+        summaries = []
+        for longest, neg_id, current, last_period in top:
+            habit = habits[-neg_id]
+            summaries.append(
+                StreakSummary(
+                    habit=habit,
+                    longest_streak=longest,
+                    current_streak=live_streak(
+                        current, last_period, self._now_period(habit.periodicity)
+                    ),
+                )
+            )
+        return summaries
+
+    def _iter_streaks(
+        self, backend: str, include_archived: bool
+    ) -> Iterator[Tuple[int, Tuple[int, int, Optional[int]]]]:
+        """Stream (habit_id, (current, longest, last_period)) from a backend."""
+        if backend == "materialized":
+            return self.repo.iter_streak_states(include_archived=include_archived)
+        if backend == "sql":
+            return iter(self.repo.streaks_sql(include_archived=include_archived).items())
+
+        # one streamed pass over all completions, ordered by habit
+        periodicity = {
+            h.id: h.periodicity
+            for h in self.repo.list_habits(include_archived=include_archived)
+        }
+        states = streak_states_ordered(self.repo.iter_completions(), periodicity)
+        if not include_archived:
+            return states
+        # the scan skips cold histories; they keep their final streaks
+        cold = self.repo.cold_summaries()
+        return chain(
+            ((hid, state) for hid, state in states if hid not in cold),
+            ((hid, state) for hid, (_, state) in cold.items()),
+        )
+
+    @profiled
+    def streak_report(
+        self,
+        periodicity: Optional[str] = None,
+        include_archived: bool = False,
+        backend: Optional[str] = None,
+    ) -> List[StreakSummary]:
+        """
+        Return longest and current streaks for every listed habit.
+        Uses a fixed number of queries no matter how many habits there are.
         """
-        habits = self.repo.list_habits(include_archived=False)
-        completions = self.repo.list_all_completions()
+        backend = self._check_backend(backend or self.streak_backend)
+        token = self.repo.change_token()
+        habits = self.list_habits(
+            include_archived=include_archived, periodicity=periodicity
+        )
 
-        best_habit: Optional[Habit] = None
-        best_streak = 0
+        if backend == "materialized":
+            states = self.repo.list_streak_states(include_archived=include_archived)
+            streaks = {
+                hid: (s.current_streak, s.longest_streak, s.last_period)
+                for hid, s in states.items()
+            }
+        elif backend == "sql":
+            streaks = self.repo.streaks_sql(include_archived=include_archived)
+        else:
+            streaks = dict(
+                streak_states_ordered(
+                    self.repo.iter_completions(),
+                    {h.id: h.periodicity for h in habits},
+                )
+            )
+            if include_archived:
+                # the scan skips cold histories; they keep their final streaks
+                streaks.update(
+                    (hid, state) for hid, (_, state) in self.repo.cold_summaries().items()
+                )
 
+        now_periods = {}
+        report = []
         for habit in habits:
-            comps = [c for c in completions if c.habit_id == habit.id]
-            streak = longest_streak_for(comps, habit.periodicity)
-            if streak > best_streak:
-                best_streak = streak
-                best_habit = habit
+            current, longest, last_period = streaks.get(habit.id, (0, 0, None))
+            # warm the per-habit cache for follow-up calls
+            self.streak_cache.put(
+                (habit.id, backend), (habit, (current, longest, last_period)), token
+            )
+            if habit.periodicity not in now_periods:
+                now_periods[habit.periodicity] = self._now_period(habit.periodicity)
+            report.append(
+                StreakSummary(
+                    habit=habit,
+                    longest_streak=longest,
+                    current_streak=live_streak(
+                        current, last_period, now_periods[habit.periodicity]
+                    ),
+                )
+            )
+        return report
+
+    # ---------- Time-range analytics ----------
+    # Answered from the period_counts rollup, so the cost grows with the
+    # window (and the number of habits), not with the history.
 
-        return best_habit, best_streak
\ No newline at end of file
+    @staticmethod
+    def _window(start: date, end: date) -> Tuple[int, int]:
+        """Return the day ordinals of an inclusive [start, end] window."""
+        if start > end:
+            raise ValueError("The start of the window must not be after its end.")
+        return start.toordinal(), end.toordinal()
+
+    @profiled
+    def completion_rates(
+        self,
+        start: date,
+        end: date,
+        periodicity: Optional[str] = None,
+        include_archived: bool = False,
+    ) -> List[CompletionRate]:
+        """
+        For every listed habit, return how many of its periods that overlap
+        the window had at least one completion.
+        """
+        first_day, last_day = self._window(start, end)
+        habits = self.list_habits(
+            include_archived=include_archived, periodicity=periodicity
+        )
+
+        rates = []
+        completed = {}
+        for habit in habits:
+            first = period_from_day(first_day, habit.periodicity)
+            last = period_from_day(last_day, habit.periodicity)
+            if habit.periodicity not in completed:
+                completed[habit.periodicity] = self.repo.completed_period_counts(
+                    habit.periodicity, first, last
+                )
+            rates.append(
+                CompletionRate(
+                    habit=habit,
+                    completed_periods=completed[habit.periodicity].get(habit.id, 0),
+                    total_periods=last - first + 1,
+                )
+            )
+        return rates
+
+    @profiled
+    def heatmap(
+        self, habit_id: int, start: date, end: date
+    ) -> List[Tuple[date, List[Optional[int]]]]:
+        """
+        Return the habit's completions per day in the window as ISO weeks:
+        (monday, [count for Mon..Sun]); days outside the window are None.
+        """
+        first_day, last_day = self._window(start, end)
+        if self.repo.get_habit(habit_id) is None:
+            raise ValueError(f"Habit with id {habit_id} not found.")
+
+        counts = self.repo.period_counts(habit_id, "daily", first_day, last_day)
+        return [
+            (date.fromordinal(monday), days)
+            for monday, days in weekly_heatmap(counts, first_day, last_day)
+        ]
+
+    @profiled
+    def streaks_in_window(self, habit_id: int, start: date, end: date) -> StreakSummary:
+        """
+        Return the longest streak within the window, and the streak still
+        alive at its end (as current_streak_for_habit would on that day).
+        """
+        first_day, last_day = self._window(start, end)
+        habit = self.repo.get_habit(habit_id)
+        if habit is None:
+            raise ValueError(f"Habit with id {habit_id} not found.")
+
+        last = period_from_day(last_day, habit.periodicity)
+        counts = self.repo.period_counts(
+            habit_id, habit.periodicity, period_from_day(first_day, habit.periodicity), last
+        )
+        current, longest, last_period = streak_state_from_periods(counts)
+        return StreakSummary(
+            habit=habit,
+            longest_streak=longest,
+            current_streak=live_streak(current, last_period, last),
+        )
@@ -0,0 +1,186 @@
+import json
+import mmap
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+
+from analytics import batch_streaks, load_numpy, period_from_day
+from models import Habit, epoch_day_ordinal
+
+# Read-only columnar snapshots of a planner database.
+#
+# Layout (all integers little-endian):
+#
+#   header    32 bytes   magic, version, habits length, completions, created
+#   habits    JSON list of [id, name, periodicity, created_at, is_archived],
+#             zero-padded to a multiple of 8 bytes
+#   habit_id  int32[completions]
+#   day_ord   int32[completions]   UTC day ordinals (date.toordinal)
+#
+# Completions are stored ordered by (habit_id, time), followed by those of
+# habits in cold storage (also by habit and time). The loader memory-maps
+# the file, so the columns are read in place without copying or SQLite.
+
+MAGIC = b"PLNSNAP\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQq")  # magic, version, habits_len, completions, created_ts
+ITEM = struct.calcsize("<i")
+
+
+def _padded(length: int) -> int:
+    return (length + 7) // 8 * 8
+
+
+def write_snapshot(repo, path: Union[str, Path], chunk_size: int = 65536) -> int:
+    """
+    Write all habits and completions of a HabitRepository to `path`.
+    Everything is read in one read transaction, so concurrent writers
+    neither block the export nor make it inconsistent.
+    Returns the number of completions written.
+    """
+    repo.flush()
+    conn = repo.conn
+    conn.execute("BEGIN")
+    try:
+        habits = repo.list_habits(include_archived=True)
+        count = repo.count_completions()
+        blob = json.dumps(
+            [[h.id, h.name, h.periodicity, h.created_at, h.is_archived] for h in habits]
+        ).encode("utf-8")
+
+        habit_ids_at = HEADER.size + _padded(len(blob))
+        days_at = habit_ids_at + count * ITEM
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(blob), count, int(time.time())))
+            f.write(blob.ljust(_padded(len(blob)), b"\0"))
+            f.truncate(days_at + count * ITEM)
+
+            written = 0
+            cur = conn.cursor()
+            cur.execute("SELECT habit_id, day_ord FROM completions ORDER BY habit_id, completed_ts")
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                _write_column(f, habit_ids_at + written * ITEM, [r[0] for r in rows])
+                _write_column(f, days_at + written * ITEM, [r[1] for r in rows])
+                written += len(rows)
+
+            # then the histories of archived habits in cold storage
+            for habit_id in sorted(repo.cold_summaries()):
+                history = repo.cold_history(habit_id)
+                days = [epoch_day_ordinal(c.completed_ts) for c in history]
+                _write_column(f, habit_ids_at + written * ITEM, [habit_id] * len(days))
+                _write_column(f, days_at + written * ITEM, days)
+                written += len(days)
+    finally:
+        conn.rollback()
+    return written
+
+
+def _write_column(f: BinaryIO, offset: int, values: List[int]) -> None:
+    column = array("i", values)
+    if sys.byteorder != "little":
+        column.byteswap()
+    f.seek(offset)
+    f.write(column.tobytes())
+
+
+class Snapshot:
+    """
+    A memory-mapped snapshot. `habit_ids` and `days` are zero-copy views of
+    the file (NumPy arrays when NumPy is installed, else memoryviews).
+    Use as a context manager, or call close() when done; views kept past
+    close() keep the map alive (NumPy) or make close() fail (memoryview).
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, habits_len, count, created_ts = HEADER.unpack_from(self._mmap)
+        except struct.error:
+            self.close()
+            raise ValueError(f"{self.path} is not a planner snapshot.") from None
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a planner snapshot.")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported snapshot version {version}.")
+
+        self.created_ts = created_ts
+        self.count = count
+        blob = self._mmap[HEADER.size:HEADER.size + habits_len]
+        self.habits = [
+            Habit(id=i, name=n, periodicity=p, created_at=c, is_archived=a)
+            for i, n, p, c, a in json.loads(blob)
+        ]
+        habit_ids_at = HEADER.size + _padded(habits_len)
+        self.habit_ids = self._column(habit_ids_at)
+        self.days = self._column(habit_ids_at + count * ITEM)
+
+    def _column(self, offset: int):
+        np = load_numpy()
+        if np is not None:
+            return np.frombuffer(self._mmap, dtype="<i4", count=self.count, offset=offset)
+        view = memoryview(self._mmap)[offset:offset + self.count * ITEM]
+        if sys.byteorder != "little":
+            # no zero-copy view of foreign byte order without NumPy
+            column = array("i", view.tobytes())
+            column.byteswap()
+            return column
+        return view.cast("i")
+
+    def close(self) -> None:
+        # views must be released before the map can be closed
+        self.habit_ids = self.days = None
+        self._mmap.close()
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def periods(self) -> Sequence[int]:
+        """The period ordinal of every completion, by its habit's periodicity."""
+        return period_column(self.habits, self.habit_ids, self.days)
+
+    def streaks(self, use_numpy: Optional[bool] = None) -> Dict[int, Tuple[int, int, int]]:
+        """{habit_id: (current, longest, last_period)} via analytics.batch_streaks."""
+        return batch_streaks(self.habit_ids, self.periods(), use_numpy=use_numpy)
+
+
+def period_column(
+    habits: Sequence[Habit], habit_ids: Sequence[int], days: Sequence[int]
+) -> Sequence[int]:
+    """Map a day-ordinal column to period ordinals, vectorized if possible."""
+    np = load_numpy()
+    if np is not None and isinstance(days, np.ndarray):
+        if not len(days):
+            return days
+        # periodicity per habit id, as a lookup table
+        kinds = sorted({h.periodicity for h in habits})
+        kind_of = np.full(int(habit_ids.max()) + 1, -1, dtype=np.int8)
+        for h in habits:
+            if h.id < kind_of.size:
+                kind_of[h.id] = kinds.index(h.periodicity)
+        row_kind = kind_of[habit_ids]
+        periods = days.astype(np.int64)
+        for index, kind in enumerate(kinds):
+            mask = row_kind == index
+            if mask.any():
+                periods[mask] = period_from_day(periods[mask], kind)
+        return periods
+
+    periodicity = {h.id: h.periodicity for h in habits}
+    return [
+        period_from_day(day, periodicity.get(habit_id, "daily"))
+        for habit_id, day in zip(habit_ids, days)
+    ]
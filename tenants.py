@@ -0,0 +1,122 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar, Union
+
+from db import DEFAULT_PRAGMAS, PragmaProfile, open_database
+from models import Habit, TenantSummary
+
+T = TypeVar("T")
+
+# Default directory holding one <tenant>.db per household
+TENANTS_DIR = Path(__file__).parent / "tenants"
+
+# Tenant ids become file names, so keep them to a safe alphabet
+_TENANT_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]*$")
+
+
+class TenantRouter:
+    """
+    Maps tenant ids (one per household) to their own SQLite file.
+
+    Every tenant has an independent database, so tenants never contend for
+    the same write lock and can be analyzed in parallel (see fan_out).
+    """
+
+    def __init__(
+        self,
+        root: Optional[Union[str, Path]] = None,
+        pragmas: Optional[PragmaProfile] = DEFAULT_PRAGMAS,
+    ) -> None:
+        self.root = Path(root) if root else TENANTS_DIR
+        self.pragmas = pragmas
+
+    def path_for(self, tenant: str) -> Path:
+        """Return the database file of a tenant (it may not exist yet)."""
+        if not _TENANT_ID.match(tenant):
+            raise ValueError(
+                f"Invalid tenant id {tenant!r}: use letters, digits, '-' and '_'."
+            )
+        return self.root / f"{tenant}.db"
+
+    def tenants(self) -> List[str]:
+        """Return the ids of all tenants that have a database, sorted."""
+        if not self.root.is_dir():
+            return []
+        return sorted(p.stem for p in self.root.glob("*.db") if _TENANT_ID.match(p.stem))
+
+    def service(self, tenant: str, streak_backend: str = "materialized"):
+        """Open (creating and migrating if needed) a tenant's service."""
+        from repository import HabitRepository
+        from service import HabitService
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = open_database(self.path_for(tenant), self.pragmas)
+        return HabitService(repo=HabitRepository(conn=conn), streak_backend=streak_backend)
+
+    # ---------- Cross-tenant analytics ----------
+
+    def fan_out(
+        self,
+        fn: Callable[[str], T],
+        tenants: Optional[List[str]] = None,
+        max_workers: Optional[int] = None,
+    ) -> Dict[str, T]:
+        """
+        Call fn(database path) for every tenant in a process pool and return
+        {tenant: result}. fn must be a module-level function (it is pickled)
+        and its result must be picklable.
+        """
+        tenants = self.tenants() if tenants is None else tenants
+        paths = [str(self.path_for(t)) for t in tenants]
+        workers = min(len(paths), max_workers or os.cpu_count() or 1)
+        if workers <= 1:
+            # not worth starting processes for
+            return dict(zip(tenants, map(fn, paths)))
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(tenants, executor.map(fn, paths)))
+
+    def summaries(self, max_workers: Optional[int] = None) -> List[TenantSummary]:
+        """Habit / completion counts and best streak of every tenant."""
+        return list(self.fan_out(tenant_summary, max_workers=max_workers).values())
+
+    def longest_streak_overall(
+        self, max_workers: Optional[int] = None
+    ) -> Tuple[Optional[str], Optional[Habit], int]:
+        """
+        Return (tenant, habit, streak) for the longest streak of any tenant.
+        Ties go to the first tenant in sorted order.
+        """
+        return merge_longest_streaks(self.summaries(max_workers))
+
+
+def merge_longest_streaks(
+    summaries: List[TenantSummary],
+) -> Tuple[Optional[str], Optional[Habit], int]:
+    best = (None, None, 0)
+    for summary in summaries:
+        if summary.best_streak > best[2]:
+            best = (summary.tenant, summary.best_habit, summary.best_streak)
+    return best
+
+
+def tenant_summary(path: str) -> TenantSummary:
+    """Summarize one tenant database (runs in a worker process)."""
+    from repository import HabitRepository
+    from service import HabitService
+
+    repo = HabitRepository(conn=open_database(path))
+    try:
+        service = HabitService(repo=repo)
+        best_habit, best_streak = service.longest_streak_overall()
+        return TenantSummary(
+            tenant=Path(path).stem,
+            habits=len(service.list_habits()),
+            completions=repo.count_completions(),
+            best_habit=best_habit,
+            best_streak=best_streak,
+        )
+    finally:
+        repo.close()
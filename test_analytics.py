@@ -1,8 +1,20 @@
+import random
 from datetime import datetime, timezone, timedelta
 from typing import List
 
-from analytics import longest_streak_for
-from models import Completion
+import pytest
+
+from analytics import (
+    batch_streaks,
+    longest_streak_for,
+    load_numpy,
+    longest_streak_overall,
+    streak_state_for,
+    streak_states_ordered,
+    weekly_heatmap,
+)
+from models import Completion, Habit, epoch_day_ordinal
+from snapshot import period_column
 
 
 def make_completion(habit_id: int, days_ago: int) -> Completion:
@@ -45,4 +57,97 @@ def test_longest_streak_for_weekly():
         make_completion(1, 14),
         make_completion(1, 21),
     ]
-    assert longest_streak_for(completions, "weekly") == 4
\ No newline at end of file
+    assert longest_streak_for(completions, "weekly") == 4
+
+
+def random_history(seed: int):
+    """Helper to build random habits and completions with gaps and repeats."""
+    rng = random.Random(seed)
+    habits = [
+        Habit(id=i, name=f"h{i}", periodicity=rng.choice(["daily", "weekly"]),
+              created_at="2024-01-01T00:00:00+00:00")
+        for i in range(1, 30)
+    ]
+    start = datetime(2023, 11, 1, tzinfo=timezone.utc)
+    completions = []
+    for habit in habits:
+        day = 0
+        for _ in range(rng.randint(0, 60)):
+            day += rng.choice([0, 1, 1, 1, 2, 7, 8, 20])
+            at = start + timedelta(days=day, hours=rng.randint(0, 23))
+            completions.append(
+                Completion(id=None, habit_id=habit.id, completed_at=at.isoformat())
+            )
+    rng.shuffle(completions)
+    return habits, completions
+
+
+def columns(habits: List[Habit], completions: List[Completion]):
+    """Helper to build the (habit_id, period) columns of a snapshot."""
+    habit_ids = [c.habit_id for c in completions]
+    days = [epoch_day_ordinal(c.completed_ts) for c in completions]
+    return habit_ids, period_column(habits, habit_ids, days)
+
+
+def test_batch_streaks_python_matches_per_habit_streaks():
+    for seed in range(5):
+        habits, completions = random_history(seed)
+        batch = batch_streaks(*columns(habits, completions), use_numpy=False)
+
+        for habit in habits:
+            comps = [c for c in completions if c.habit_id == habit.id]
+            if comps:
+                assert batch[habit.id] == streak_state_for(comps, habit.periodicity)
+            else:
+                assert habit.id not in batch
+
+
+def test_batch_streaks_numpy_matches_python():
+    pytest.importorskip("numpy")
+    for seed in range(20):
+        habits, completions = random_history(seed)
+        habit_ids, periods = columns(habits, completions)
+
+        assert batch_streaks(habit_ids, periods, use_numpy=True) == batch_streaks(
+            habit_ids, periods, use_numpy=False
+        )
+
+
+def test_batch_streaks_empty():
+    assert batch_streaks([], [], use_numpy=False) == {}
+    if load_numpy() is not None:
+        assert batch_streaks([], [], use_numpy=True) == {}
+
+
+def test_longest_streak_overall_matches_per_habit_maximum():
+    habits, completions = random_history(7)
+    expected = max(
+        longest_streak_for([c for c in completions if c.habit_id == h.id], h.periodicity)
+        for h in habits
+    )
+    assert longest_streak_overall(habits, completions) == expected
+
+
+def test_streaming_streaks_match_grouped_streaks():
+    habits, completions = random_history(3)
+    ordered = sorted(completions, key=lambda c: (c.habit_id, c.completed_at))
+    periodicity = {h.id: h.periodicity for h in habits}
+
+    streamed = dict(streak_states_ordered(iter(ordered), periodicity))
+
+    assert streamed == batch_streaks(*columns(habits, completions), use_numpy=False)
+    assert longest_streak_overall(habits, iter(ordered), ordered=True) == (
+        longest_streak_overall(habits, completions)
+    )
+
+
+def test_weekly_heatmap_pads_partial_weeks():
+    # 2024-01-03 is a Wednesday, 2024-01-09 a Tuesday
+    first = datetime(2024, 1, 3).toordinal()
+    last = datetime(2024, 1, 9).toordinal()
+
+    rows = weekly_heatmap({first: 2, last: 1}, first, last)
+
+    assert [monday for monday, _ in rows] == [first - 2, first + 5]
+    assert rows[0][1] == [None, None, 2, 0, 0, 0, 0]
+    assert rows[1][1] == [0, 1, None, None, None, None, None]
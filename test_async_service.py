@@ -0,0 +1,33 @@
+import asyncio
+
+from async_service import AsyncHabitService
+from benchmarks.async_load import run_load
+
+
+def test_async_service_mirrors_habit_service(tmp_path):
+    async def scenario():
+        async with AsyncHabitService(tmp_path / "planner.db", readers=2) as service:
+            habit = await service.create_habit("Walk", "daily", one_per_period=True)
+            for day in (1, 2, 3):
+                await service.add_completion_at(habit.id, f"2024-01-0{day}T08:00:00+00:00")
+            _, created = await service.add_completion_at(habit.id, "2024-01-03T20:00:00+00:00")
+            assert not created
+
+            habits = await service.list_habits()
+            longest = await service.longest_streak_for_habit(habit.id)
+            best = await service.longest_streak_overall()
+            return habit, habits, longest, best
+
+    habit, habits, longest, (best_habit, best_streak) = asyncio.run(scenario())
+
+    assert [h.id for h in habits] == [habit.id]
+    assert longest == 3
+    assert (best_habit.id, best_streak) == (habit.id, 3)
+
+
+def test_concurrent_clients_load(tmp_path):
+    total, _, latencies = asyncio.run(
+        run_load(tmp_path / "load.db", clients=20, ops=20, habits=5, readers=4)
+    )
+
+    assert total == len(latencies) == 400
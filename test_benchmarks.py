@@ -0,0 +1,38 @@
+import sqlite3
+
+from benchmarks.generate import completion_rows, generate_database, habit_periodicities
+
+
+def dump(path):
+    conn = sqlite3.connect(path)
+    try:
+        return (
+            conn.execute("SELECT * FROM habits ORDER BY id").fetchall(),
+            conn.execute("SELECT * FROM completions ORDER BY id").fetchall(),
+            conn.execute("SELECT * FROM habit_streaks ORDER BY habit_id").fetchall(),
+        )
+    finally:
+        conn.close()
+
+
+def test_generator_is_deterministic(tmp_path):
+    generate_database(tmp_path / "a.db", habits=20, completions=2000, seed=7)
+    generate_database(tmp_path / "b.db", habits=20, completions=2000, seed=7)
+
+    habits, completions, streaks = dump(tmp_path / "a.db")
+    assert (habits, completions, streaks) == dump(tmp_path / "b.db")
+    assert len(habits) == 20
+    assert len(completions) == 2000
+    assert len(streaks) == 20
+
+
+def test_generated_histories_have_gaps_repeats_and_backfills():
+    periodicities = habit_periodicities(5, seed=1)
+    rows = list(completion_rows(periodicities, 5000, seed=1))
+    history = [ts for habit_id, ts in rows if habit_id == 1]
+    step = 7 * 86400 if periodicities[0] == "weekly" else 86400
+    periods = [ts // step for ts in history]
+
+    assert any(b < a for a, b in zip(history, history[1:]))          # out of order
+    assert len(set(periods)) < len(periods)                           # repeats
+    assert any(b - a > 1 for a, b in zip(sorted(set(periods)), sorted(set(periods))[1:]))  # gaps
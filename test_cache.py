@@ -0,0 +1,32 @@
+from cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1          # "a" is now the most recent
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats() == {"hits": 3, "misses": 1, "size": 2, "maxsize": 2}
+
+
+def test_lru_cache_drops_entries_with_an_old_token():
+    cache = LRUCache()
+    cache.put("a", 1, token=5)
+
+    assert cache.get("a", token=5) == 1
+    assert cache.get("a", token=6) is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_of_size_zero_stores_nothing():
+    cache = LRUCache(maxsize=0)
+    calls = []
+
+    for _ in range(3):
+        cache.get_or_compute("a", lambda: calls.append(1) or 1)
+
+    assert len(calls) == 3
@@ -0,0 +1,292 @@
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import pytest
+
+from db import (
+    DEFAULT_PRAGMAS,
+    MEMORY,
+    MIGRATIONS,
+    SCHEMA_VERSION,
+    TEMPORARY,
+    ConnectionPool,
+    PeriodicCheckpoint,
+    get_connection,
+    get_schema_version,
+    load_into_memory,
+    migrate,
+    open_database,
+)
+from repository import HabitRepository
+
+
+def make_conn() -> sqlite3.Connection:
+    """Helper to create an empty in-memory database."""
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params=()) -> str:
+    """Helper to return the EXPLAIN QUERY PLAN details as one string."""
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return "\n".join(row["detail"] for row in rows)
+
+
+def test_migrate_sets_user_version():
+    conn = make_conn()
+    assert get_schema_version(conn) == 0
+    assert migrate(conn) == SCHEMA_VERSION
+    assert get_schema_version(conn) == SCHEMA_VERSION
+    # running it again is a no-op
+    assert migrate(conn) == SCHEMA_VERSION
+
+
+def test_migrate_upgrades_legacy_database_in_place():
+    # a planner.db created before migrations existed (user_version = 0)
+    conn = make_conn()
+    conn.execute(
+        """
+        CREATE TABLE habits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            periodicity TEXT NOT NULL CHECK (periodicity IN ('daily', 'weekly')),
+            created_at TEXT NOT NULL,
+            is_archived INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE completions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            habit_id INTEGER NOT NULL,
+            completed_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "INSERT INTO habits (name, periodicity, created_at) VALUES (?, ?, ?)",
+        ("Walk", "daily", "2024-01-01T00:00:00+00:00"),
+    )
+    conn.execute(
+        "INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)",
+        (1, "2024-01-01T08:00:00+00:00"),
+    )
+    conn.commit()
+
+    migrate(conn)
+
+    assert get_schema_version(conn) == SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0] == 1
+
+
+def test_migrate_drops_completions_of_deleted_habits():
+    # older versions deleted habits with foreign keys off, leaving orphans
+    conn = make_conn()
+    MIGRATIONS[0](conn)
+    conn.execute(
+        "INSERT INTO habits (name, periodicity, created_at) VALUES (?, ?, ?)",
+        ("Walk", "daily", "2024-01-01T00:00:00+00:00"),
+    )
+    conn.executemany(
+        "INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)",
+        [(1, "2024-01-01T08:00:00+00:00"), (2, "2024-01-02T08:00:00+00:00")],
+    )
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+
+    assert migrate(conn) == SCHEMA_VERSION
+    assert [r[0] for r in conn.execute("SELECT habit_id FROM completions")] == [1]
+    assert conn.execute("PRAGMA foreign_key_check").fetchone() is None
+
+
+def completion_scans(fn) -> list:
+    """Helper to run fn(repo) on a new repository and return its completion SELECTs."""
+    conn = make_conn()
+    migrate(conn)
+    repo = HabitRepository(conn=conn)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        fn(repo)
+    finally:
+        conn.set_trace_callback(None)
+    scans = [sql for sql in statements if sql.startswith("SELECT * FROM completions")]
+    assert scans
+    return [query_plan(conn, sql) for sql in scans]
+
+
+def test_completions_for_habit_uses_index():
+    for plan in completion_scans(lambda repo: repo.list_completions_for_habit(1)):
+        assert "idx_completions_habit_time (habit_id=?)" in plan
+        # the index already delivers rows in order, so there is no extra sort
+        assert "TEMP B-TREE" not in plan
+
+
+def test_grouped_completions_scan_needs_no_sort():
+    for plan in completion_scans(lambda repo: list(repo.iter_completions())):
+        assert "idx_completions_habit_time" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+def test_time_ordered_scan_needs_no_sort():
+    for plan in completion_scans(lambda repo: repo.list_all_completions()):
+        assert "idx_completions_time" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+def test_pool_gives_each_thread_its_own_connection(tmp_path):
+    pool = ConnectionPool(tmp_path / "planner.db")
+    main_conn = pool.connection()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        other_conn = executor.submit(pool.connection).result()
+
+    assert pool.connection() is main_conn
+    assert other_conn is not main_conn
+    pool.close_all()
+
+
+def test_pragma_profile_enables_wal(tmp_path):
+    conn = get_connection(tmp_path / "planner.db")
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == DEFAULT_PRAGMAS.busy_timeout
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    conn.close()
+
+
+def test_epoch_migration_converts_text_timestamps():
+    conn = make_conn()
+    for step in MIGRATIONS[:3]:
+        step(conn)
+    conn.execute("PRAGMA user_version = 3")
+    conn.execute(
+        "INSERT INTO habits (name, periodicity, created_at) VALUES (?, ?, ?)",
+        ("Walk", "daily", "2024-01-01T00:00:00+00:00"),
+    )
+    conn.executemany(
+        "INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)",
+        [
+            (1, "2024-01-01T08:00:00.123456+00:00"),
+            (1, "2024-01-01T23:30:00-05:00"),  # already Jan 2 in UTC
+            (1, "2024-01-03"),                 # naive means UTC
+        ],
+    )
+    conn.commit()
+
+    migrate(conn)
+
+    rows = conn.execute(
+        "SELECT completed_ts, day_ord, week_ord FROM completions ORDER BY id"
+    ).fetchall()
+    expected = []
+    for iso in ("2024-01-01T08:00:00+00:00", "2024-01-02T04:30:00+00:00", "2024-01-03T00:00:00+00:00"):
+        ts = int(datetime.fromisoformat(iso).timestamp())
+        day = datetime.fromisoformat(iso).date().toordinal()
+        expected.append((ts, day, (day - 1) // 7))
+    assert [tuple(row) for row in rows] == expected
+
+
+def test_period_counts_migration_backfills_rollup():
+    conn = make_conn()
+    for step in MIGRATIONS[:4]:
+        step(conn)
+    conn.execute("PRAGMA user_version = 4")
+    conn.execute(
+        "INSERT INTO habits (name, periodicity, created_at) VALUES (?, ?, ?)",
+        ("Walk", "daily", "2024-01-01T00:00:00+00:00"),
+    )
+    day = date(2024, 1, 1).toordinal()
+    conn.executemany(
+        "INSERT INTO completions (habit_id, completed_ts, day_ord, week_ord) VALUES (1, ?, ?, ?)",
+        [(0, day, (day - 1) // 7), (1, day, (day - 1) // 7), (2, day + 1, (day - 1) // 7)],
+    )
+    conn.commit()
+
+    migrate(conn)
+
+    rows = conn.execute(
+        "SELECT period_kind, period_ord, count FROM period_counts ORDER BY 1, 2"
+    ).fetchall()
+    assert [tuple(r) for r in rows] == [
+        ("daily", day, 2),
+        ("daily", day + 1, 1),
+        ("weekly", (day - 1) // 7, 3),
+    ]
+
+
+def test_custom_periodicity_migration_keeps_completions():
+    conn = make_conn()
+    conn.execute("PRAGMA foreign_keys = ON")
+    for step in MIGRATIONS[:5]:
+        step(conn)
+    conn.execute("PRAGMA user_version = 5")
+    conn.executemany(
+        "INSERT INTO habits (name, periodicity, created_at) VALUES (?, ?, ?)",
+        [("Walk", "daily", "2024-01-01T00:00:00+00:00"),
+         ("Gone", "daily", "2024-01-01T00:00:00+00:00")],
+    )
+    conn.execute("DELETE FROM habits WHERE id = 2")
+    day = date(2024, 1, 1).toordinal()
+    conn.execute(
+        "INSERT INTO completions (habit_id, completed_ts, day_ord, week_ord) VALUES (1, 0, ?, ?)",
+        (day, (day - 1) // 7),
+    )
+    conn.commit()
+
+    migrate(conn)
+
+    assert conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0] == 1
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    conn.execute(
+        "INSERT INTO habits (name, periodicity, created_at) VALUES ('Pay rent', 'monthly', '')"
+    )
+    conn.execute(
+        "INSERT INTO habits (name, periodicity, created_at) VALUES ('Clean', 'every-3-days', '')"
+    )
+    # ids are not reused after the table rebuild
+    assert [r[0] for r in conn.execute("SELECT id FROM habits")] == [1, 3, 4]
+    for bad in ("yearly", "every-0-days", "every-x-days", "every-3x-days"):
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute(
+                "INSERT INTO habits (name, periodicity, created_at) VALUES ('x', ?, '')", (bad,)
+            )
+
+
+def test_memory_and_temporary_databases_are_private():
+    for path in (MEMORY, TEMPORARY):
+        first, second = open_database(path), open_database(path)
+        first.execute("INSERT INTO habits (name, periodicity, created_at) VALUES ('a', 'daily', '')")
+        assert second.execute("SELECT COUNT(*) FROM habits").fetchone()[0] == 0
+    with pytest.raises(ValueError):
+        ConnectionPool(MEMORY)
+
+
+def test_memory_copy_is_saved_back_with_the_backup_api(tmp_path):
+    path = tmp_path / "planner.db"
+    disk = open_database(path)
+    disk.execute("INSERT INTO habits (name, periodicity, created_at) VALUES ('a', 'daily', '')")
+    disk.commit()
+
+    conn = load_into_memory(path)
+    conn.execute("INSERT INTO habits (name, periodicity, created_at) VALUES ('b', 'daily', '')")
+    conn.commit()
+    assert disk.execute("SELECT COUNT(*) FROM habits").fetchone()[0] == 1
+
+    checkpoint = PeriodicCheckpoint(conn, path, interval=0.01)
+    time.sleep(0.02)
+    conn.execute("INSERT INTO habits (name, periodicity, created_at) VALUES ('c', 'daily', '')")
+    # never saved while a transaction is open
+    checkpoint.after_commit()
+    assert checkpoint.saves == 0
+    conn.commit()
+    checkpoint.after_commit()
+    assert disk.execute("SELECT COUNT(*) FROM habits").fetchone()[0] == 3
+
+    conn.execute("DELETE FROM habits")
+    conn.commit()
+    checkpoint.close()
+    assert disk.execute("SELECT COUNT(*) FROM habits").fetchone()[0] == 0
@@ -0,0 +1,39 @@
+import pytest
+
+from importer import read_completions
+
+
+def test_read_completions_csv(tmp_path):
+    path = tmp_path / "completions.csv"
+    path.write_text(
+        "habit_id,completed_at\n"
+        "1,2024-01-01T08:00:00+00:00\n"
+        "2,2024-01-02T08:00:00+00:00\n"
+    )
+
+    assert list(read_completions(str(path))) == [
+        (1, "2024-01-01T08:00:00+00:00"),
+        (2, "2024-01-02T08:00:00+00:00"),
+    ]
+
+
+def test_read_completions_jsonl_skips_blank_lines(tmp_path):
+    path = tmp_path / "completions.jsonl"
+    path.write_text(
+        '{"habit_id": 1, "completed_at": "2024-01-01T08:00:00+00:00"}\n'
+        "\n"
+        '{"habit_id": 3, "completed_at": "2024-01-05T08:00:00+00:00"}\n'
+    )
+
+    assert list(read_completions(str(path))) == [
+        (1, "2024-01-01T08:00:00+00:00"),
+        (3, "2024-01-05T08:00:00+00:00"),
+    ]
+
+
+def test_read_completions_reports_bad_line(tmp_path):
+    path = tmp_path / "completions.csv"
+    path.write_text("habit_id,completed_at\nabc,2024-01-01\n")
+
+    with pytest.raises(ValueError, match="Line 2"):
+        list(read_completions(str(path)))
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+import pytest
+
+from periods import parse_periodicity, period_from_day, period_start_day
+
+
+def test_parse_periodicity_normalizes_and_rejects():
+    assert parse_periodicity(" Monthly ") == "monthly"
+    assert parse_periodicity("every-3-days") == "every-3-days"
+    assert parse_periodicity("every-1-days") == "daily"
+    assert parse_periodicity("every-7-days") == "weekly"
+    for bad in ("yearly", "every-0-days", "every-03-days", "every--2-days", ""):
+        with pytest.raises(ValueError):
+            parse_periodicity(bad)
+
+
+@pytest.mark.parametrize("periodicity", ["daily", "weekly", "monthly", "every-3-days"])
+def test_periods_are_consecutive_integers(periodicity):
+    # walk day by day across leap years and century boundaries
+    day = date(1899, 12, 1)
+    previous = period_from_day(day.toordinal(), periodicity)
+    assert period_start_day(previous, periodicity) <= day.toordinal()
+    while day < date(2101, 3, 1):
+        day += timedelta(days=1)
+        period = period_from_day(day.toordinal(), periodicity)
+        assert period in (previous, previous + 1)
+        if period != previous:
+            assert period_start_day(period, periodicity) == day.toordinal()
+        previous = period
+
+
+def test_monthly_and_weekly_follow_the_calendar():
+    assert period_from_day(date(2024, 2, 29).toordinal(), "monthly") == 2024 * 12 + 1
+    assert period_start_day(2024 * 12 + 2, "monthly") == date(2024, 3, 1).toordinal()
+    # ISO weeks start on Monday and run across the new year
+    monday = date(2024, 12, 30)
+    assert period_from_day(monday.toordinal(), "weekly") == period_from_day(
+        date(2025, 1, 5).toordinal(), "weekly"
+    )
@@ -0,0 +1,57 @@
+import json
+
+from cli import create_parser, run_cli
+from profiling import ProfiledConnection, Profiler
+
+
+def test_profiler_records_queries_rows_and_calls(service):
+    habit = service.create_habit("Walk", "daily")
+    for day in range(1, 4):
+        service.add_completion_at(habit.id, f"2024-01-0{day}T08:00:00+00:00")
+
+    profiler = Profiler()
+    profiler.attach(service)
+    assert service.list_completions_for_habit(habit.id)
+    service.streak_report()
+    Profiler.detach(service)
+
+    report = profiler.to_dict()
+    methods = {c["method"]: c for c in report["calls"]}
+    assert methods["HabitService.list_completions_for_habit"]["calls"] == 1
+    assert "HabitService.streak_report" in methods
+
+    completions = [q for q in report["queries"] if "FROM completions" in q["sql"]]
+    assert completions and completions[0]["rows"] == 3
+    assert all("\n" not in q["sql"] for q in report["queries"])
+
+
+def test_profiler_counts_rows_written(service):
+    habit = service.create_habit("Walk", "daily")
+    profiler = Profiler()
+    profiler.attach(service)
+
+    service.import_completions(
+        [(habit.id, f"2024-01-0{day}T08:00:00+00:00") for day in range(1, 6)]
+    )
+
+    inserts = [q for q in profiler.to_dict()["queries"] if q["sql"].startswith("INSERT INTO completions")]
+    assert inserts[0]["rows"] == 5
+
+
+def test_no_wrapping_without_profiler(service):
+    assert not isinstance(service.repo.conn, ProfiledConnection)
+    Profiler().attach(service)
+    assert isinstance(service.repo.conn, ProfiledConnection)
+
+
+def test_cli_profile_json(service, capsys):
+    service.create_habit("Walk", "daily")
+    args = create_parser().parse_args(["--profile-json", "list"])
+
+    run_cli(args, service=service)
+
+    out, err = capsys.readouterr()
+    assert "[1] Walk" in out
+    report = json.loads(err)
+    assert report["calls"][0]["method"] == "HabitService.list_habits"
+    assert service.profiler is None and service.repo.profiler is None
@@ -0,0 +1,394 @@
+import sqlite3
+from datetime import date, datetime, timezone
+from itertools import islice
+
+import pytest
+
+from analytics import streak_state_for
+from db import migrate, open_database
+from models import Completion
+from repository import DEPENDENT_TABLES, HabitRepository, completion_key
+
+
+def iso(day: date, hour: int = 8) -> str:
+    """Helper to build a UTC ISO timestamp on a given day."""
+    return datetime(day.year, day.month, day.day, hour, tzinfo=timezone.utc).isoformat()
+
+
+def stored_state(repo: HabitRepository, habit_id: int):
+    state = repo.get_streak_state(habit_id)
+    return state.current_streak, state.longest_streak, state.last_period
+
+
+def test_streak_state_updates_incrementally(repo):
+    habit = repo.create_habit("Walk", "daily")
+    assert stored_state(repo, habit.id) == (0, 0, None)
+
+    for day in (1, 2, 3, 5, 6):
+        repo.add_completion(habit.id, iso(date(2024, 1, day)))
+
+    assert stored_state(repo, habit.id) == (2, 3, date(2024, 1, 6).toordinal())
+
+
+def test_same_period_completions_count_once(repo):
+    habit = repo.create_habit("Walk", "daily")
+
+    repo.add_completion(habit.id, iso(date(2024, 1, 1), hour=8))
+    repo.add_completion(habit.id, iso(date(2024, 1, 1), hour=20))
+    repo.add_completion(habit.id, iso(date(2024, 1, 2)))
+
+    assert stored_state(repo, habit.id)[:2] == (2, 2)
+
+
+def test_out_of_order_backfill_rebuilds_state(repo):
+    habit = repo.create_habit("Walk", "daily")
+
+    repo.add_completion(habit.id, iso(date(2024, 1, 1)))
+    repo.add_completion(habit.id, iso(date(2024, 1, 3)))
+    assert stored_state(repo, habit.id)[:2] == (1, 1)
+
+    # backfilling the missing day joins both runs
+    repo.add_completion(habit.id, iso(date(2024, 1, 2)))
+    assert stored_state(repo, habit.id)[:2] == (3, 3)
+
+
+def test_weekly_streak_spans_year_boundary(repo):
+    habit = repo.create_habit("Save", "weekly")
+
+    for day in (date(2024, 12, 23), date(2024, 12, 30), date(2025, 1, 6)):
+        repo.add_completion(habit.id, iso(day))
+
+    assert stored_state(repo, habit.id)[:2] == (3, 3)
+
+
+def test_missing_state_is_rebuilt_from_history(repo):
+    habit = repo.create_habit("Walk", "daily")
+    for day in (1, 2, 4):
+        repo.add_completion(habit.id, iso(date(2024, 1, day)))
+
+    # simulate a habit created before the streak state existed
+    repo.conn.execute("DELETE FROM habit_streaks")
+    repo.conn.commit()
+
+    completions = repo.list_completions_for_habit(habit.id)
+    assert stored_state(repo, habit.id) == streak_state_for(completions, "daily")
+
+
+def test_rebuild_all_matches_incremental_state(repo):
+    walk = repo.create_habit("Walk", "daily")
+    save = repo.create_habit("Save", "weekly")
+    empty = repo.create_habit("Read", "daily")
+    for day in (1, 2, 3, 9, 10):
+        repo.add_completion(walk.id, iso(date(2024, 1, day)))
+    for day in (1, 8, 22):
+        repo.add_completion(save.id, iso(date(2024, 1, day)))
+    before = [stored_state(repo, h.id) for h in (walk, save, empty)]
+
+    repo.rebuild_streak_states()
+
+    assert [stored_state(repo, h.id) for h in (walk, save, empty)] == before
+
+
+def test_delete_habit_clears_every_table_without_foreign_keys(tmp_path):
+    repo = make_file_repo(tmp_path / "planner.db")
+    assert repo.conn.execute("PRAGMA foreign_keys").fetchone()[0] == 0
+    walk = repo.create_habit("Walk", "daily")
+    read = repo.create_habit("Read", "daily")
+    for habit in (walk, read):
+        repo.add_completion(habit.id, iso(date(2024, 1, 1)))
+    repo.archive_habit(read.id)
+    repo.move_to_cold()
+
+    for habit in (walk, read):
+        repo.delete_habit(habit.id)
+
+    for table in DEPENDENT_TABLES:
+        assert repo.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
+
+
+def test_delete_habit_removes_streak_state(repo):
+    habit = repo.create_habit("Walk", "daily")
+    repo.delete_habit(habit.id)
+
+    assert repo.get_streak_state(habit.id) is None
+
+
+def make_file_repo(path) -> HabitRepository:
+    """Helper to create a repository on a database file (visible to other connections)."""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    migrate(conn)
+    return HabitRepository(conn=conn)
+
+
+def committed_completions(path) -> int:
+    """Helper to count the completions another connection can see."""
+    other = sqlite3.connect(path)
+    try:
+        return other.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+    finally:
+        other.close()
+
+
+def test_write_batch_groups_commits(tmp_path):
+    path = tmp_path / "planner.db"
+    repo = make_file_repo(path)
+    habit = repo.create_habit("Walk", "daily")
+
+    with repo.write_batch(max_pending=3, max_delay=60):
+        ids = [repo.add_completion(habit.id, iso(date(2024, 1, day)))[0].id for day in (1, 2)]
+        assert committed_completions(path) == 0
+
+        ids.append(repo.add_completion(habit.id, iso(date(2024, 1, 3)))[0].id)
+        assert committed_completions(path) == 3
+
+        ids.append(repo.add_completion(habit.id, iso(date(2024, 1, 4)))[0].id)
+        repo.flush()
+        assert committed_completions(path) == 4
+
+        ids.append(repo.add_completion(habit.id, iso(date(2024, 1, 5)))[0].id)
+
+    assert committed_completions(path) == 5
+    assert ids == [c.id for c in repo.list_completions_for_habit(habit.id)]
+    assert stored_state(repo, habit.id)[:2] == (5, 5)
+
+
+def test_write_batch_rolls_back_on_error(tmp_path):
+    path = tmp_path / "planner.db"
+    repo = make_file_repo(path)
+    habit = repo.create_habit("Walk", "daily")
+
+    with pytest.raises(RuntimeError):
+        with repo.write_batch(max_pending=10):
+            repo.add_completion(habit.id, iso(date(2024, 1, 1)))
+            raise RuntimeError("boom")
+
+    assert committed_completions(path) == 0
+    assert repo.get_streak_state(habit.id).longest_streak == 0
+
+
+def test_write_batch_rejects_unknown_durability(repo):
+    with pytest.raises(ValueError):
+        with repo.write_batch(durability="sometimes"):
+            pass
+
+
+def test_iter_completions_filters_by_habit_and_time_range(repo):
+    walk = repo.create_habit("Walk", "daily")
+    save = repo.create_habit("Save", "weekly")
+    for day in range(1, 8):
+        repo.add_completion(walk.id, iso(date(2024, 1, day)))
+        repo.add_completion(save.id, iso(date(2024, 1, day)))
+
+    window = repo.iter_completions(
+        habit_id=walk.id, since=iso(date(2024, 1, 3), 0), until=iso(date(2024, 1, 6), 0)
+    )
+
+    assert [c.completed_at for c in window] == [
+        iso(date(2024, 1, day)) for day in (3, 4, 5)
+    ]
+
+
+@pytest.mark.parametrize("order", ["habit", "time"])
+def test_iter_completions_keyset_pages_cover_everything(order, repo):
+    habits = [repo.create_habit(f"h{i}", "daily") for i in range(3)]
+    for day in range(1, 11):
+        for habit in habits:
+            repo.add_completion(habit.id, iso(date(2024, 1, day)))
+    everything = list(repo.iter_completions(order=order, batch_size=4))
+
+    pages, after = [], None
+    while True:
+        page = list(islice(repo.iter_completions(order=order, after=after), 7))
+        if not page:
+            break
+        pages.extend(page)
+        after = completion_key(page[-1], order)
+
+    assert len(everything) == 30
+    assert [c.id for c in pages] == [c.id for c in everything]
+
+
+def test_completion_model_stores_epoch_seconds():
+    completion = Completion(id=None, habit_id=1, completed_at="2024-01-01T09:00:00+01:00")
+
+    assert completion.completed_ts == 1704096000
+    assert completion.completed_at == "2024-01-01T08:00:00+00:00"
+    assert not hasattr(completion, "__dict__")
+    assert completion == Completion(id=None, habit_id=1, completed_ts=1704096000)
+
+
+def period_counts_table(repo: HabitRepository):
+    return repo.conn.execute(
+        "SELECT * FROM period_counts ORDER BY habit_id, period_kind, period_ord"
+    ).fetchall()
+
+
+def test_period_counts_follow_every_write_path(repo):
+    walk = repo.create_habit("Walk", "daily")
+    read = repo.create_habit("Read", "weekly")
+    repo.add_completion(walk.id, iso(date(2024, 1, 1)))
+    repo.add_completion(walk.id, iso(date(2024, 1, 1), hour=20))
+    repo.add_completions_bulk(
+        [(read.id, iso(date(2024, 1, d))) for d in (1, 3, 9)] + [(walk.id, iso(date(2024, 1, 2)))]
+    )
+
+    incremental = [tuple(r) for r in period_counts_table(repo)]
+    repo.rebuild_period_counts()
+    assert incremental == [tuple(r) for r in period_counts_table(repo)]
+
+    day = date(2024, 1, 1).toordinal()
+    assert repo.period_counts(walk.id, "daily", day, day + 6) == {day: 2, day + 1: 1}
+    week = (day - 1) // 7
+    assert repo.period_counts(read.id, "weekly", week, week + 1) == {week: 2, week + 1: 1}
+    assert repo.completed_period_counts("daily", day, day) == {walk.id: 1, read.id: 1}
+
+    repo.delete_habit(walk.id)
+    assert {r["habit_id"] for r in period_counts_table(repo)} == {read.id}
+
+
+def test_one_per_period_habits_skip_repeats(repo):
+    walk = repo.create_habit("Walk", "daily", one_per_period=True)
+    save = repo.create_habit("Save", "weekly", one_per_period=True)
+
+    first, created = repo.add_completion(walk.id, iso(date(2024, 1, 1)))
+    assert created
+    again, created = repo.add_completion(walk.id, iso(date(2024, 1, 1), hour=20))
+    assert again == first and not created
+    inserted = repo.add_completions_bulk(
+        [(save.id, iso(date(2024, 1, d))) for d in (1, 3, 9, 10)]
+        + [(walk.id, iso(date(2024, 1, d))) for d in (1, 2, 2)],
+        chunk_size=3,
+    )
+
+    assert inserted == 3
+    assert repo.count_completions() == 4
+    incremental = [tuple(r) for r in period_counts_table(repo)]
+    repo.rebuild_period_counts()
+    assert incremental == [tuple(r) for r in period_counts_table(repo)]
+    assert stored_state(repo, walk.id)[:2] == (2, 2)
+    assert stored_state(repo, save.id)[:2] == (2, 2)
+
+
+def test_repeated_period_does_not_keep_the_database_locked(tmp_path):
+    path = tmp_path / "planner.db"
+    repo = make_file_repo(path)
+    walk = repo.create_habit("Walk", "daily", one_per_period=True)
+    repo.add_completion(walk.id, iso(date(2024, 1, 1)))
+    repo.add_completion(walk.id, iso(date(2024, 1, 1), hour=20))
+    assert not repo.conn.in_transaction
+
+    other = sqlite3.connect(path, timeout=0)
+    try:
+        other.execute(
+            "INSERT INTO habits (name, periodicity, created_at) VALUES ('Read', 'daily', '')"
+        )
+        other.commit()
+    finally:
+        other.close()
+
+
+def test_compact_keeps_the_first_completion_of_each_period(repo):
+    walk = repo.create_habit("Walk", "daily")
+    read = repo.create_habit("Read", "daily")
+    for hour in (20, 8, 12):
+        repo.add_completion(walk.id, iso(date(2024, 1, 1), hour=hour))
+        repo.add_completion(read.id, iso(date(2024, 1, 1), hour=hour))
+    repo.add_completion(walk.id, iso(date(2024, 1, 2)))
+    before = stored_state(repo, walk.id)
+
+    assert repo.compact([walk.id], one_per_period=True) == 2
+
+    hours = [
+        datetime.fromtimestamp(c.completed_ts, timezone.utc).hour
+        for c in repo.list_completions_for_habit(walk.id)
+    ]
+    assert hours == [8, 8]
+    assert len(repo.list_completions_for_habit(read.id)) == 3
+    assert stored_state(repo, walk.id) == before
+    day = date(2024, 1, 1).toordinal()
+    assert repo.period_counts(walk.id, "daily", day, day + 1) == {day: 1, day + 1: 1}
+    # from now on repeats are not stored
+    repo.add_completion(walk.id, iso(date(2024, 1, 2), hour=23))
+    assert repo.get_habit(walk.id).one_per_period
+    assert repo.count_completions() == 5
+    # without the opt-in only the repeats go
+    assert repo.compact() == 2
+    assert not repo.get_habit(read.id).one_per_period
+    repo.add_completion(read.id, iso(date(2024, 1, 1), hour=23))
+    assert len(repo.list_completions_for_habit(read.id)) == 2
+
+
+def test_cold_storage_moves_and_restores_archived_histories(repo):
+    walk = repo.create_habit("Walk", "daily")
+    read = repo.create_habit("Read", "daily")
+    for d in (1, 2, 3, 5, 5, 6):
+        repo.add_completion(walk.id, iso(date(2024, 1, d)))
+    repo.add_completion(read.id, iso(date(2024, 1, 1)))
+    history = repo.list_completions_for_habit(walk.id)
+    state = stored_state(repo, walk.id)
+    rollup = [tuple(r) for r in period_counts_table(repo)]
+
+    repo.archive_habit(walk.id)
+    assert repo.move_to_cold() == (1, 6)
+
+    # gone from the hot table, but still read per habit (and counted)
+    assert [c.habit_id for c in repo.iter_completions()] == [read.id]
+    assert repo.list_completions_for_habit(walk.id) == history
+    # full listings merge the cold history back in
+    everything = repo.list_all_completions()
+    assert [c.completed_ts for c in everything] == sorted(c.completed_ts for c in everything)
+    assert sorted(everything, key=lambda c: c.id) == sorted(
+        history + repo.list_completions_for_habit(read.id), key=lambda c: c.id
+    )
+    since = list(repo.iter_completions(habit_id=walk.id, since=iso(date(2024, 1, 5))))
+    assert since == history[3:]
+    assert repo.count_completions() == 7
+    assert repo.cold_summaries() == {walk.id: (6, state)}
+    assert repo.streaks_sql()[walk.id] == state
+    repo.rebuild_streak_states()
+    repo.rebuild_period_counts()
+    assert stored_state(repo, walk.id) == state
+    assert [tuple(r) for r in period_counts_table(repo)] == rollup
+
+    repo.unarchive_habit(walk.id)
+    assert repo.cold_summaries() == {}
+    assert list(repo.iter_completions(habit_id=walk.id)) == history
+    assert not repo.get_habit(walk.id).is_archived
+
+
+def test_in_memory_repository_writes_back_on_checkpoint(tmp_path):
+    path = tmp_path / "planner.db"
+    HabitRepository(conn=open_database(path)).create_habit("Walk", "daily")
+
+    repo = HabitRepository(path=path, in_memory=True)
+    habit = repo.create_habit("Read", "daily")
+    repo.add_completion(habit.id, iso(date(2024, 1, 1)))
+    on_disk = HabitRepository(conn=open_database(path))
+    assert len(on_disk.list_habits()) == 1
+
+    repo.checkpoint()
+    assert [h.name for h in on_disk.list_habits()] == ["Walk", "Read"]
+    assert on_disk.count_completions() == 1
+
+    saved = HabitRepository(path=path, in_memory=True, checkpoint_every=60)
+    saved.archive_habit(habit.id)
+    saved.close()
+    assert on_disk.get_habit(habit.id).is_archived
+    with pytest.raises(ValueError):
+        HabitRepository(path=":memory:", in_memory=True).checkpoint()
+    with pytest.raises(ValueError):
+        HabitRepository(conn=open_database(path), path=path, in_memory=True)
+
+
+def test_bulk_writes_trigger_periodic_saves(tmp_path):
+    path = tmp_path / "planner.db"
+    repo = HabitRepository(path=path, in_memory=True, checkpoint_every=0)
+    habit = repo.create_habit("Walk", "daily")
+    on_disk = HabitRepository(conn=open_database(path))
+
+    repo.add_completions_bulk([(habit.id, iso(date(2024, 1, d))) for d in (1, 2)])
+    assert on_disk.count_completions() == 2
+    repo.archive_habit(habit.id)
+    repo.move_to_cold()
+    assert list(on_disk.cold_summaries()) == [habit.id]
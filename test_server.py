@@ -0,0 +1,92 @@
+import io
+import socket
+import threading
+import time
+
+import pytest
+
+from cli import create_parser
+from server import execute_line, send_command, serve
+from service import HabitService
+
+
+def run(line: str, service: HabitService) -> str:
+    out = io.StringIO()
+    execute_line(line, create_parser(), service, out)
+    return out.getvalue()
+
+
+def test_execute_line_reuses_one_service(service):
+    assert run("add 'Read a book' --period daily", service) == "Habit added: 1 - Read a book\n"
+    assert run("complete 1 --at 2024-01-01T08:00:00+00:00", service).startswith(
+        "Completion added"
+    )
+    assert run("list", service) == "[1] Read a book (daily), archived=False\n"
+
+
+def test_complete_reports_a_repeated_period(service):
+    run("add Walk --period daily --one-per-period", service)
+    at = "--at 2024-01-01T08:00:00+00:00"
+
+    assert run(f"complete 1 {at}", service).startswith("Completion added")
+    # the same timestamp again is still a repeat
+    assert run(f"complete 1 {at}", service).startswith("Already completed this period")
+
+
+def test_execute_line_reports_errors_without_exiting(service):
+    assert "argument --period" in run("add x --period yearly", service)
+    assert "argument --k: must be at least 1" in run("analytics top --k 0", service)
+    assert "argument --limit: must be at least 1" in run("list --limit -2", service)
+    assert run("complete 42", service) == "Error: Habit with id 42 not found.\n"
+    assert run("shell", service) == "Error: 'shell' is not available here.\n"
+
+
+def test_serve_and_send_over_unix_socket(tmp_path, service):
+    socket_path = tmp_path / "planner.sock"
+    server = threading.Thread(
+        target=serve, args=(create_parser(), service, socket_path), daemon=True
+    )
+    server.start()
+    for _ in range(100):
+        if socket_path.exists():
+            break
+        time.sleep(0.01)
+
+    assert send_command(["add", "Walk", "--period", "daily"], socket_path) == (
+        "Habit added: 1 - Walk\n"
+    )
+    assert send_command(["list"], socket_path) == "[1] Walk (daily), archived=False\n"
+
+    assert send_command(["shutdown"], socket_path) == "Server stopped.\n"
+    server.join(timeout=5)
+    assert not socket_path.exists()
+
+
+def test_serve_replaces_only_a_stale_socket(tmp_path, service):
+    socket_path = tmp_path / "planner.sock"
+    # a socket file nobody listens on, as left by a crashed server
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(str(socket_path))
+    server = threading.Thread(
+        target=serve,
+        args=(create_parser(), service, socket_path),
+        kwargs={"client_timeout": 0.2},
+        daemon=True,
+    )
+    server.start()
+    for _ in range(100):
+        try:
+            send_command(["list"], socket_path)
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.01)
+
+    with pytest.raises(RuntimeError, match="already listening"):
+        serve(create_parser(), service, socket_path)
+
+    # an idle client is dropped instead of blocking everyone else
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as idle:
+        idle.connect(str(socket_path))
+        assert send_command(["list"], socket_path) == ""
+    assert send_command(["shutdown"], socket_path) == "Server stopped.\n"
+    server.join(timeout=5)
@@ -0,0 +1,312 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from db import MEMORY, ConnectionPool, migrate, open_database
+from fixtures import seed_fixtures
+from repository import HabitRepository
+from service import STREAK_BACKENDS, HabitService
+
+
+@pytest.mark.parametrize("name", [MEMORY, "new.db"])
+def test_service_opened_by_path_gets_the_schema(tmp_path, name):
+    path = name if name == MEMORY else tmp_path / name
+    service = HabitService(path=path)
+    habit = service.create_habit("Walk", "daily")
+
+    assert [h.id for h in service.list_habits()] == [habit.id]
+    service.repo.close()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_streak_backends_agree(seed, service, seed_random):
+    habits = seed_random(service, seed)
+
+    for habit in habits:
+        results = {
+            backend: service.longest_streak_for_habit(habit.id, backend=backend)
+            for backend in STREAK_BACKENDS
+        }
+        assert len(set(results.values())) == 1, results
+
+    overall = {
+        backend: service.longest_streak_overall(backend=backend)
+        for backend in STREAK_BACKENDS
+    }
+    assert len({(h and h.id, s) for h, s in overall.values()}) == 1, overall
+
+
+def test_sql_backend_ignores_archived_habits_overall(service):
+    habit = service.create_habit("Walk", "daily")
+    service.add_completion_at(habit.id, "2024-01-01T08:00:00+00:00")
+    service.archive_habit(habit.id)
+
+    assert service.longest_streak_overall(backend="sql") == (None, 0)
+
+
+def test_unknown_backend_is_rejected(repo):
+    with pytest.raises(ValueError):
+        HabitService(repo=repo, streak_backend="magic")
+
+
+def test_import_completions_inserts_in_chunks(service):
+    habit = service.create_habit("Walk", "daily")
+    records = [(habit.id, f"2024-01-{day:02d}T08:00:00+00:00") for day in range(1, 11)]
+    progress = []
+
+    count = service.import_completions(iter(records), chunk_size=4, on_progress=progress.append)
+
+    assert count == 10
+    assert progress == [4, 8, 10]
+    assert len(service.list_completions_for_habit(habit.id)) == 10
+    assert service.longest_streak_for_habit(habit.id) == 10
+
+
+def test_import_completions_rolls_back_on_invalid_record(service):
+    habit = service.create_habit("Walk", "daily")
+    records = [
+        (habit.id, "2024-01-01T08:00:00+00:00"),
+        (habit.id, "2024-01-02T08:00:00+00:00"),
+        (999, "2024-01-03T08:00:00+00:00"),
+    ]
+
+    with pytest.raises(ValueError, match="Record 3"):
+        service.import_completions(records, chunk_size=1)
+
+    assert service.list_completions_for_habit(habit.id) == []
+
+
+def test_seed_fixtures_uses_bulk_import(service):
+    seed_fixtures(service)
+
+    assert len(service.list_habits()) == 5
+    assert service.longest_streak_overall()[1] == 28
+
+
+def test_service_is_usable_from_a_thread_pool(tmp_path):
+    pool = ConnectionPool(tmp_path / "planner.db")
+    migrate(pool.connection())
+    service = HabitService(repo=HabitRepository(pool=pool))
+    habits = [service.create_habit(f"h{i}", "daily") for i in range(4)]
+
+    def work(i):
+        habit = habits[i % len(habits)]
+        service.add_completion_at(habit.id, f"2024-01-{i // 4 + 1:02d}T08:00:00+00:00")
+        return service.longest_streak_for_habit(habit.id)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(40)))
+
+    assert [service.longest_streak_for_habit(h.id) for h in habits] == [10] * 4
+    pool.close_all()
+
+
+def count_queries(service: HabitService, fn):
+    """Helper to count the SQL statements run by fn()."""
+    statements = []
+    service.repo.conn.set_trace_callback(statements.append)
+    try:
+        fn()
+    finally:
+        service.repo.conn.set_trace_callback(None)
+    return len(statements)
+
+
+@pytest.mark.parametrize("backend", STREAK_BACKENDS)
+def test_streak_report_uses_fixed_number_of_queries(backend, make_service, seed_random):
+    small, large = make_service(), make_service()
+    seed_random(small, 1)
+    for seed in range(4):
+        seed_random(large, seed)
+    # materialize any lazily rebuilt state first
+    small.streak_report(backend=backend)
+    large.streak_report(backend=backend)
+
+    assert count_queries(small, lambda: small.streak_report(backend=backend)) == (
+        count_queries(large, lambda: large.streak_report(backend=backend))
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_streak_report_backends_agree(seed, service, seed_random):
+    seed_random(service, seed)
+
+    reports = [
+        [(r.habit.id, r.longest_streak, r.current_streak) for r in service.streak_report(backend=b)]
+        for b in STREAK_BACKENDS
+    ]
+
+    assert reports[0] == reports[1] == reports[2]
+    assert [r[1] for r in reports[0]] == [
+        service.longest_streak_for_habit(r[0]) for r in reports[0]
+    ]
+
+
+def test_current_streak_breaks_after_a_missed_period(service):
+    alive = service.create_habit("Walk", "daily")
+    broken = service.create_habit("Read", "daily")
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    for days_ago in (1, 2, 3):
+        service.add_completion_at(alive.id, (today - timedelta(days=days_ago)).isoformat())
+    for days_ago in (3, 4):
+        service.add_completion_at(broken.id, (today - timedelta(days=days_ago)).isoformat())
+
+    report = {r.habit.id: r for r in service.streak_report()}
+
+    assert report[alive.id].current_streak == 3
+    assert report[broken.id].current_streak == 0
+    assert report[broken.id].longest_streak == 2
+    assert service.current_streak_for_habit(alive.id) == 3
+
+
+def test_range_analytics_read_the_window_only(service):
+    from datetime import date
+
+    walk = service.create_habit("Walk", "daily")
+    save = service.create_habit("Save", "weekly")
+    for day in (1, 2, 3, 5, 6, 20):
+        service.add_completion_at(walk.id, f"2024-01-{day:02d}T08:00:00+00:00")
+    service.add_completion_at(save.id, "2024-01-02T08:00:00+00:00")
+
+    start, end = date(2024, 1, 1), date(2024, 1, 7)
+    rates = {r.habit.id: r for r in service.completion_rates(start, end)}
+    assert (rates[walk.id].completed_periods, rates[walk.id].total_periods) == (5, 7)
+    assert (rates[save.id].completed_periods, rates[save.id].total_periods) == (1, 1)
+
+    summary = service.streaks_in_window(walk.id, start, end)
+    assert (summary.longest_streak, summary.current_streak) == (3, 2)
+    assert service.streaks_in_window(walk.id, start, date(2024, 1, 10)).current_streak == 0
+
+    weeks = service.heatmap(walk.id, start, end)
+    assert weeks == [(date(2024, 1, 1), [1, 1, 1, 0, 1, 1, 0])]
+
+    with pytest.raises(ValueError):
+        service.completion_rates(end, start)
+
+
+def test_custom_periodicities_in_streaks_and_ranges(service):
+    from datetime import date
+
+    rent = service.create_habit("Pay rent", " Monthly")
+    clean = service.create_habit("Clean", "every-3-days")
+    assert rent.periodicity == "monthly"
+    assert service.create_habit("Walk", "every-1-days").periodicity == "daily"
+    with pytest.raises(ValueError):
+        service.create_habit("Never", "yearly")
+
+    for at in ("2024-01-31", "2024-02-01", "2024-03-15", "2024-05-02"):
+        service.add_completion_at(rent.id, f"{at}T08:00:00+00:00")
+    # 2024-01-01 starts a block of three days (day ordinal 738886 = 3 * 246295 + 1)
+    for day in (1, 3, 4, 8):
+        service.add_completion_at(clean.id, f"2024-01-{day:02d}T08:00:00+00:00")
+
+    for backend in STREAK_BACKENDS:
+        assert service.longest_streak_for_habit(rent.id, backend=backend) == 3
+        assert service.longest_streak_for_habit(clean.id, backend=backend) == 3
+
+    start, end = date(2024, 1, 10), date(2024, 4, 30)
+    rates = {r.habit.id: r for r in service.completion_rates(start, end)}
+    assert (rates[rent.id].completed_periods, rates[rent.id].total_periods) == (3, 4)
+    summary = service.streaks_in_window(rent.id, start, end)
+    assert (summary.longest_streak, summary.current_streak) == (3, 3)
+    assert [h.id for h in service.list_habits(periodicity="monthly")] == [rent.id]
+
+
+def test_streak_cache_hits_until_the_habit_changes(service):
+    walk = service.create_habit("Walk", "daily")
+    read = service.create_habit("Read", "daily")
+    service.add_completion_at(walk.id, "2024-01-01T08:00:00+00:00")
+    service.add_completion_at(read.id, "2024-01-01T08:00:00+00:00")
+
+    assert service.longest_streak_for_habit(walk.id) == 1
+    assert service.longest_streak_for_habit(read.id) == 1
+    assert service.longest_streak_for_habit(walk.id) == 1
+    assert (service.streak_cache.hits, service.streak_cache.misses) == (1, 2)
+
+    service.add_completion_at(walk.id, "2024-01-02T08:00:00+00:00")
+    assert service.longest_streak_for_habit(walk.id) == 2   # invalidated: miss
+    assert service.longest_streak_for_habit(read.id) == 1   # untouched: hit
+    assert (service.streak_cache.hits, service.streak_cache.misses) == (2, 3)
+
+    service.archive_habit(read.id)
+    service.longest_streak_for_habit(read.id)
+    assert service.streak_cache.misses == 4
+
+
+def test_streak_cache_sees_commits_from_other_connections(tmp_path):
+    path = tmp_path / "planner.db"
+    ours = HabitService(repo=HabitRepository(conn=open_database(path)))
+    theirs = HabitService(repo=HabitRepository(conn=open_database(path)))
+    habit = ours.create_habit("Walk", "daily")
+    ours.add_completion_at(habit.id, "2024-01-01T08:00:00+00:00")
+    assert ours.longest_streak_for_habit(habit.id) == 1
+
+    theirs.add_completion_at(habit.id, "2024-01-02T08:00:00+00:00")
+
+    assert ours.longest_streak_for_habit(habit.id) == 2
+    assert ours.streak_cache.hits == 0
+
+
+def test_streak_report_warms_the_cache(service, seed_random):
+    habits = seed_random(service, 3)
+    service.streak_report()
+
+    for habit in habits:
+        service.longest_streak_for_habit(habit.id)
+    assert service.streak_cache.stats()["hits"] == len(habits)
+
+
+def test_archived_habits_go_cold_and_maintenance_vacuums(tmp_path, seed_random):
+    service = HabitService(repo=HabitRepository(conn=open_database(tmp_path / "p.db")))
+    habits = seed_random(service, 3)
+    before = {
+        backend: service.streak_report(include_archived=True, backend=backend)
+        for backend in STREAK_BACKENDS
+    }
+    for habit in habits[::2]:
+        service.archive_habit(habit.id)
+
+    for backend, report in before.items():
+        after = service.streak_report(include_archived=True, backend=backend)
+        assert [(r.habit.id, r.longest_streak) for r in after] == [
+            (r.habit.id, r.longest_streak) for r in report
+        ]
+    moved = set(service.repo.cold_summaries())
+    assert moved == {h.id for h in habits[::2] if service.list_completions_for_habit(h.id)}
+
+    report = service.maintenance()
+    assert report.habits_moved == 0
+    assert report.size_after <= report.size_before
+    service.unarchive_habit(habits[0].id)
+    assert habits[0].id not in service.repo.cold_summaries()
+    service.repo.close()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_top_streaks_match_a_full_sort(seed, service, seed_random):
+    seed_random(service, seed)
+    service.archive_habit(1)
+
+    for include_archived in (False, True):
+        report = service.streak_report(include_archived=include_archived)
+        expected = sorted(
+            (r for r in report if r.longest_streak),
+            key=lambda r: (-r.longest_streak, r.habit.id),
+        )
+        for backend in STREAK_BACKENDS:
+            top = service.top_streaks(3, backend=backend, include_archived=include_archived)
+            assert top == expected[:3], backend
+    with pytest.raises(ValueError):
+        service.top_streaks(0)
+
+
+def test_list_habits_pages_by_id(service):
+    for i in range(5):
+        service.create_habit(f"h{i}", "daily")
+    service.archive_habit(2)
+
+    first = service.list_habits(limit=2)
+    second = service.list_habits(limit=2, after=first[-1].id)
+    assert [h.id for h in first + second] == [1, 3, 4, 5]
+    assert service.list_habits(limit=2, after=second[-1].id) == []
@@ -0,0 +1,44 @@
+import pytest
+
+from analytics import load_numpy
+from snapshot import Snapshot, write_snapshot
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_snapshot_streaks_match_the_database(tmp_path, use_numpy, service, seed_random):
+    if use_numpy and load_numpy() is None:
+        pytest.skip("numpy is not installed")
+    habits = seed_random(service, 2)
+    service.archive_habit(habits[0].id)
+    path = tmp_path / "planner.snapshot"
+
+    count = write_snapshot(service.repo, path)
+
+    expected = service.repo.streaks_sql(include_archived=True)
+    with Snapshot(path) as snap:
+        assert snap.count == count == service.repo.count_completions()
+        assert [h.id for h in snap.habits] == [h.id for h in habits]
+        assert snap.habits[0].is_archived
+        assert snap.streaks(use_numpy=use_numpy) == expected
+
+
+def test_snapshot_columns_are_ordered_by_habit_and_time(tmp_path, service):
+    walk = service.create_habit("Walk", "daily")
+    read = service.create_habit("Read", "weekly")
+    service.add_completion_at(read.id, "2024-01-10T08:00:00+00:00")
+    service.add_completion_at(walk.id, "2024-01-02T08:00:00+00:00")
+    service.add_completion_at(walk.id, "2024-01-01T08:00:00+00:00")
+    write_snapshot(service.repo, tmp_path / "s")
+
+    with Snapshot(tmp_path / "s") as snap:
+        assert list(snap.habit_ids) == [walk.id, walk.id, read.id]
+        day = 738886  # date(2024, 1, 1).toordinal()
+        assert list(snap.days) == [day, day + 1, day + 9]
+
+
+def test_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / "not-a-snapshot"
+    path.write_bytes(b"SQLite format 3\0" + bytes(100))
+
+    with pytest.raises(ValueError, match="not a planner snapshot"):
+        Snapshot(path)
@@ -0,0 +1,63 @@
+import pytest
+
+from cli import create_parser, run_cli
+from tenants import TenantRouter, merge_longest_streaks
+
+
+def add_history(router: TenantRouter, tenant: str, days: int) -> None:
+    """Helper to give a tenant one daily habit completed `days` days in a row."""
+    service = router.service(tenant)
+    habit = service.create_habit("Walk", "daily")
+    service.import_completions(
+        (habit.id, f"2024-01-{day:02d}T08:00:00+00:00") for day in range(1, days + 1)
+    )
+    service.repo.close()
+
+
+def test_router_gives_each_tenant_its_own_file(tmp_path):
+    router = TenantRouter(tmp_path)
+    add_history(router, "smith", 3)
+    add_history(router, "jones", 5)
+
+    assert router.tenants() == ["jones", "smith"]
+    assert router.path_for("smith") == tmp_path / "smith.db"
+    assert [h.name for h in router.service("smith").list_habits()] == ["Walk"]
+
+
+@pytest.mark.parametrize("tenant", ["../planner", "a/b", "", ".hidden"])
+def test_router_rejects_unsafe_tenant_ids(tmp_path, tenant):
+    with pytest.raises(ValueError):
+        TenantRouter(tmp_path).path_for(tenant)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_fan_out_merges_tenant_results(tmp_path, workers):
+    router = TenantRouter(tmp_path)
+    for tenant, days in (("a", 2), ("b", 7), ("c", 7), ("d", 4)):
+        add_history(router, tenant, days)
+
+    summaries = router.summaries(max_workers=workers)
+
+    assert [(s.tenant, s.completions, s.best_streak) for s in summaries] == [
+        ("a", 2, 2), ("b", 7, 7), ("c", 7, 7), ("d", 4, 4),
+    ]
+    tenant, habit, streak = merge_longest_streaks(summaries)
+    assert (tenant, habit.name, streak) == ("b", "Walk", 7)
+
+
+def test_cli_db_and_tenant_options(tmp_path, capsys):
+    parser = create_parser()
+    run_cli(parser.parse_args(["--db", str(tmp_path / "x.db"), "add", "Walk", "--period", "daily"]))
+    run_cli(parser.parse_args(["--tenants-dir", str(tmp_path), "--tenant", "smith",
+                               "add", "Read", "--period", "weekly"]))
+    capsys.readouterr()
+
+    run_cli(parser.parse_args(["--db", str(tmp_path / "x.db"), "list"]))
+    run_cli(parser.parse_args(["--tenants-dir", str(tmp_path), "--tenant", "smith", "list"]))
+
+    assert capsys.readouterr().out.splitlines() == [
+        "[1] Walk (daily), archived=False",
+        "[1] Read (weekly), archived=False",
+    ]
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--db", "x.db", "--tenant", "smith", "list"])